@@ -0,0 +1,129 @@
+import re
+from typing import NamedTuple
+
+WORD_PATTERN = re.compile(r"\w{3,}") # Words short enough to be stop words are left out of relevance scoring
+
+
+def _words(text):
+    return frozenset(word.lower() for word in WORD_PATTERN.findall(text))
+
+
+class Prompt(NamedTuple):
+    """A tokenized prompt. Its first prefix_length tokens are the shared header and learned items."""
+    ids: list
+    prefix_length: int
+
+    @property
+    def prefix(self):
+        return self.ids[:self.prefix_length]
+
+
+class _Item:
+    __slots__ = ('ids', 'words')
+
+    def __init__(self, ids, words):
+        self.ids = ids
+        self.words = words
+
+
+class ContextBuilder:
+    """
+    Builds AI prompts as token IDs with a bounded slice of the learned information.
+    Every learned item is tokenized once and cached with its token count and word set, so
+    a prompt is assembled by concatenating cached token lists instead of joining all items
+    into one string and re-tokenizing it.
+    A prompt is a shared prefix followed by a per-request tail. The prefix is the same for
+    every command and question: CONTEXT_HEADER and the most recent learned items that fit in
+    `budget` tokens, in the order they were learned, so its keys and values can be cached.
+    The tail continues the list with up to `relevant_budget` tokens of the older items that
+    share the most words with the query (most recent first among equals), followed by the
+    command's own text. The prefix does not depend on the text, so a long question cannot
+    evict it from the cache: if the prompt is too long, the relevant items go first, then the
+    start of the user's text, always keeping its end (the question and the answer cue). Only a
+    max_tokens too small for the prefix next to an equally long text shrinks the prefix.
+    Newly learned items are folded into the prefix only once `refresh_items` of them are
+    pending, so the prefix stays the same across many requests instead of changing with every
+    command; until then they are candidates for the tail.
+    """
+    CONTEXT_HEADER = "Information I know:\n"
+
+    def __init__(self, tokenizer, budget=256, relevant_budget=64, refresh_items=1):
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self.relevant_budget = relevant_budget
+        self.refresh_items = refresh_items
+        self._items = {} # learned text -> _Item
+        self._header = self._encode(self.CONTEXT_HEADER)
+        self._folded = None # The learned texts prefixes are built from
+
+    def _encode(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def _item(self, text):
+        item = self._items.get(text)
+        if item is None:
+            item = self._items[text] = _Item(self._encode(text + "\n"), _words(text))
+        return item
+
+    def _forget(self, learned):
+        """Drops cached items that were forgotten, so the cache never outgrows the learned list."""
+        if len(self._items) > len(learned) + len(self._folded or ()):
+            kept = set(learned) | set(self._folded or ())
+            self._items = {text: item for text, item in self._items.items() if text in kept}
+
+    def _fold(self, learned):
+        """Returns the learned texts to build prefixes from, taking in the new ones once enough are pending."""
+        if self._folded is None:
+            self._folded = list(learned)
+        else:
+            folded = set(self._folded)
+            if sum(text not in folded for text in learned) >= self.refresh_items:
+                self._folded = list(learned)
+        return self._folded
+
+    def recent(self, learned, budget):
+        """Returns the texts of the most recent learned items that fit in budget tokens, in learned order."""
+        chosen = []
+        used = 0
+        for text in reversed(learned):
+            size = len(self._item(text).ids)
+            if used + size > budget:
+                break
+            chosen.append(text)
+            used += size
+        return chosen[::-1]
+
+    def select(self, learned, query, budget, exclude=()):
+        """
+        Returns the token IDs of the learned items not in exclude that share the most words with the
+        query and fit in budget tokens, in learned order.
+        """
+        texts = [text for text in learned if text not in exclude]
+        items = [self._item(text) for text in texts]
+        query_words = _words(query)
+        ranked = sorted(range(len(items)), key=lambda index: (len(items[index].words & query_words), index), reverse=True)
+        chosen = []
+        used = 0
+        for index in ranked:
+            size = len(items[index].ids)
+            if used + size <= budget:
+                chosen.append(index)
+                used += size
+        return [token for index in sorted(chosen) for token in items[index].ids]
+
+    def build(self, learned, text, query, max_tokens):
+        """
+        Returns the shared prefix + relevant learned items + text as a Prompt, at most max_tokens long.
+        `text` is the command's instruction and the user's input; `query` is what relevance is judged by.
+        """
+        # The prefix depends on max_tokens only, never on the text, so it stays the same across requests
+        prefix_texts = self.recent(self._fold(learned), min(self.budget, (max_tokens - len(self._header)) // 2))
+        prefix_ids = self._header + [token for item in prefix_texts for token in self._item(item).ids]
+        room = max_tokens - len(prefix_ids)
+        text_ids = self._encode(text)
+        if len(text_ids) > room:
+            text_ids = text_ids[len(text_ids) - max(room, 0):]
+        room -= len(text_ids)
+        relevant_ids = self.select(learned, query, min(self.relevant_budget, room), exclude=set(prefix_texts))
+        self._forget(learned)
+        return Prompt(prefix_ids + relevant_ids + text_ids, len(prefix_ids))
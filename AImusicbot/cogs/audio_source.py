@@ -0,0 +1,71 @@
+import discord
+
+
+def atempo_filter(speed):
+    """
+    Returns an ffmpeg atempo filter for the given speed, or None at 1.0x.
+    Older ffmpeg builds only accept 0.5-2.0 per atempo instance, so other speeds
+    are built from a chain of them (0.25x -> atempo=0.5,atempo=0.5).
+    """
+    if speed == 1.0:
+        return None
+    factors = []
+    while speed < 0.5:
+        factors.append(0.5)
+        speed /= 0.5
+    while speed > 2.0:
+        factors.append(2.0)
+        speed /= 2.0
+    factors.append(speed)
+    return ','.join(f"atempo={factor:g}" for factor in factors)
+
+
+def volume_filter(volume):
+    """Returns an ffmpeg volume filter for the given gain, or None at 100%."""
+    if volume == 1.0:
+        return None
+    return f"volume={volume:g}"
+
+
+class TrackedAudioSource(discord.AudioSource):
+    """
+    Wraps an audio source and counts the 20 ms frames the voice client actually reads from it.
+    The player reads exactly one frame per packet it sends, so the count gives the exact
+    playback position through pauses, stalls and reconnects. `start` is the song position
+    the source was started at and `speed` the tempo its frames are played at.
+    The first frame can be read ahead of time with prime(), so swapping a freshly started
+    ffmpeg source into a playing VoiceClient leaves no gap while ffmpeg connects and seeks.
+    """
+    FRAME_LENGTH = discord.opus.Encoder.FRAME_LENGTH / 1000 # seconds
+
+    def __init__(self, source, start=0.0, speed=1.0):
+        self.source = source
+        self.start = start
+        self.speed = speed
+        self.frames = 0
+        self._first_packet = None
+
+    @property
+    def position(self):
+        """Seconds into the song that have been sent to Discord."""
+        return self.start + self.frames * self.FRAME_LENGTH * self.speed
+
+    def prime(self):
+        """Blocks until the wrapped source produced its first packet."""
+        if self._first_packet is None:
+            self._first_packet = self.source.read()
+
+    def read(self):
+        if self._first_packet is not None:
+            packet, self._first_packet = self._first_packet, None
+        else:
+            packet = self.source.read()
+        if packet:
+            self.frames += 1
+        return packet
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
@@ -1,34 +1,34 @@
-import discord
-from discord.ext import commands
-
-class CustomHelp(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-
-    @commands.group(invoke_without_command=True)
-    async def help(self, ctx):
-        embed = discord.Embed(title="IndianDesiMemer Help Center ✨",color=0xF49726)
-        embed.add_field(name="Command Categories :",value=" `memes    :` Image generation with a memey twist.\n" + " `utility  :` Bot utility zone\n `nsfw     :` Image generation with a memey twist.\n\nTo view the commands of a category, send `.help <category>`" ,inline=False)
-        embed.set_footer(icon_url=ctx.author.avatar_url,text="Help requested by: {}".format(ctx.author.display_name))
-        await ctx.send(embed=embed)
-
-    @help.command ()
-    async def memes(self, ctx):
-        embed=discord.Embed(title="IndianDesiMemer Help Center ✨", description="Commands of **meme** \n`.meme:`Memes",inline=False)
-        embed.set_footer(icon_url=ctx.author.avatar_url,text="Command requested by: {}".format(ctx.author.display_name))
-        await ctx.send(embed=embed)
-
-    @help.command ()
-    async def nsfw(self, ctx) :
-        embed=discord.Embed(title="IndianDesiMemer Help Center ✨", description="Commands of **nsfw** \n`.nsfw:`NSFW", color=0xF49726)
-        embed.set_footer(icon_url=ctx.author.avatar_url,text="Command requested by: {}".format(ctx.author.display_name))
-        await ctx.send(embed=embed)
-
-    @help.command ()
-    async def utility(self, ctx) :
-        embed=discord.Embed(title="IndianDesiMemer Help Center ✨", description="Commands of **utility** \n`.ping:`Latency", color=0xF49726)
-        embed.set_footer(icon_url=ctx.author.avatar_url,text="Command requested by: {}".format(ctx.author.display_name))
-        await ctx.send(embed=embed)
-
-async def setup(bot):
-    await bot.add_cog(CustomHelp(bot))
+import discord
+from discord.ext import commands
+
+class CustomHelp(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.group(invoke_without_command=True)
+    async def help(self, ctx):
+        embed = discord.Embed(title="IndianDesiMemer Help Center ✨",color=0xF49726)
+        embed.add_field(name="Command Categories :",value=" `memes    :` Image generation with a memey twist.\n" + " `utility  :` Bot utility zone\n `nsfw     :` Image generation with a memey twist.\n\nTo view the commands of a category, send `.help <category>`" ,inline=False)
+        embed.set_footer(icon_url=ctx.author.avatar_url,text="Help requested by: {}".format(ctx.author.display_name))
+        await ctx.send(embed=embed)
+
+    @help.command ()
+    async def memes(self, ctx):
+        embed=discord.Embed(title="IndianDesiMemer Help Center ✨", description="Commands of **meme** \n`.meme:`Memes",inline=False)
+        embed.set_footer(icon_url=ctx.author.avatar_url,text="Command requested by: {}".format(ctx.author.display_name))
+        await ctx.send(embed=embed)
+
+    @help.command ()
+    async def nsfw(self, ctx) :
+        embed=discord.Embed(title="IndianDesiMemer Help Center ✨", description="Commands of **nsfw** \n`.nsfw:`NSFW", color=0xF49726)
+        embed.set_footer(icon_url=ctx.author.avatar_url,text="Command requested by: {}".format(ctx.author.display_name))
+        await ctx.send(embed=embed)
+
+    @help.command ()
+    async def utility(self, ctx) :
+        embed=discord.Embed(title="IndianDesiMemer Help Center ✨", description="Commands of **utility** \n`.ping:`Latency", color=0xF49726)
+        embed.set_footer(icon_url=ctx.author.avatar_url,text="Command requested by: {}".format(ctx.author.display_name))
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(CustomHelp(bot))
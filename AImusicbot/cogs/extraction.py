@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ExtractionCancelled(Exception):
+    """Raised to a caller whose extraction was cancelled, e.g. because the requester left."""
+
+
+class ExtractionTimeout(Exception):
+    """Raised to a caller whose extraction took longer than its timeout."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight future.
+    The first caller starts the work; everyone who asks for the same key before it
+    finishes awaits the same future and gets the same result (or exception).
+    """
+    def __init__(self):
+        self._flights = {} # key -> (future, owner)
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def run(self, key, coro_factory, owner=None):
+        """
+        Returns the result of coro_factory() for key, sharing a running call if there is one.
+        `owner` identifies who started a flight; if that flight is cancelled (ExtractionCancelled),
+        callers with a different owner start a fresh flight instead of failing too.
+        """
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                future = asyncio.ensure_future(coro_factory())
+                flight = (future, owner)
+                self._flights[key] = flight
+                future.add_done_callback(lambda f, key=key, flight=flight: self._finish(key, flight))
+                self.started += 1
+            else:
+                self.coalesced += 1
+                logging.info(f"SingleFlight: Joined in-flight request for {key}")
+            future, flight_owner = flight
+            try:
+                # Shield the shared future so one caller being cancelled does not cancel the others
+                return await asyncio.shield(future)
+            except ExtractionCancelled:
+                if flight_owner == owner:
+                    raise
+
+    def _finish(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        future = flight[0]
+        if not future.cancelled():
+            future.exception() # Mark it retrieved even if every caller gave up
+
+    def stats(self):
+        return {'in_flight': len(self._flights), 'started': self.started, 'coalesced': self.coalesced}
+
+
+class _Job:
+    __slots__ = ('func', 'args', 'guild_id', 'requester', 'timeout', 'future', 'enqueued')
+
+    def __init__(self, func, args, guild_id, requester, timeout, future):
+        self.func = func
+        self.args = args
+        self.guild_id = guild_id
+        self.requester = requester
+        self.timeout = timeout
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class ExtractionScheduler:
+    """
+    Runs blocking yt-dlp extractions on a dedicated, bounded pool instead of the
+    event loop's default executor.
+    Pending jobs are queued per guild and served round-robin, so one guild loading a
+    huge playlist cannot starve everyone else. Every job has a timeout and can be
+    cancelled while it waits (or its result dropped while it runs).
+    With `use_processes` the work runs in a process pool, which keeps yt-dlp's
+    parsing off the GIL; the job function and its arguments must then be picklable.
+    """
+    def __init__(self, workers=4, use_processes=False, timeout=60, samples=256):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.timeout = timeout
+        self._executor = None
+        self._worker_tasks = []
+        self._has_work = None
+        self._pending = OrderedDict() # guild_id -> deque of jobs, in round-robin order
+        self._running = set()
+        self._wait_times = deque(maxlen=samples)
+        self._run_times = deque(maxlen=samples)
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _start(self):
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ytdl')
+        if not self._worker_tasks:
+            self._has_work = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+            logging.info(f"ExtractionScheduler: Started {self.workers} {'process' if self.use_processes else 'thread'} workers")
+
+    def shutdown(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func, *args, guild_id=None, requester=None, timeout=None):
+        """
+        Queues func(*args) for the given guild and waits for its result.
+        Raises ExtractionTimeout or ExtractionCancelled, or whatever func raised.
+        """
+        self._start()
+        job = _Job(func, args, guild_id, requester, timeout or self.timeout, asyncio.get_running_loop().create_future())
+        self._pending.setdefault(guild_id, deque()).append(job)
+        self._has_work.set()
+        return await job.future
+
+    def cancel(self, guild_id=None, requester=None):
+        """
+        Cancels the queued and running jobs of a guild (all guilds if None), optionally only
+        those submitted by one requester. Returns the number of jobs cancelled.
+        """
+        cancelled = 0
+        jobs = [job for jobs in self._pending.values() for job in jobs] + list(self._running)
+        for job in jobs:
+            if guild_id is not None and job.guild_id != guild_id:
+                continue
+            if requester is not None and job.requester != requester:
+                continue
+            if not job.future.done():
+                job.future.set_exception(ExtractionCancelled("The extraction was cancelled."))
+                cancelled += 1
+        self.cancelled += cancelled
+        return cancelled
+
+    def _next_job(self):
+        while self._pending:
+            guild_id, jobs = next(iter(self._pending.items()))
+            job = jobs.popleft()
+            if jobs:
+                self._pending.move_to_end(guild_id) # Let the other guilds go first next time
+            else:
+                del self._pending[guild_id]
+            if not job.future.done(): # Skip jobs whose caller gave up or was cancelled
+                return job
+        return None
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._has_work.clear()
+                await self._has_work.wait()
+                continue
+
+            started = time.perf_counter()
+            self._wait_times.append(started - job.enqueued)
+            self._running.add(job)
+            work = loop.run_in_executor(self._executor, job.func, *job.args)
+            try:
+                # Also wake up if the job is cancelled so the worker is free for the next one.
+                # A running extraction cannot be interrupted; its result is simply dropped.
+                await asyncio.wait({work, job.future}, timeout=job.timeout, return_when=asyncio.FIRST_COMPLETED)
+                if job.future.done():
+                    pass
+                elif not work.done():
+                    self.timed_out += 1
+                    logging.warning(f"ExtractionScheduler: Job for guild {job.guild_id} timed out after {job.timeout}s")
+                    job.future.set_exception(ExtractionTimeout(f"Extraction timed out after {job.timeout}s."))
+                elif work.exception() is not None:
+                    self.failed += 1
+                    job.future.set_exception(work.exception())
+                else:
+                    self.completed += 1
+                    job.future.set_result(work.result())
+                if not work.done():
+                    # The pool thread is still busy with the dropped extraction. Keep this worker (and the
+                    # job in _running) until it is free, so at most `workers` extractions run at once and
+                    # queued jobs wait here, served fairly, instead of unseen in the executor's own queue.
+                    await asyncio.wait({work})
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.set_exception(ExtractionCancelled("The extraction scheduler was shut down."))
+                raise
+            finally:
+                self._running.discard(job)
+                self._run_times.append(time.perf_counter() - started)
+                if not work.done():
+                    work.add_done_callback(lambda f: f.cancelled() or f.exception()) # Don't warn about unretrieved exceptions
+
+    @staticmethod
+    def _percentiles(samples):
+        if not samples:
+            return 0.0, 0.0
+        ordered = sorted(samples)
+        return sum(ordered) / len(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def stats(self):
+        """Returns a dictionary of queue-depth and latency metrics for reporting."""
+        wait_avg, wait_p95 = self._percentiles(self._wait_times)
+        run_avg, run_p95 = self._percentiles(self._run_times)
+        return {
+            'workers': self.workers,
+            'mode': 'process' if self.use_processes else 'thread',
+            'queued': sum(len(jobs) for jobs in self._pending.values()),
+            'queued_by_guild': {guild_id: len(jobs) for guild_id, jobs in self._pending.items()},
+            'running': len(self._running),
+            'completed': self.completed,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'cancelled': self.cancelled,
+            'wait_avg': wait_avg,
+            'wait_p95': wait_p95,
+            'run_avg': run_avg,
+            'run_p95': run_p95,
+        }
@@ -0,0 +1,84 @@
+import asyncio
+
+import config
+from .queuebuffer import TrackQueue
+
+
+class GuildPlayer:
+    """
+    Everything the music cog keeps for one guild: its queue, what is playing and how,
+    and the background work running on its behalf.
+    Players are created when a guild starts playing and torn down as a whole when the bot
+    leaves the guild's voice channel (or, after a mid-song cutoff, once the resume point
+    expires), so nothing is kept for guilds that only look at the queue or are no longer listening.
+    """
+    __slots__ = ('guild_id', 'queue', 'current', 'source', 'pending_source', 'speed', 'volume', 'looping', 'resume_point',
+                 'text_channel_id', 'nowplaying_message', 'play_lock', 'playlist_task', 'prefetcher',
+                 'inactivity_timer')
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.queue = TrackQueue()
+        self.current = None # The Track that is playing
+        self.source = None # The TrackedAudioSource that is playing it
+        self.pending_source = None # A source restarted with new settings while paused, played on resume
+        self.speed = 1.0
+        self.volume = config.DEFAULT_VOLUME
+        self.looping = False
+        self.resume_point = None # (track, position) saved when the bot was disconnected mid-song
+        self.text_channel_id = None # Where the current song was started from
+        self.nowplaying_message = None
+        self.play_lock = asyncio.Lock()
+        self.playlist_task = None # Background expansion of a long playlist
+        self.prefetcher = None
+        self.inactivity_timer = None
+
+    def __repr__(self):
+        return f"<GuildPlayer guild_id={self.guild_id} current={self.current!r} queued={len(self.queue)}>"
+
+    @property
+    def position(self):
+        """Seconds into the current song, counted from the audio frames actually sent."""
+        return self.source.position if self.source else 0
+
+    def time_remaining(self):
+        """Seconds until the current song ends, 0 if nothing is playing, None if unknown (e.g. live streams)."""
+        if not self.current or not self.source:
+            return 0
+        if not self.current.duration:
+            return None
+        return max(0, (self.current.duration - self.position) / self.speed)
+
+    def finish(self):
+        """Forgets the current song once it has ended."""
+        self.current = None
+        self.source = None
+        pending, self.pending_source = self.pending_source, None
+        if pending:
+            pending.cleanup()
+
+    def cancel_playlist_task(self):
+        task, self.playlist_task = self.playlist_task, None
+        if task and not task.done():
+            task.cancel()
+
+    def cancel_inactivity_timer(self):
+        timer, self.inactivity_timer = self.inactivity_timer, None
+        if timer:
+            timer.cancel()
+
+    def stop_background(self):
+        """Cancels the playlist expansion, the prefetcher and the inactivity timer."""
+        self.cancel_playlist_task()
+        self.cancel_inactivity_timer()
+        prefetcher, self.prefetcher = self.prefetcher, None
+        if prefetcher:
+            prefetcher.cancel()
+
+    def teardown(self):
+        """Stops all background work and drops every reference the player holds."""
+        self.stop_background()
+        self.queue.clear()
+        self.finish()
+        self.resume_point = None
+        self.nowplaying_message = None
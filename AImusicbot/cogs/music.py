@@ -1,906 +1,1053 @@
-import asyncio
-import discord
-from discord.ext import commands
-import random
-import logging
-import time
-import os
-import shutil
-
-import config
-from utils.speeds import get_youtube_service
-
-from .youtube import YTDLSource, FFMPEG_OPTIONS, YTDL_FORMAT_OPTIONS
-from .queuebuffer import QueueBuffer
-
-class Music(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.song_queues = {}
-        self.search_results = {}
-        self.current_song = {}
-        self.nowplaying_message = {}
-        self.queue_message = {}
-        self.playback_speed = {}
-        self.youtube_speeds = [0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0]
-        self.looping = {}
-        self.song_start_time = {}
-        self.nowplaying_tasks = {}
-        self.current_volume = {}
-        self.inactivity_timers = {}
-
-    async def get_queue(self, guild_id):
-        if guild_id not in self.song_queues:
-            self.song_queues[guild_id] = asyncio.Queue()
-        return self.song_queues[guild_id]
-
-    def create_embed(self, title, description, color=discord.Color.blurple(), **kwargs):
-        embed = discord.Embed(title=title, description=description, color=color)
-        for key, value in kwargs.items():
-            embed.add_field(name=key, value=value, inline=False)
-        return embed
-
-    def _get_progress_bar(self, current_time, total_duration, bar_length=20):
-        if total_duration == 0:
-            return "━━━━━━━━━━━━"  # Default empty bar
-
-        progress = (current_time / total_duration)
-        filled_length = int(bar_length * progress)
-        bar = "━" * filled_length + "●" + "━" * (bar_length - filled_length - 1)
-        return bar
-
-    async def _disconnect_if_idle(self, guild_id):
-        if guild_id in self.inactivity_timers:
-            del self.inactivity_timers[guild_id]
-        guild = self.bot.get_guild(guild_id)
-        if guild and guild.voice_client and not guild.voice_client.is_playing():
-            await guild.voice_client.disconnect()
-            logging.info(f"Bot disconnected from voice channel in {guild.name} due to inactivity.")
-
-    def _start_inactivity_timer(self, guild_id):
-        if guild_id in self.inactivity_timers:
-            self.inactivity_timers[guild_id].cancel()
-        self.inactivity_timers[guild_id] = self.bot.loop.call_later(600, lambda: asyncio.ensure_future(self._disconnect_if_idle(guild_id)))
-
-    @commands.command(name="join")
-    async def join(self, ctx):
-        logging.info(f"Join command invoked by {ctx.author} in {ctx.guild.name}")
-        if not ctx.author.voice:
-            logging.warning(f"User {ctx.author} not in a voice channel when trying to join.")
-            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You are not connected to a voice channel.", discord.Color.red()))
-        if ctx.voice_client:
-            await ctx.voice_client.move_to(ctx.author.voice.channel)
-            logging.info(f"Bot moved to voice channel {ctx.author.voice.channel} in {ctx.guild.name}")
-        else:
-            await ctx.author.voice.channel.connect()
-            logging.info(f"Bot joined voice channel {ctx.author.voice.channel} in {ctx.guild.name}")
-        await ctx.send(embed=self.create_embed("Joined Channel", f"{config.SUCCESS_EMOJI} Joined `{ctx.author.voice.channel}`"))
-
-    @commands.command(name="leave")
-    async def leave(self, ctx):
-        logging.info(f"Leave command invoked by {ctx.author} in {ctx.guild.name}")
-        if ctx.voice_client:
-            await ctx.voice_client.disconnect()
-            logging.info(f"Bot disconnected from voice channel in {ctx.guild.name}")
-            
-            # Cancel nowplaying update task
-            if ctx.guild.id in self.nowplaying_tasks and self.nowplaying_tasks[ctx.guild.id] and not self.nowplaying_tasks[ctx.guild.id].done():
-                self.nowplaying_tasks[ctx.guild.id].cancel()
-                del self.nowplaying_tasks[ctx.guild.id]
-
-            # Clear the yt-dlp cache
-            if os.path.exists("yt_dlp_cache"):
-                shutil.rmtree("yt_dlp_cache")
-                os.makedirs("yt_dlp_cache")
-                logging.info("Cleared the yt-dlp cache.")
-
-            await ctx.send(embed=self.create_embed("Left Channel", f"{config.SUCCESS_EMOJI} Successfully disconnected from the voice channel."))
-        else:
-            logging.warning(f"Leave command invoked but bot not in a voice channel in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} I am not currently in a voice channel.", discord.Color.red()))
-
-    @commands.command(name="search")
-    async def search(self, ctx, *, query):
-        logging.info(f"Search command invoked by {ctx.author} in {ctx.guild.name} with query: {query}")
-        if not config.YOUTUBE_API_KEY:
-            logging.error("YouTube API key is not set.")
-            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} YouTube API key is not set.", discord.Color.red()))
-        try:
-            youtube_service = get_youtube_service(config.YOUTUBE_API_KEY)
-            search_response = youtube_service.search().list(q=query, part="snippet", maxResults=10, type="video").execute()
-            
-            if not search_response:
-                logging.warning(f"YouTube API returned empty response for query: {query}")
-                return await ctx.send(embed=self.create_embed("Search Error", "The YouTube API returned an empty response. Please check your API key.", discord.Color.red()))
-
-            videos = [(item["snippet"]["title"], item["id"]["videoId"]) for item in search_response.get("items", [])]
-            if not videos:
-                logging.info(f"No videos found for query: {query}")
-                return await ctx.send(embed=self.create_embed("No Results", f"{config.ERROR_EMOJI} No songs found for your query.", discord.Color.orange()))
-            self.search_results[ctx.guild.id] = videos
-            response = "\n".join(f"**{i+1}.** {title}" for i, (title, _) in enumerate(videos))
-            logging.info(f"Found {len(videos)} search results for query: {query}")
-            await ctx.send(embed=self.create_embed("Search Results", response))
-        except Exception as e:
-            logging.error(f"Error in search command for query '{query}': {e}")
-            await ctx.send(embed=self.create_embed("Search Error", f"An error occurred: {e}", discord.Color.red()))
-
-    @commands.command(name="play")
-    async def play(self, ctx, *, query):
-        logging.info(f"--- Play command initiated by {ctx.author} ---")
-        
-        # 1. Acknowledge and ensure bot is in a voice channel
-        await ctx.send(embed=self.create_embed("Processing", f"{config.QUEUE_EMOJI} Fetching your request..."))
-        
-        if not ctx.author.voice:
-            logging.warning("User not in a voice channel.")
-            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You must be in a voice channel to play music.", discord.Color.red()))
-
-        if not ctx.voice_client:
-            logging.info("Bot not in a voice channel, attempting to join.")
-            await ctx.author.voice.channel.connect()
-        
-        logging.info(f"Bot is in voice channel: {ctx.voice_client.channel}")
-        
-        queue = await self.get_queue(ctx.guild.id)
-        
-        try:
-            # 2. Determine URL and playlist status
-            if query.isdigit() and ctx.guild.id in self.search_results:
-                url = f"https://www.youtube.com/watch?v={self.search_results[ctx.guild.id][int(query) - 1][1]}"
-            else:
-                url = query
-
-            if 'start_radio=' in url:
-                url = url.split('&start_radio=')[0]
-                
-            ytdl_opts = YTDL_FORMAT_OPTIONS.copy()
-            is_playlist = 'list=' in url or 'playlist' in url
-            ytdl_opts['noplaylist'] = True # Always treat as single song
-            
-            logging.info(f"Processing URL: {url} (Is Playlist: {is_playlist})")
-
-            # 3. Fetch songs in a non-blocking way
-            logging.info("Calling YTDLSource.from_url...")
-            # Pass stream=True to get a streamable source directly
-            # Pass stream=True to get a streamable source directly
-            result = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True, ytdl_opts=ytdl_opts)
-            logging.info(f"YTDLSource.from_url returned. Fetched {len(result) if isinstance(result, list) else 1} song(s).")
-
-            if not result:
-                return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch any songs. Please check the URL or search query.", discord.Color.red()))
-
-            # 4. Queue the fetched song(s) directly
-            # YTDLSource.from_url with stream=True now returns a list of dictionaries
-            # or a single dictionary.
-            # We need to handle both cases and put the dictionaries into the queue.
-            if isinstance(result, list):
-                # It's a playlist or search result
-                buffer = QueueBuffer()
-                # test_playlist expects a list of YTDLSource objects, but we have dictionaries.
-                # We need to adapt test_playlist or process the dictionaries here.
-                # Let's process the dictionaries here for now.
-
-                playable_songs = [item for item in result if item and 'data' in item and item['data'].get('url')]
-                unplayable_songs = [item for item in result if item and ('data' not in item or not item['data'].get('url'))]
-
-                logging.info(f"Found {len(playable_songs)} playable and {len(unplayable_songs)} unplayable songs.")
-
-                if not playable_songs:
-                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No playable songs found.", discord.Color.red()))
-
-                for song_info in playable_songs:
-                    await queue.put(song_info) # Put the dictionary into the queue
-
-                # Use the title of the first playable song's data for the confirmation message
-                first_song_title = playable_songs[0]['data'].get('title') if playable_songs and 'data' in playable_songs[0] else "song(s)"
-                if len(playable_songs) > 1:
-                    await ctx.send(embed=self.create_embed("Playlist Added", f"{config.SUCCESS_EMOJI} Added {len(playable_songs)} songs to the queue."))
-                else:
-                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{first_song_title}` to the queue."))
-
-                if unplayable_songs:
-                    unplayable_titles = [item['data'].get('title', 'Unknown Title') for item in unplayable_songs if 'data' in item]
-                    await ctx.send(embed=self.create_embed("Unplayable Songs", f"{config.ERROR_EMOJI} Skipped {len(unplayable_songs)} unplayable songs:\n- " + "\n- ".join(unplayable_titles), discord.Color.orange()))
-
-            else:
-                # It's a single song (a dictionary)
-                if 'data' in result and result['data'].get('url'):
-                    await queue.put(result) # Put the dictionary into the queue
-                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{result['data'].get('title')}` to the queue."))
-                else:
-                    await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch the song.", discord.Color.red()))
-
-
-        except Exception as e:
-            logging.error(f"Error in play command: {e}", exc_info=True)
-            await ctx.send(embed=self.create_embed("Error", f"An unexpected error occurred: {e}", discord.Color.red()))
-
-        # 6. Start playback
-        if not ctx.voice_client.is_playing() and not queue.empty():
-            logging.info("Voice client is not playing and queue is not empty. Calling play_next.")
-            await self.play_next(ctx)
-        else:
-            logging.info("Voice client is already playing or queue is empty.")
-
-    @commands.command(name="playlist")
-    async def playlist(self, ctx, *, query):
-        logging.info(f"--- Playlist command initiated by {ctx.author} ---")
-        
-        # 1. Acknowledge and ensure bot is in a voice channel
-        await ctx.send(embed=self.create_embed("Processing", f"{config.QUEUE_EMOJI} Fetching your playlist..."))
-        
-        if not ctx.author.voice:
-            logging.warning("User not in a voice channel.")
-            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You must be in a voice channel to play music.", discord.Color.red()))
-
-        if not ctx.voice_client:
-            logging.info("Bot not in a voice channel, attempting to join.")
-            await ctx.author.voice.channel.connect()
-        
-        logging.info(f"Bot is in voice channel: {ctx.voice_client.channel}")
-        
-        queue = await self.get_queue(ctx.guild.id)
-        
-        try:
-            # 2. Determine URL and playlist status
-            if query.isdigit() and ctx.guild.id in self.search_results:
-                url = f"https://www.youtube.com/watch?v={self.search_results[ctx.guild.id][int(query) - 1][1]}"
-            else:
-                url = query
-
-            if 'start_radio=' in url:
-                url = url.split('&start_radio=')[0]
-                
-            ytdl_opts = YTDL_FORMAT_OPTIONS.copy()
-            is_playlist = 'list=' in url or 'playlist' in url
-            ytdl_opts['noplaylist'] = not is_playlist
-            if is_playlist:
-                logging.info(f"Processing URL: {url} (Is Playlist: {is_playlist})")
-
-            # 3. Fetch songs in a non-blocking way
-            logging.info(f"Playlist command: Calling YTDLSource.from_url with URL: {url}")
-            # Pass stream=True to get a streamable source directly
-            # Pass stream=True to get a streamable source directly
-            result = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True, ytdl_opts=ytdl_opts)
-            logging.info(f"Playlist command: YTDLSource.from_url returned. Fetched {len(result) if isinstance(result, list) else 1} potential songs.")
-
-            if not result:
-                return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch any songs. Please check the URL or search query.", discord.Color.red()))
-
-            # 4. Queue the fetched song(s) directly
-            # YTDLSource.from_url with stream=True now returns a list of dictionaries
-            # or a single dictionary.
-            # We need to handle both cases and put the dictionaries into the queue.
-            if isinstance(result, list):
-                # It's a playlist or search result
-                buffer = QueueBuffer()
-                # test_playlist expects a list of YTDLSource objects, but we have dictionaries.
-                # We need to adapt test_playlist or process the dictionaries here.
-                # Let's process the dictionaries here for now.
-
-                playable_songs = [item for item in result if item and 'data' in item and item['data'].get('url')]
-                unplayable_songs = [item for item in result if item and ('data' not in item or not item['data'].get('url'))]
-
-                logging.info(f"Playlist command: Found {len(playable_songs)} playable and {len(unplayable_songs)} unplayable songs.")
-
-                if unplayable_songs:
-                    unplayable_titles = [item['data'].get('title', 'Unknown Title') for item in unplayable_songs if 'data' in item]
-                    logging.warning(f"Playlist command: Unplayable songs found: {unplayable_titles}")
-
-                if not playable_songs:
-                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No playable songs found.", discord.Color.red()))
-
-                for song_info in playable_songs:
-                    await queue.put(song_info) # Put the dictionary into the queue
-
-                # Use the title of the first playable song for the confirmation message
-                first_song_title = playable_songs[0]['data'].get('title') if playable_songs and 'data' in playable_songs[0] else "song(s)"
-                if len(playable_songs) > 1:
-                    await ctx.send(embed=self.create_embed("Playlist Added", f"{config.SUCCESS_EMOJI} Added {len(playable_songs)} songs to the queue."))
-                else:
-                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{first_song_title}` to the queue."))
-
-                if unplayable_songs:
-                    unplayable_titles = [item['data'].get('title', 'Unknown Title') for item in unplayable_songs if 'data' in item]
-                    await ctx.send(embed=self.create_embed("Unplayable Songs", f"{config.ERROR_EMOJI} Skipped {len(unplayable_songs)} unplayable songs:\n- " + "\n- ".join(unplayable_titles), discord.Color.orange()))
-
-            else:
-                # It's a single song (a dictionary)
-                if 'data' in result and result['data'].get('url'):
-                    await queue.put(result) # Put the dictionary into the queue
-                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{result['data'].get('title')}` to the queue."))
-                else:
-                    await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch the song.", discord.Color.red()))
-
-        except Exception as e:
-            logging.error(f"Error in playlist command: {e}", exc_info=True)
-            await ctx.send(embed=self.create_embed("Error", f"An unexpected error occurred: {e}", discord.Color.red()))
-
-        # 6. Start playback
-        if not ctx.voice_client.is_playing() and not queue.empty():
-            logging.info("Voice client is not playing and queue is not empty. Calling play_next.")
-            await self.play_next(ctx)
-        else:
-            logging.info("Voice client is already playing or queue is empty.")
-
-    async def play_next(self, ctx):
-        logging.info("play_next called.")
-        if ctx.voice_client.is_playing():
-            logging.warning("play_next called but audio is already playing.")
-            return
-            
-        queue = await self.get_queue(ctx.guild.id)
-        if not queue.empty() and ctx.voice_client:
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            # Get the dictionary containing data and stream flag
-            song_info = await queue.get()
-            data = song_info['data']
-            stream = song_info['stream']
-
-            try:
-                logging.info(f"Attempting to play {data.get('title')}")
-
-                # Dynamically create FFMPEG options with atempo filter
-                player_options = FFMPEG_OPTIONS.copy()
-                current_speed = self.playback_speed.get(ctx.guild.id, 1.0)
-                if current_speed != 1.0:
-                    # Ensure 'options' key exists
-                    if 'options' not in player_options:
-                        player_options['options'] = ''
-                    # Add atempo filter, ensuring it's space-separated if other options exist
-                    player_options['options'] += f' -filter:a "atempo={current_speed}"'
-
-
-                # Create the appropriate audio source based on the stream flag
-                if stream:
-                    # Use FFmpegOpusAudio for streaming
-                    player = discord.FFmpegOpusAudio(data['url'], **player_options)
-                else:
-                    # Use FFmpegPCMAudio for non-streaming (fallback)
-                    player = discord.FFmpegPCMAudio(data['url'], **player_options)
-
-                # Apply volume
-                player.volume = self.current_volume.get(ctx.guild.id, 0.5) # Default volume 0.5
-
-                ctx.voice_client.play(player, after=lambda e: self.bot.loop.create_task(self._after_playback(ctx, e)))
-
-                self.current_song[ctx.guild.id] = data # Store the original data
-                self.song_start_time[ctx.guild.id] = time.time()
-                await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name=data.get('title')))
-                logging.info(f"Playing {data.get('title')} in {ctx.guild.name}")
-
-                if ctx.guild.id not in self.nowplaying_tasks or self.nowplaying_tasks[ctx.guild.id].done():
-                    self.nowplaying_tasks[ctx.guild.id] = self.bot.loop.create_task(self._update_nowplaying_message(ctx.guild.id, ctx.channel.id))
-            except Exception as e:
-                logging.error(f"Error playing next song: {e}", exc_info=True)
-                await ctx.send(embed=self.create_embed("Error", f"Could not play the next song: {e}", discord.Color.red()))
-        else:
-            logging.info("Queue is empty, stopping playback.")
-            await self.bot.change_presence(activity=None)
-            self._start_inactivity_timer(ctx.guild.id)
-
-    async def _update_nowplaying_message(self, guild_id, channel_id):
-        logging.info(f"_update_nowplaying_message: Starting task for guild {guild_id}")
-        while True:
-            try:
-                guild = self.bot.get_guild(guild_id)
-                if not guild or not guild.voice_client:
-                    logging.warning(f"_update_nowplaying_message: Bot not in a voice channel for guild {guild_id}. Cancelling task.")
-                    break
-
-                channel = self.bot.get_channel(channel_id)
-                if not channel:
-                    logging.warning(f"_update_nowplaying_message: Channel ({channel_id}) not found. Cancelling task.")
-                    break
-                
-                await self._update_nowplaying_display(guild_id, channel.id, silent_update=True)
-                logging.debug(f"_update_nowplaying_message: Message updated for guild {guild_id}. Stored Message ID: {self.nowplaying_message.get(guild_id).id if self.nowplaying_message.get(guild_id) else 'None'}")
-                await asyncio.sleep(30)  # Update every 30 seconds
-            except asyncio.CancelledError:
-                logging.info(f"_update_nowplaying_message: Task cancelled for {guild_id}")
-                break
-            except Exception as e:
-                logging.error(f"_update_nowplaying_message: Error updating message for guild {guild_id}: {e}", exc_info=True)
-                await asyncio.sleep(5) # Wait before retrying
-
-    async def _update_nowplaying_display(self, guild_id, channel_id, silent_update=False):
-        logging.debug(f"_update_nowplaying_display: Called for guild {guild_id}, channel {channel_id}. Silent: {silent_update}.")
-        guild = self.bot.get_guild(guild_id)
-        channel = self.bot.get_channel(channel_id)
-
-        if not guild or not channel:
-            logging.warning(f"nowplaying_display: Guild ({guild_id}) or channel ({channel_id}) not found. Aborting update.")
-            return
-
-        current_nowplaying_message = self.nowplaying_message.get(guild_id)
-        logging.debug(f"_update_nowplaying_display: Stored message object: {current_nowplaying_message.id if current_nowplaying_message else 'None'}")
-
-        if guild_id in self.current_song and self.current_song[guild_id]:
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            # data is now the raw dictionary from yt-dlp
-            data = self.current_song[guild_id]
-            queue = await self.get_queue(guild_id)
-            
-            current_time = int(time.time() - self.song_start_time[guild_id])
-            # Access duration from the dictionary
-            progress_bar = self._get_progress_bar(current_time, data.get('duration', 0))
-            
-            queue_list = list(queue._queue)
-            # Sum durations from the dictionaries in the queue
-            total_duration = sum(item['data'].get('duration', 0) for item in queue_list if 'data' in item)
-            
-            # Access title, webpage_url, and thumbnail from the dictionary
-            embed = self.create_embed(f"{config.PLAY_EMOJI} Now Playing",
-                                      f"[{data.get('title', 'Unknown Title')}]({data.get('webpage_url', '#')})\n\n{progress_bar} {current_time // 60}:{current_time % 60:02d} / {data.get('duration', 0) // 60}:{data.get('duration', 0) % 60:02d}")
-            embed.add_field(name="Queue", value=f"{len(queue_list)} songs remaining")
-            embed.set_footer(text=f"Total Queue Duration: {total_duration // 60}:{total_duration % 60:02d}")
-            embed.set_thumbnail(url=data.get('thumbnail'))
-            
-            view = discord.ui.View(timeout=None)
-            view.add_item(discord.ui.Button(emoji=config.PLAY_EMOJI, style=discord.ButtonStyle.secondary, custom_id="play"))
-            view.add_item(discord.ui.Button(emoji=config.PAUSE_EMOJI, style=discord.ButtonStyle.secondary, custom_id="pause"))
-            view.add_item(discord.ui.Button(emoji=config.SKIP_EMOJI, style=discord.ButtonStyle.secondary, custom_id="skip"))
-            view.add_item(discord.ui.Button(emoji=config.ERROR_EMOJI, style=discord.ButtonStyle.danger, custom_id="stop"))
-            view.add_item(discord.ui.Button(emoji=config.QUEUE_EMOJI, style=discord.ButtonStyle.primary, custom_id="queue"))
-            
-            if current_nowplaying_message:
-                try:
-                    # Attempt to fetch the message to ensure it still exists and is valid
-                    fetched_message = await channel.fetch_message(current_nowplaying_message.id)
-                    logging.debug(f"nowplaying_display: Fetched message {fetched_message.id} for editing.")
-                    # Access title from the dictionary for logging
-                    await fetched_message.edit(embed=embed, view=view)
-                    self.nowplaying_message[guild_id] = fetched_message # Update reference in case it changed
-                    logging.info(f"nowplaying_display: Edited message {fetched_message.id} for {data.get('title', 'Unknown Title')} in {guild.name}")
-                except discord.NotFound:
-                    logging.warning(f"nowplaying_display: Previous message {current_nowplaying_message.id} not found for editing in {guild.name}. Sending new message.")
-                    self.nowplaying_message[guild_id] = await channel.send(embed=embed, view=view)
-                    # Access title from the dictionary for logging
-                    logging.info(f"nowplaying_display: Sent new message {self.nowplaying_message[guild_id].id} for {data.get('title', 'Unknown Title')} in {guild.name}")
-                except Exception as e:
-                    # Access title from the dictionary for logging
-                    logging.error(f"nowplaying_display: Error editing message {current_nowplaying_message.id} for {data.get('title', 'Unknown Title')} in {guild.name}: {e}", exc_info=True)
-                    # If editing fails for other reasons, try sending a new message
-                    self.nowplaying_message[guild_id] = await channel.send(embed=embed, view=view)
-                    # Access title from the dictionary for logging
-                    logging.info(f"nowplaying_display: Sent new message {self.nowplaying_message[guild_id].id} after edit failure for {data.get('title', 'Unknown Title')} in {guild.name}")
-            else:
-                self.nowplaying_message[guild_id] = await channel.send(embed=embed, view=view)
-                # Access title from the dictionary for logging
-                logging.info(f"nowplaying_display: Sent initial message {self.nowplaying_message[guild_id].id} for {data.get('title', 'Unknown Title')} in {guild.name}")
-        else: # Nothing is playing
-            logging.debug(f"nowplaying_display: Nothing playing for guild {guild_id}. Stored message: {current_nowplaying_message.id if current_nowplaying_message else 'None'}")
-            if current_nowplaying_message:
-                try:
-                    # Attempt to fetch before deleting to avoid NotFound error if already gone
-                    fetched_message = await channel.fetch_message(current_nowplaying_message.id)
-                    logging.debug(f"nowplaying_display: Fetched message {fetched_message.id} for deletion.")
-                    await fetched_message.delete()
-                    del self.nowplaying_message[guild_id]
-                    logging.info(f"nowplaying_display: Deleted previous message {current_nowplaying_message.id} as nothing is playing in {guild.name}")
-                except discord.NotFound:
-                    logging.warning(f"nowplaying_display: Previous message {current_nowplaying_message.id} not found for deletion in {guild.name}. Already gone?")
-                    pass # Message already deleted
-                except Exception as e:
-                    logging.error(f"nowplaying_display: Error deleting message {current_nowplaying_message.id} in {guild.name}: {e}", exc_info=True)
-            
-            # Only send "Not Playing" if not a silent update and no message is currently displayed
-            if not silent_update and not current_nowplaying_message:
-                self.nowplaying_message[guild_id] = await channel.send(embed=self.create_embed("Not Playing", "The bot is not currently playing anything."))
-                logging.info(f"nowplaying_display: Nothing playing in {guild.name}. Sent 'Not Playing' message.")
-            elif silent_update and current_nowplaying_message and current_nowplaying_message.embeds and current_nowplaying_message.embeds[0].title == "Not Playing":
-                # If it's a silent update and the current message is "Not Playing", do nothing to avoid spam
-                logging.debug(f"nowplaying_display: Silent update, and 'Not Playing' message already present for {guild.name}. Skipping.")
-                pass
-            elif silent_update and not current_nowplaying_message:
-                # If it's a silent update and no message is present, do nothing. A new message will be sent when a song starts.
-                logging.debug(f"nowplaying_display: Silent update, no message present for {guild.name}. Skipping sending 'Not Playing'.")
-                pass
-            else:
-                # If it's not a silent update, or if there's an old song message, send a new "Not Playing" message
-                if not silent_update:
-                    self.nowplaying_message[guild_id] = await channel.send(embed=self.create_embed("Not Playing", "The bot is not currently playing anything."))
-                    logging.info(f"nowplaying_display: Nothing playing in {guild.name}. Sent 'Not Playing' message (non-silent or old message).")
-
-    async def _after_playback(self, ctx, error):
-        queue = await self.get_queue(ctx.guild.id)
-        if error:
-            logging.error(f"Player error in {ctx.guild.name}: {error}", exc_info=True)
-            # Optionally, send an error message to the channel
-            # await ctx.send(embed=self.create_embed("Playback Error", f"An error occurred during playback: {error}", discord.Color.red()))
-        
-        # Check if looping is enabled
-        if self.looping.get(ctx.guild.id):
-            # If looping, re-add the current song to the queue
-            current_song_data = self.current_song.get(ctx.guild.id)
-            if current_song_data:
-                await queue.put(current_song_data)
-                logging.info(f"Looping enabled. Re-added {current_song_data.get('title', 'Unknown Title')} to queue.")
-        
-        # Play the next song in the queue
-        await self.play_next(ctx)
-
-        # If queue is empty and not looping, cancel the nowplaying update task
-        if queue.empty() and not self.looping.get(ctx.guild.id):
-            if ctx.guild.id in self.nowplaying_tasks and self.nowplaying_tasks[ctx.guild.id] and not self.nowplaying_tasks[ctx.guild.id].done():
-                self.nowplaying_tasks[ctx.guild.id].cancel()
-                del self.nowplaying_tasks[ctx.guild.id]
-
-    @commands.command(name="volume")
-    async def volume(self, ctx, volume: int):
-        logging.info(f"Volume command invoked by {ctx.author} in {ctx.guild.name} with volume: {volume}")
-        guild_id = ctx.guild.id
-        if not ctx.voice_client or not ctx.voice_client.is_playing():
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Not currently playing anything to set volume for.", discord.Color.red()))
-            return
-
-        if 0 <= volume <= 200:
-            new_volume_float = volume / 100
-            ctx.voice_client.source.volume = new_volume_float
-            self.current_volume[guild_id] = new_volume_float # Store the volume
-            logging.info(f"Volume set to {volume}% in {ctx.guild.name}. Actual source volume: {ctx.voice_client.source.volume}")
-            await ctx.send(embed=self.create_embed("Volume Control", f"{config.SUCCESS_EMOJI} Volume set to {volume}%"))
-        else:
-            logging.warning(f"Invalid volume {volume} provided by {ctx.author} in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Volume must be between 0 and 200.", discord.Color.red()))
-
-    @commands.command(name="nowplaying")
-    async def nowplaying(self, ctx, silent=False):
-        logging.info(f"Nowplaying command invoked by {ctx.author} in {ctx.guild.name} (silent: {silent})")
-        guild_id = ctx.guild.id
-
-        # If invoked by a user, send a new message and store it for future updates
-        if not silent:
-            # Delete previous nowplaying message if it exists
-            if guild_id in self.nowplaying_message and self.nowplaying_message[guild_id]:
-                try:
-                    await self.nowplaying_message[guild_id].delete()
-                    del self.nowplaying_message[guild_id]
-                    logging.info(f"nowplaying: Deleted previous nowplaying message for {ctx.guild.name}")
-                except discord.NotFound:
-                    pass
-                except Exception as e:
-                    logging.error(f"nowplaying: Error deleting old message in {ctx.guild.name}: {e}", exc_info=True)
-
-            # Send a new message and store it
-            if guild_id in self.current_song and self.current_song[guild_id]:
-                data = self.current_song[guild_id]
-                queue = await self.get_queue(ctx.guild.id)
-                current_time = int(time.time() - self.song_start_time[guild_id])
-                progress_bar = self._get_progress_bar(current_time, data.get('duration', 0))
-
-                queue_list = list(queue._queue)
-                total_duration = sum(item['data'].get('duration', 0) for item in queue_list if 'data' in item)
-
-                embed = self.create_embed(f"{config.PLAY_EMOJI} Now Playing",
-                                          f"[{data.get('title', 'Unknown Title')}]({data.get('webpage_url', '#')})\n\n{progress_bar} {current_time // 60}:{current_time % 60:02d} / {data.get('duration', 0) // 60}:{data.get('duration', 0) % 60:02d}")
-                embed.add_field(name="Queue", value=f"{len(queue_list)} songs remaining")
-                embed.set_footer(text=f"Total Queue Duration: {total_duration // 60}:{total_duration % 60:02d}")
-                embed.set_thumbnail(url=data.get('thumbnail'))
-                
-                view = discord.ui.View(timeout=None)
-                view.add_item(discord.ui.Button(emoji=config.PLAY_EMOJI, style=discord.ButtonStyle.secondary, custom_id="play"))
-                view.add_item(discord.ui.Button(emoji=config.PAUSE_EMOJI, style=discord.ButtonStyle.secondary, custom_id="pause"))
-                view.add_item(discord.ui.Button(emoji=config.SKIP_EMOJI, style=discord.ButtonStyle.secondary, custom_id="skip"))
-                view.add_item(discord.ui.Button(emoji=config.ERROR_EMOJI, style=discord.ButtonStyle.danger, custom_id="stop"))
-                view.add_item(discord.ui.Button(emoji=config.QUEUE_EMOJI, style=discord.ButtonStyle.primary, custom_id="queue"))
-                
-                self.nowplaying_message[guild_id] = await ctx.send(embed=embed, view=view)
-                logging.info(f"nowplaying: Sent initial message {self.nowplaying_message[guild_id].id} for {data.get('title', 'Unknown Title')} in {ctx.guild.name}")
-            else:
-                self.nowplaying_message[guild_id] = await ctx.send(embed=self.create_embed("Not Playing", "The bot is not currently playing anything."))
-                logging.info(f"nowplaying: Sent initial 'Not Playing' message for {ctx.guild.name}")
-        
-        # The background task will call _update_nowplaying_display silently
-        # This command itself doesn't need to call it if it just sent a new message
-        # If it was a silent call (from the background task), then _update_nowplaying_display is already called by the task loop
-
-    @commands.command(name="queue")
-    async def queue_info(self, ctx):
-        logging.info(f"Queue command invoked by {ctx.author} in {ctx.guild.name})")
-        queue = await self.get_queue(ctx.guild.id)
-        if not queue.empty():
-            queue_list = list(queue._queue)
-            total_duration = sum(item['data'].get('duration', 0) for item in queue_list if 'data' in item)
-            
-            queue_text = ""
-            for i, item in enumerate(queue_list):
-                queue_text += f"**{i+1}.** {item['data'].get('title', 'Unknown Title')} `({item['data'].get('duration', 0) // 60}:{item['data'].get('duration', 0) % 60:02d})`\n"
-
-            embed = self.create_embed(f"{config.QUEUE_EMOJI} Current Queue", queue_text)
-            embed.set_footer(text=f"Total Duration: {total_duration // 60}:{total_duration % 60:02d}")
-            
-            logging.info(f"Displaying queue with {len(queue_list)} songs for {ctx.guild.name})")
-            await ctx.send(embed=embed)
-        else:
-            logging.info(f"Queue is empty for {ctx.guild.name})")
-            await ctx.send(embed=self.create_embed("Empty Queue", "The queue is currently empty."))
-
-    @commands.command(name="skip")
-    async def skip(self, ctx):
-        logging.info(f"Skip command invoked by {ctx.author} in {ctx.guild.name}")
-        if ctx.voice_client and ctx.voice_client.is_playing():
-            ctx.voice_client.stop()
-            logging.info(f"Song skipped in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Song Skipped", f"{config.SKIP_EMOJI} The current song has been skipped."))
-        else:
-            logging.warning(f"Skip command invoked but nothing is playing in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to skip.", discord.Color.red()))
-
-    @commands.command(name="stop")
-    async def stop(self, ctx):
-        logging.info(f"Stop command invoked by {ctx.author} in {ctx.guild.name}")
-        queue = await self.get_queue(ctx.guild.id)
-        if not queue.empty():
-            while not queue.empty():
-                await queue.get()
-            logging.info(f"Queue cleared in {ctx.guild.name}")
-        if ctx.voice_client:
-            ctx.voice_client.stop()
-            logging.info(f"Voice client stopped in {ctx.guild.name}")
-        
-        # Cancel nowplaying update task
-        if ctx.guild.id in self.nowplaying_tasks and self.nowplaying_tasks[ctx.guild.id] and not self.nowplaying_tasks[ctx.guild.id].done():
-            self.nowplaying_tasks[ctx.guild.id].cancel()
-            del self.nowplaying_tasks[ctx.guild.id]
-
-        await self.bot.change_presence(activity=None)
-        await ctx.send(embed=self.create_embed("Playback Stopped", f"{config.SUCCESS_EMOJI} Music has been stopped and the queue has been cleared."))
-
-    @commands.command(name="pause")
-    async def pause(self, ctx):
-        logging.info(f"Pause command invoked by {ctx.author} in {ctx.guild.name}")
-        if ctx.voice_client and ctx.voice_client.is_playing():
-            ctx.voice_client.pause()
-            logging.info(f"Music paused in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Playback Paused", f"{config.PAUSE_EMOJI} The music has been paused."))
-        else:
-            logging.warning(f"Pause command invoked but nothing is playing or already paused in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No music is currently playing to pause.", discord.Color.red()))
-
-    @commands.command(name="resume")
-    async def resume(self, ctx):
-        logging.info(f"Resume command invoked by {ctx.author} in {ctx.guild.name}")
-        if ctx.voice_client and ctx.voice_client.is_paused():
-            ctx.voice_client.resume()
-            logging.info(f"Music resumed in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Playback Resumed", f"{config.PLAY_EMOJI} The music has been resumed."))
-        else:
-            logging.warning(f"Resume command invoked but nothing is paused or playing in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No music is currently paused to resume.", discord.Color.red()))
-
-    @commands.command(name="clear")
-    async def clear(self, ctx):
-        logging.info(f"Clear command invoked by {ctx.author} in {ctx.guild.name}")
-        queue = await self.get_queue(ctx.guild.id)
-        if not queue.empty():
-            while not queue.empty():
-                await queue.get()
-            logging.info(f"Queue cleared by {ctx.author} in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Queue Cleared", f"{config.SUCCESS_EMOJI} The queue has been cleared."))
-        else:
-            logging.info(f"Clear command invoked but queue already empty in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Empty Queue", "The queue is already empty."))
-
-    
-
-    @commands.command(name="remove")
-    async def remove(self, ctx, number: int):
-        logging.info(f"Remove command invoked by {ctx.author} in {ctx.guild.name} to remove song number {number}")
-        queue = await self.get_queue(ctx.guild.id)
-        if number > 0 and number <= queue.qsize():
-            removed_song = None
-            temp_queue = asyncio.Queue()
-            for i in range(queue.qsize()):
-                song = await queue.get()
-                if i + 1 == number:
-                    removed_song = song
-                else:
-                    await temp_queue.put(song)
-            
-            self.song_queues[ctx.guild.id] = temp_queue
-            
-            if removed_song:
-                logging.info(f"Removed song '{removed_song['data'].get('title', 'Unknown Title')}' (number {number}) from queue in {ctx.guild.name}")
-                await ctx.send(embed=self.create_embed("Song Removed", f"{config.SUCCESS_EMOJI} Removed `{removed_song['data'].get('title', 'Unknown Title')}` from the queue."))
-            else:
-                logging.error(f"Failed to remove song at position {number} from queue in {ctx.guild.name}")
-                await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not find a song at that position.", discord.Color.red()))
-        else:
-            logging.warning(f"Invalid song number {number} provided by {ctx.author} for remove command in {ctx.guild.name}")
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Invalid song number.", discord.Color.red()))
-
-    @commands.command(name="loop")
-    async def loop(self, ctx):
-        logging.info(f"Loop command invoked by {ctx.author} in {ctx.guild.name}")
-        guild_id = ctx.guild.id
-        self.looping[guild_id] = not self.looping.get(guild_id, False)
-        status = "enabled" if self.looping[guild_id] else "disabled"
-        logging.info(f"Looping {status} for {ctx.guild.name}")
-        await ctx.send(embed=self.create_embed("Loop Toggled", f"{config.SUCCESS_EMOJI} Looping is now **{status}**."))
-
-    def _get_current_speed_index(self, guild_id):
-        current_speed = self.playback_speed.get(guild_id, 1.0)
-        try:
-            return self.youtube_speeds.index(current_speed)
-        except ValueError:
-            return self.youtube_speeds.index(1.0) # Default to 1.0 if current speed not in list
-
-    async def _set_speed(self, ctx, new_speed):
-        guild_id = ctx.guild.id
-        if not ctx.voice_client or not ctx.voice_client.is_playing():
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to change speed.", discord.Color.red()))
-            return
-
-        self.playback_speed[guild_id] = new_speed
-        logging.info(f"Setting playback speed to {new_speed} for {ctx.guild.name}")
-
-        # Re-create the player with the new speed
-        guild_id = ctx.guild.id
-        if not ctx.voice_client or not ctx.voice_client.is_playing():
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to change speed.", discord.Color.red()))
-            return
-
-        self.playback_speed[guild_id] = new_speed
-        logging.info(f"Setting playback speed to {new_speed} for {ctx.guild.name}")
-
-        # Re-create the player with the new speed
-        current_song_data = self.current_song.get(guild_id)
-        if current_song_data:
-            # Stop current playback
-            ctx.voice_client.stop()
-
-            try:
-                # Get the original URL from the stored data
-                original_url = current_song_data.get('webpage_url') or current_song_data.get('url')
-                if not original_url:
-                     await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not apply speed change. Original song URL not found.", discord.Color.red()))
-                     return
-
-                # Dynamically create FFMPEG options with atempo filter
-                player_options = FFMPEG_OPTIONS.copy()
-                if new_speed != 1.0:
-                    # Ensure 'options' key exists
-                    if 'options' not in player_options:
-                        player_options['options'] = ''
-                    # Add atempo filter, ensuring it's space-separated if other options exist
-                    player_options['options'] += f' -filter:a "atempo={new_speed}"'
-
-                # Re-fetch the source with the updated FFmpeg options and stream=True
-                # This will create a new FFmpegOpusAudio source with the speed filter
-                new_source_info = await YTDLSource.from_url(original_url, loop=self.bot.loop, stream=True, ytdl_opts=YTDL_FORMAT_OPTIONS.copy())
-
-                if not new_source_info or not isinstance(new_source_info, dict) or 'data' not in new_source_info or 'stream' not in new_source_info:
-                     await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not re-fetch song data to apply speed change.", discord.Color.red()))
-                     return
-
-                new_data = new_source_info['data']
-                is_streaming = new_source_info['stream']
-
-                # Create the new player with the applied speed filter
-                if is_streaming:
-                    player = discord.FFmpegOpusAudio(new_data['url'], **player_options)
-                else:
-                    player = discord.FFmpegPCMAudio(new_data['url'], **player_options)
-
-                # Apply stored volume to the new player
-                player.volume = self.current_volume.get(guild_id, 0.5)
-
-                # Play the new source
-                ctx.voice_client.play(player, after=lambda e: self.bot.loop.create_task(self._after_playback(ctx, e)))
-
-                self.current_song[guild_id] = new_data # Update current song data
-                self.song_start_time[guild_id] = time.time() # Reset start time
-                await ctx.send(embed=self.create_embed("Speed Changed", f"{config.SUCCESS_EMOJI} Playback speed set to **{new_speed}x**. Restarting song to apply."))
-                await self.nowplaying(ctx, silent=True) # Update nowplaying message immediately
-
-            except Exception as e:
-                logging.error(f"Error applying speed change in _set_speed: {e}", exc_info=True)
-                await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not apply speed change: {e}", discord.Color.red()))
-
-        else:
-            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to change speed.", discord.Color.red()))
-
-    @commands.command(name="speedhigher")
-    async def speedhigher(self, ctx):
-        logging.info(f"Speedhigher command invoked by {ctx.author} in {ctx.guild.name}")
-        guild_id = ctx.guild.id
-        current_index = self._get_current_speed_index(guild_id)
-        if current_index < len(self.youtube_speeds) - 1:
-            new_speed = self.youtube_speeds[current_index + 1]
-            await self._set_speed(ctx, new_speed)
-        else:
-            await ctx.send(embed=self.create_embed("Speed Limit", f"{config.ERROR_EMOJI} Already at maximum speed ({self.youtube_speeds[-1]}x).", discord.Color.orange()))
-
-    @commands.command(name="speedlower")
-    async def speedlower(self, ctx):
-        logging.info(f"Speedlower command invoked by {ctx.author} in {ctx.guild.name}")
-        guild_id = ctx.guild.id
-        current_index = self._get_current_speed_index(guild_id)
-        if current_index > 0:
-            new_speed = self.youtube_speeds[current_index - 1]
-            await self._set_speed(ctx, new_speed)
-        else:
-            await ctx.send(embed=self.create_embed("Speed Limit", f"{config.ERROR_EMOJI} Already at minimum speed ({self.youtube_speeds[0]}x).", discord.Color.orange()))
-
-    @commands.command(name="shuffle")
-    async def shuffle(self, ctx):
-        logging.info(f"Shuffle command invoked by {ctx.author} in {ctx.guild.name}")
-        queue = await self.get_queue(ctx.guild.id)
-        if queue.empty():
-            await ctx.send(embed=self.create_embed("Empty Queue", f"{config.ERROR_EMOJI} The queue is empty, nothing to shuffle.", discord.Color.orange()))
-            return
-
-        # Get all items from the queue
-        queue_list = []
-        while not queue.empty():
-            queue_list.append(await queue.get())
-
-        # Shuffle the list
-        random.shuffle(queue_list)
-
-        # Put items back into the queue
-        for item in queue_list:
-            await queue.put(item)
-        
-        logging.info(f"Queue shuffled for {ctx.guild.name}")
-        await ctx.send(embed=self.create_embed("Queue Shuffled", f"{config.SUCCESS_EMOJI} The queue has been shuffled."))
-
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction):
-        if interaction.type == discord.InteractionType.component:
-            custom_id = interaction.data["custom_id"]
-            logging.info(f"Interaction received: {custom_id} by {interaction.user} in {interaction.guild.name}")
-            ctx = await self.bot.get_context(interaction.message)
-            if custom_id == "play":
-                await self.resume(ctx)
-            elif custom_id == "pause":
-                await self.pause(ctx)
-            elif custom_id == "resume":
-                await self.resume(ctx)
-            elif custom_id == "skip":
-                await self.skip(ctx)
-            elif custom_id == "stop":
-                await self.stop(ctx)
-            elif custom_id == "queue":
-                queue = await self.get_queue(ctx.guild.id)
-                if not queue.empty():
-                    queue_list = "\n".join(f"**{i+1}.** {item['data'].get('title', 'Unknown Title')}" for i, item in enumerate(list(queue._queue)))
-                    embed = self.create_embed(f"{config.QUEUE_EMOJI} Current Queue", queue_list)
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                else:
-                    embed = self.create_embed("Empty Queue", "The queue is currently empty.")
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                return  # Exit early as we've already responded
-            await interaction.response.defer()
-
-async def setup(bot):
-    try:
-        await bot.add_cog(Music(bot))
-    except Exception as e:
-        logging.error(f"Failed to load music cog: {e}", exc_info=True)
+import asyncio
+import discord
+from discord.ext import commands
+import logging
+import time
+import os
+import shutil
+from collections import OrderedDict
+
+import config
+from utils.speeds import get_youtube_service
+from utils.resolution_cache import normalize_key
+
+from .youtube import YTDLSource, FFMPEG_OPTIONS, YTDL_FORMAT_OPTIONS, EXTRACTION_SCHEDULER, AUDIO_CACHE, LOUDNESS
+from .extraction import ExtractionCancelled
+from .guild_player import GuildPlayer
+from .queuebuffer import TrackQueue
+from .player_snapshots import PlayerSnapshots
+from .prefetcher import Prefetcher
+from .nowplaying import NowPlayingUpdater, NowPlayingControls
+from .track import Track
+from .audio_source import TrackedAudioSource, atempo_filter, volume_filter
+
+QUEUE_PAGE_SIZE = 10 # Songs shown per page of ?queue
+SEARCH_RESULTS_GUILDS = 100 # Guilds whose last ?search results are kept for ?play <number>
+NO_QUEUE = TrackQueue() # Stands in for the queue of guilds without a player; never added to
+
+class Music(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.players = {} # guild_id -> GuildPlayer, only for guilds that use the bot
+        self.search_results = OrderedDict() # guild_id -> (title, video id) pairs of its last ?search, oldest first
+        self.youtube_speeds = [0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0]
+        self.nowplaying_updater = NowPlayingUpdater(self)
+        self.snapshots = PlayerSnapshots(self)
+        # Registered once, so the buttons of every now-playing message (including ones sent
+        # before a restart) are routed to it by custom_id
+        self.controls = NowPlayingControls(self)
+        bot.add_view(self.controls)
+
+    async def cog_load(self):
+        if config.LOUDNESS_NORMALIZATION:
+            # Read the stored gains in the background; playback waits for them before its first song
+            self.bot.loop.create_task(LOUDNESS.load())
+        if self.bot.is_ready(): # Reloaded while running, so on_ready will not come again
+            self.bot.loop.create_task(self.snapshots.restore())
+
+    def cog_unload(self):
+        # Save every player's state before tearing the players down, so the next start resumes them
+        self.snapshots.stop()
+        self.snapshots.flush_now()
+        EXTRACTION_SCHEDULER.shutdown()
+        self.nowplaying_updater.shutdown()
+        self.controls.stop()
+        for guild_id in list(self.players):
+            self._teardown(guild_id)
+
+    def get_player(self, guild_id):
+        """
+        Returns the guild's player, creating it on first use. Only paths that start playback call this;
+        the others read self.players so idle guilds cost nothing.
+        """
+        player = self.players.get(guild_id)
+        if player is None:
+            player = self.players[guild_id] = GuildPlayer(guild_id)
+        return player
+
+    def _teardown(self, guild_id):
+        """Stops everything running for a guild and forgets its player."""
+        player = self.players.pop(guild_id, None)
+        if player:
+            player.teardown()
+            logging.info(f"Tore down the player of guild {guild_id}")
+        self.search_results.pop(guild_id, None)
+        self.nowplaying_updater.forget(guild_id)
+        EXTRACTION_SCHEDULER.cancel(guild_id)
+
+    async def get_queue(self, guild_id):
+        """Returns the guild's queue, or an empty stand-in if it has no player. Songs are added through get_player()."""
+        player = self.players.get(guild_id)
+        return player.queue if player else NO_QUEUE
+
+    def _current_track(self, guild_id):
+        player = self.players.get(guild_id)
+        return player.current if player else None
+
+    def create_embed(self, title, description, color=discord.Color.blurple(), **kwargs):
+        embed = discord.Embed(title=title, description=description, color=color)
+        for key, value in kwargs.items():
+            embed.add_field(name=key, value=value, inline=False)
+        return embed
+
+    def _get_progress_bar(self, current_time, total_duration, bar_length=20):
+        if total_duration == 0:
+            return "━━━━━━━━━━━━"  # Default empty bar
+
+        progress = (current_time / total_duration)
+        filled_length = int(bar_length * progress)
+        bar = "━" * filled_length + "●" + "━" * (bar_length - filled_length - 1)
+        return bar
+
+    async def _disconnect_if_idle(self, guild_id):
+        player = self.players.get(guild_id)
+        if player:
+            player.inactivity_timer = None
+        guild = self.bot.get_guild(guild_id)
+        if guild and guild.voice_client and not guild.voice_client.is_playing():
+            await guild.voice_client.disconnect()
+            logging.info(f"Bot disconnected from voice channel in {guild.name} due to inactivity.")
+
+    def _start_inactivity_timer(self, guild_id):
+        player = self.get_player(guild_id)
+        player.cancel_inactivity_timer()
+        player.inactivity_timer = self.bot.loop.call_later(600, lambda: asyncio.ensure_future(self._disconnect_if_idle(guild_id)))
+
+    def _expire_resume_point(self, guild_id):
+        """Tears down a player whose resume point was never picked up with ?resume."""
+        player = self.players.get(guild_id)
+        if player:
+            player.inactivity_timer = None
+        if player and player.resume_point:
+            logging.info(f"Resume point of guild {guild_id} expired")
+            self._teardown(guild_id)
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        if member.id == self.bot.user.id and before.channel and not after.channel:
+            player = self.players.get(member.guild.id)
+            if player and player.current:
+                # Remember where the bot was cut off so ?resume can pick the song up at the same spot;
+                # the queue is kept for that, everything running in the background is stopped
+                position = player.position
+                player.resume_point = (player.current, position)
+                player.finish()
+                player.stop_background()
+                self.nowplaying_updater.forget(member.guild.id)
+                # The player is only kept for a while; the timer is cancelled when playback starts again
+                player.inactivity_timer = self.bot.loop.call_later(config.RESUME_POINT_TTL, self._expire_resume_point, member.guild.id)
+                logging.info(f"Saved resume point for {player.resume_point[0].title} at {position:.1f}s in {member.guild.name}")
+            else:
+                self._teardown(member.guild.id)
+            return
+
+        # Drop pending extractions of users who leave the bot's voice channel
+        voice_client = member.guild.voice_client
+        if member.bot or not voice_client or before.channel != voice_client.channel or after.channel == before.channel:
+            return
+        cancelled = EXTRACTION_SCHEDULER.cancel(member.guild.id, requester=member.id)
+        if cancelled:
+            logging.info(f"Cancelled {cancelled} pending extraction(s) for {member} who left the voice channel in {member.guild.name}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.snapshots.restore()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self._teardown(guild.id)
+
+    @commands.command(name="join")
+    async def join(self, ctx):
+        logging.info(f"Join command invoked by {ctx.author} in {ctx.guild.name}")
+        if not ctx.author.voice:
+            logging.warning(f"User {ctx.author} not in a voice channel when trying to join.")
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You are not connected to a voice channel.", discord.Color.red()))
+        if ctx.voice_client:
+            await ctx.voice_client.move_to(ctx.author.voice.channel)
+            logging.info(f"Bot moved to voice channel {ctx.author.voice.channel} in {ctx.guild.name}")
+        else:
+            await ctx.author.voice.channel.connect()
+            logging.info(f"Bot joined voice channel {ctx.author.voice.channel} in {ctx.guild.name}")
+        await ctx.send(embed=self.create_embed("Joined Channel", f"{config.SUCCESS_EMOJI} Joined `{ctx.author.voice.channel}`"))
+
+    @commands.command(name="leave")
+    async def leave(self, ctx):
+        logging.info(f"Leave command invoked by {ctx.author} in {ctx.guild.name}")
+        if ctx.voice_client:
+            # An explicit leave is not an interruption, so no resume point is kept
+            self._teardown(ctx.guild.id)
+            await ctx.voice_client.disconnect()
+            logging.info(f"Bot disconnected from voice channel in {ctx.guild.name}")
+
+            # Clear the yt-dlp cache
+            if os.path.exists("yt_dlp_cache"):
+                shutil.rmtree("yt_dlp_cache")
+                os.makedirs("yt_dlp_cache")
+                logging.info("Cleared the yt-dlp cache.")
+
+            await ctx.send(embed=self.create_embed("Left Channel", f"{config.SUCCESS_EMOJI} Successfully disconnected from the voice channel."))
+        else:
+            logging.warning(f"Leave command invoked but bot not in a voice channel in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} I am not currently in a voice channel.", discord.Color.red()))
+
+    @commands.command(name="search")
+    async def search(self, ctx, *, query):
+        logging.info(f"Search command invoked by {ctx.author} in {ctx.guild.name} with query: {query}")
+        if not config.YOUTUBE_API_KEY:
+            logging.error("YouTube API key is not set.")
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} YouTube API key is not set.", discord.Color.red()))
+        try:
+            youtube_service = get_youtube_service(config.YOUTUBE_API_KEY)
+            search_response = youtube_service.search().list(q=query, part="snippet", maxResults=10, type="video").execute()
+            
+            if not search_response:
+                logging.warning(f"YouTube API returned empty response for query: {query}")
+                return await ctx.send(embed=self.create_embed("Search Error", "The YouTube API returned an empty response. Please check your API key.", discord.Color.red()))
+
+            videos = [(item["snippet"]["title"], item["id"]["videoId"]) for item in search_response.get("items", [])]
+            if not videos:
+                logging.info(f"No videos found for query: {query}")
+                return await ctx.send(embed=self.create_embed("No Results", f"{config.ERROR_EMOJI} No songs found for your query.", discord.Color.orange()))
+            self.search_results[ctx.guild.id] = videos
+            self.search_results.move_to_end(ctx.guild.id)
+            while len(self.search_results) > SEARCH_RESULTS_GUILDS:
+                self.search_results.popitem(last=False)
+            response = "\n".join(f"**{i+1}.** {title}" for i, (title, _) in enumerate(videos))
+            logging.info(f"Found {len(videos)} search results for query: {query}")
+            await ctx.send(embed=self.create_embed("Search Results", response))
+        except Exception as e:
+            logging.error(f"Error in search command for query '{query}': {e}")
+            await ctx.send(embed=self.create_embed("Search Error", f"An error occurred: {e}", discord.Color.red()))
+
+    @commands.command(name="play")
+    async def play(self, ctx, *, query):
+        logging.info(f"--- Play command initiated by {ctx.author} ---")
+        
+        # 1. Acknowledge and ensure bot is in a voice channel
+        await ctx.send(embed=self.create_embed("Processing", f"{config.QUEUE_EMOJI} Fetching your request..."))
+        
+        if not ctx.author.voice:
+            logging.warning("User not in a voice channel.")
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You must be in a voice channel to play music.", discord.Color.red()))
+
+        if not ctx.voice_client:
+            logging.info("Bot not in a voice channel, attempting to join.")
+            await ctx.author.voice.channel.connect()
+        
+        logging.info(f"Bot is in voice channel: {ctx.voice_client.channel}")
+        
+        queue = self.get_player(ctx.guild.id).queue
+        
+        try:
+            # 2. Determine URL and playlist status
+            search_results = self.search_results.get(ctx.guild.id)
+            if query.isdigit() and search_results:
+                url = f"https://www.youtube.com/watch?v={search_results[int(query) - 1][1]}"
+            else:
+                url = query
+
+            if 'start_radio=' in url:
+                url = url.split('&start_radio=')[0]
+                
+            ytdl_opts = YTDL_FORMAT_OPTIONS.copy()
+            is_playlist = 'list=' in url or 'playlist' in url
+            ytdl_opts['noplaylist'] = True # Always treat as single song
+            
+            logging.info(f"Processing URL: {url} (Is Playlist: {is_playlist})")
+
+            # 3. Fetch songs in a non-blocking way
+            logging.info("Calling YTDLSource.from_url...")
+            # Pass stream=True to get a streamable source directly
+            result = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True, ytdl_opts=ytdl_opts, requester=ctx.author.id, guild_id=ctx.guild.id)
+            logging.info(f"YTDLSource.from_url returned. Fetched {len(result) if isinstance(result, list) else 1} song(s).")
+
+            if not result:
+                return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch any songs. Please check the URL or search query.", discord.Color.red()))
+
+            # 4. Queue the fetched track(s) directly
+            # YTDLSource.from_url returns a list of Tracks for playlists and search
+            # results, or a single Track.
+            if isinstance(result, list):
+                # It's a playlist or search result
+                playable_songs = [track for track in result if track.url]
+                unplayable_songs = [track for track in result if not track.url]
+
+                logging.info(f"Found {len(playable_songs)} playable and {len(unplayable_songs)} unplayable songs.")
+
+                if not playable_songs:
+                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No playable songs found.", discord.Color.red()))
+
+                for track in playable_songs:
+                    await queue.put(track)
+
+                # Use the title of the first playable song's data for the confirmation message
+                first_song_title = playable_songs[0].title
+                if len(playable_songs) > 1:
+                    await ctx.send(embed=self.create_embed("Playlist Added", f"{config.SUCCESS_EMOJI} Added {len(playable_songs)} songs to the queue."))
+                else:
+                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{first_song_title}` to the queue."))
+
+                if unplayable_songs:
+                    unplayable_titles = [track.title for track in unplayable_songs]
+                    await ctx.send(embed=self.create_embed("Unplayable Songs", f"{config.ERROR_EMOJI} Skipped {len(unplayable_songs)} unplayable songs:\n- " + "\n- ".join(unplayable_titles), discord.Color.orange()))
+
+            else:
+                # It's a single track
+                if result.url:
+                    await queue.put(result)
+                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{result.title}` to the queue."))
+                else:
+                    await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch the song.", discord.Color.red()))
+
+
+        except ExtractionCancelled:
+            logging.info(f"Play command: Extraction for {ctx.author} cancelled in {ctx.guild.name}")
+            return
+        except Exception as e:
+            logging.error(f"Error in play command: {e}", exc_info=True)
+            await ctx.send(embed=self.create_embed("Error", f"An unexpected error occurred: {e}", discord.Color.red()))
+
+        # 6. Start playback
+        if not ctx.voice_client.is_playing() and not queue.empty():
+            logging.info("Voice client is not playing and queue is not empty. Calling play_next.")
+            await self.play_next(ctx)
+        else:
+            logging.info("Voice client is already playing or queue is empty.")
+            self._get_prefetcher(ctx.guild.id).poke()
+
+    @commands.command(name="playlist")
+    async def playlist(self, ctx, *, query):
+        logging.info(f"--- Playlist command initiated by {ctx.author} ---")
+        
+        # 1. Acknowledge and ensure bot is in a voice channel
+        await ctx.send(embed=self.create_embed("Processing", f"{config.QUEUE_EMOJI} Fetching your playlist..."))
+        
+        if not ctx.author.voice:
+            logging.warning("User not in a voice channel.")
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You must be in a voice channel to play music.", discord.Color.red()))
+
+        if not ctx.voice_client:
+            logging.info("Bot not in a voice channel, attempting to join.")
+            await ctx.author.voice.channel.connect()
+        
+        logging.info(f"Bot is in voice channel: {ctx.voice_client.channel}")
+        
+        queue = self.get_player(ctx.guild.id).queue
+        
+        try:
+            # 2. Determine URL and playlist status
+            search_results = self.search_results.get(ctx.guild.id)
+            if query.isdigit() and search_results:
+                url = f"https://www.youtube.com/watch?v={search_results[int(query) - 1][1]}"
+            else:
+                url = query
+
+            if 'start_radio=' in url:
+                url = url.split('&start_radio=')[0]
+                
+            ytdl_opts = YTDL_FORMAT_OPTIONS.copy()
+            is_playlist = 'list=' in url or 'playlist' in url
+            ytdl_opts['noplaylist'] = not is_playlist
+            if is_playlist:
+                logging.info(f"Processing URL: {url} (Is Playlist: {is_playlist})")
+
+            if is_playlist:
+                # Stream the playlist into the queue: enumerate the first page of flat entries,
+                # start playing right away and load the rest in the background
+                first_page = await YTDLSource.from_playlist(url, loop=self.bot.loop, end=config.PLAYLIST_FIRST_PAGE, ytdl_opts=ytdl_opts, requester=ctx.author.id, guild_id=ctx.guild.id)
+                logging.info(f"Playlist command: Enumerated {len(first_page)} entries from the first page of {url}")
+                if not first_page:
+                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No playable songs found.", discord.Color.red()))
+
+                for track in first_page:
+                    await queue.put(track)
+                await ctx.send(embed=self.create_embed("Playlist Added", f"{config.SUCCESS_EMOJI} Added {len(first_page)} songs to the queue."))
+
+                if len(first_page) >= config.PLAYLIST_FIRST_PAGE:
+                    player = self.get_player(ctx.guild.id)
+                    player.cancel_playlist_task()
+                    player.playlist_task = self.bot.loop.create_task(self._expand_playlist(ctx, url, ytdl_opts))
+
+                if not ctx.voice_client.is_playing():
+                    await self.play_next(ctx)
+                else:
+                    self._get_prefetcher(ctx.guild.id).poke()
+                return
+
+            # 3. Fetch songs in a non-blocking way
+            logging.info(f"Playlist command: Calling YTDLSource.from_url with URL: {url}")
+            # Pass stream=True to get a streamable source directly
+            result = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True, ytdl_opts=ytdl_opts, requester=ctx.author.id, guild_id=ctx.guild.id)
+            logging.info(f"Playlist command: YTDLSource.from_url returned. Fetched {len(result) if isinstance(result, list) else 1} potential songs.")
+
+            if not result:
+                return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch any songs. Please check the URL or search query.", discord.Color.red()))
+
+            # 4. Queue the fetched track(s) directly
+            # YTDLSource.from_url returns a list of Tracks for playlists and search
+            # results, or a single Track.
+            if isinstance(result, list):
+                # It's a playlist or search result
+                playable_songs = [track for track in result if track.url]
+                unplayable_songs = [track for track in result if not track.url]
+
+                logging.info(f"Playlist command: Found {len(playable_songs)} playable and {len(unplayable_songs)} unplayable songs.")
+
+                if unplayable_songs:
+                    unplayable_titles = [track.title for track in unplayable_songs]
+                    logging.warning(f"Playlist command: Unplayable songs found: {unplayable_titles}")
+
+                if not playable_songs:
+                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No playable songs found.", discord.Color.red()))
+
+                for track in playable_songs:
+                    await queue.put(track)
+
+                # Use the title of the first playable song for the confirmation message
+                first_song_title = playable_songs[0].title
+                if len(playable_songs) > 1:
+                    await ctx.send(embed=self.create_embed("Playlist Added", f"{config.SUCCESS_EMOJI} Added {len(playable_songs)} songs to the queue."))
+                else:
+                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{first_song_title}` to the queue."))
+
+                if unplayable_songs:
+                    unplayable_titles = [track.title for track in unplayable_songs]
+                    await ctx.send(embed=self.create_embed("Unplayable Songs", f"{config.ERROR_EMOJI} Skipped {len(unplayable_songs)} unplayable songs:\n- " + "\n- ".join(unplayable_titles), discord.Color.orange()))
+
+            else:
+                # It's a single track
+                if result.url:
+                    await queue.put(result)
+                    await ctx.send(embed=self.create_embed("Song Added", f"{config.QUEUE_EMOJI} Added `{result.title}` to the queue."))
+                else:
+                    await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not fetch the song.", discord.Color.red()))
+
+        except ExtractionCancelled:
+            logging.info(f"Playlist command: Extraction for {ctx.author} cancelled in {ctx.guild.name}")
+            return
+        except Exception as e:
+            logging.error(f"Error in playlist command: {e}", exc_info=True)
+            await ctx.send(embed=self.create_embed("Error", f"An unexpected error occurred: {e}", discord.Color.red()))
+
+        # 6. Start playback
+        if not ctx.voice_client.is_playing() and not queue.empty():
+            logging.info("Voice client is not playing and queue is not empty. Calling play_next.")
+            await self.play_next(ctx)
+        else:
+            logging.info("Voice client is already playing or queue is empty.")
+            self._get_prefetcher(ctx.guild.id).poke()
+
+    async def _expand_playlist(self, ctx, url, ytdl_opts):
+        """Enumerates the rest of a playlist in the background and appends it to the queue."""
+        try:
+            remaining = await YTDLSource.from_playlist(url, loop=self.bot.loop, start=config.PLAYLIST_FIRST_PAGE + 1, ytdl_opts=ytdl_opts, requester=ctx.author.id, guild_id=ctx.guild.id)
+            player = self.players.get(ctx.guild.id)
+            if player is None:
+                return # The bot left while the playlist was loading
+            queue = player.queue
+            for track in remaining:
+                await queue.put(track)
+            logging.info(f"Playlist expansion: Added {len(remaining)} more entries from {url} in {ctx.guild.name}")
+            if remaining:
+                await ctx.send(embed=self.create_embed("Playlist Loaded", f"{config.SUCCESS_EMOJI} Added {len(remaining)} more songs to the queue."))
+                self._get_prefetcher(ctx.guild.id).poke()
+        except asyncio.CancelledError:
+            logging.info(f"Playlist expansion cancelled for {ctx.guild.name}")
+        except Exception as e:
+            logging.error(f"Error expanding playlist {url}: {e}", exc_info=True)
+        finally:
+            player = self.players.get(ctx.guild.id)
+            if player and player.playlist_task is asyncio.current_task():
+                player.playlist_task = None
+
+    async def _resolve_song(self, track, guild_id, min_ttl=0, queue=None):
+        """
+        Makes sure a track has a stream URL that stays valid for at least min_ttl seconds,
+        resolving placeholders and re-extracting stale URLs. Returns False if it is unplayable.
+        Pass the queue the track is still sitting in so its total duration stays accurate.
+        """
+        if track.url and (not track.webpage_url or track.time_left() > min_ttl):
+            return True
+        try:
+            resolved = await YTDLSource.from_url(track.webpage_url, loop=self.bot.loop, stream=True, ytdl_opts=YTDL_FORMAT_OPTIONS.copy(), min_url_ttl=min_ttl, guild_id=guild_id)
+        except Exception as e:
+            logging.warning(f"Could not resolve {track.title}: {e}")
+            return track.is_resolved
+        if isinstance(resolved, Track) and resolved.url:
+            if queue is not None:
+                queue.adjust_duration(track, resolved.duration - track.duration)
+            track.update_from(resolved)
+            return True
+        return track.is_resolved
+
+    def time_remaining(self, guild_id):
+        """Seconds until the current song ends, 0 if nothing is playing, None if unknown (e.g. live streams)."""
+        player = self.players.get(guild_id)
+        return player.time_remaining() if player else 0
+
+    def playback_position(self, guild_id):
+        """Seconds into the current song, counted from the audio frames actually sent."""
+        player = self.players.get(guild_id)
+        return player.position if player else 0
+
+    def _resume_playback(self, voice_client, guild_id):
+        """
+        Resumes a paused song, switching to the source a speed or volume change prepared while it
+        was paused (see _restart_at).
+        """
+        guild_player = self.players.get(guild_id)
+        pending = guild_player.pending_source if guild_player else None
+        if pending is None:
+            voice_client.resume()
+            return
+        guild_player.pending_source = None
+        old_source = voice_client.source
+        voice_client.source = pending # Setting the source also resumes playback
+        guild_player.source = pending
+        self.bot.loop.call_later(1, old_source.cleanup)
+
+    def _get_prefetcher(self, guild_id):
+        player = self.get_player(guild_id)
+        if player.prefetcher is None:
+            player.prefetcher = Prefetcher(self, guild_id)
+        return player.prefetcher
+
+    def _has_cached_audio(self, track):
+        return AUDIO_CACHE.contains(normalize_key(track.webpage_url))
+
+    def _playback_input(self, track, count_play=True):
+        """
+        Returns what ffmpeg should read for a track, the before_options that go with it and
+        whether that input is already 48 kHz Opus: the local file if the audio cache has one,
+        otherwise the stream URL. Streamed plays are counted so frequently played tracks get
+        cached in the background.
+        """
+        cache_key = normalize_key(track.webpage_url)
+        cached_path = AUDIO_CACHE.lookup(cache_key) if cache_key else None
+        if cached_path:
+            logging.info(f"Playing {track.title} from the audio cache")
+            return cached_path, '', True # The cache always stores 48 kHz Opus
+        if count_play:
+            AUDIO_CACHE.note_play(cache_key, track.url, track.duration, is_opus=track.is_opus, loop=self.bot.loop)
+        return track.url, FFMPEG_OPTIONS['before_options'], track.is_opus
+
+    def _analyze_loudness(self, track):
+        """Starts a background loudness measurement of a resolved track that was not measured yet."""
+        if config.LOUDNESS_NORMALIZATION and track.url:
+            LOUDNESS.analyze(normalize_key(track.webpage_url), track.url, track.duration,
+                             before_options=FFMPEG_OPTIONS['before_options'], loop=self.bot.loop)
+
+    def _build_player(self, track, guild_id, position=0, speed=None, volume=None, count_play=True):
+        """
+        Creates the position-tracking ffmpeg source for a track at the guild's speed and volume,
+        starting `position` seconds in. Both, and the track's loudness normalization gain, are
+        applied in ffmpeg's filter graph, so no per-frame work happens in Python.
+        """
+        guild_player = self.get_player(guild_id)
+        speed = speed or guild_player.speed
+        volume = guild_player.volume if volume is None else volume
+        if config.LOUDNESS_NORMALIZATION:
+            volume *= LOUDNESS.gain(normalize_key(track.webpage_url))
+            if count_play:
+                self._analyze_loudness(track) # Unmeasured songs are normalized from their next play on
+        player_options = FFMPEG_OPTIONS.copy()
+        filters = [f for f in (atempo_filter(speed), volume_filter(volume)) if f]
+        if filters:
+            player_options['options'] += f' -filter:a "{",".join(filters)}"'
+        source, before_options, is_opus = self._playback_input(track, count_play=count_play)
+        if position > 0:
+            # Input seeking, so ffmpeg skips straight to the position instead of decoding up to it
+            before_options = f"-ss {position:.3f} {before_options}".strip()
+        player_options['before_options'] = before_options
+        # Opus input with no filters is remuxed packet for packet (-c:a copy) instead of being
+        # decoded and re-encoded
+        if is_opus and not filters:
+            player_options['codec'] = 'opus'
+            logging.debug(f"Using Opus passthrough for {track.title}")
+        return TrackedAudioSource(discord.FFmpegOpusAudio(source, **player_options), start=position, speed=speed)
+
+    async def play_next(self, ctx):
+        logging.info("play_next called.")
+        async with self.get_player(ctx.guild.id).play_lock:
+            await self._play_next(ctx)
+
+    async def _play_next(self, ctx):
+        if not ctx.voice_client:
+            logging.warning("play_next called but the bot is not connected to voice.")
+            return
+        if ctx.voice_client.is_playing():
+            logging.warning("play_next called but audio is already playing.")
+            return
+            
+        queue = await self.get_queue(ctx.guild.id)
+        track = None
+        while not queue.empty() and ctx.voice_client:
+            candidate = await queue.get()
+            # Lazily queued playlist entries and expired stream URLs are resolved when they reach the
+            # play head if the prefetcher has not already done it; cached tracks need no URL at all
+            if self._has_cached_audio(candidate) or await self._resolve_song(candidate, ctx.guild.id, min_ttl=candidate.duration + config.PREFETCH_URL_MARGIN):
+                track = candidate
+                break
+            title = candidate.title
+            logging.warning(f"Skipping unplayable song {title} in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Unplayable Song", f"{config.ERROR_EMOJI} Skipped `{title}`.", discord.Color.orange()))
+
+        if track:
+            try:
+                await self._start_playback(ctx, track)
+            except Exception as e:
+                logging.error(f"Error playing next song: {e}", exc_info=True)
+                await ctx.send(embed=self.create_embed("Error", f"Could not play the next song: {e}", discord.Color.red()))
+        else:
+            logging.info("Queue is empty, stopping playback.")
+            self.get_player(ctx.guild.id).finish()
+            await self.bot.change_presence(activity=None)
+            self._start_inactivity_timer(ctx.guild.id)
+
+    async def _start_playback(self, ctx, track, position=0):
+        """Starts playing a track, optionally `position` seconds in."""
+        logging.info(f"Attempting to play {track.title}")
+        if config.LOUDNESS_NORMALIZATION:
+            await LOUDNESS.load() # Returns at once after the first song; the gains must be known by then
+
+        # Create the ffmpeg source with the guild's speed and volume applied
+        player = self._build_player(track, ctx.guild.id, position=position)
+
+        ctx.voice_client.play(player, after=lambda e: self.bot.loop.create_task(self._after_playback(ctx, e)))
+
+        guild_player = self.get_player(ctx.guild.id)
+        guild_player.finish() # Drops a source still prepared for the previous song
+        guild_player.current = track
+        guild_player.source = player
+        guild_player.text_channel_id = ctx.channel.id
+        guild_player.resume_point = None
+        guild_player.cancel_inactivity_timer()
+        await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name=track.title))
+        logging.info(f"Playing {track.title} in {ctx.guild.name}")
+
+        self.nowplaying_updater.track(ctx.guild.id, ctx.channel.id)
+        self._get_prefetcher(ctx.guild.id).poke()
+
+    async def _nowplaying_embed(self, guild_id):
+        """Renders the now-playing embed for a guild, or returns None if nothing is playing."""
+        player = self.players.get(guild_id)
+        track = player.current if player else None
+        if not track:
+            return None
+        queue = player.queue
+        current_time = int(self.playback_position(guild_id))
+        progress_bar = self._get_progress_bar(current_time, track.duration)
+        total_duration = queue.total_duration
+
+        voice_client = self.bot.get_guild(guild_id).voice_client if self.bot.get_guild(guild_id) else None
+        title = f"{config.PAUSE_EMOJI} Paused" if voice_client and voice_client.is_paused() else f"{config.PLAY_EMOJI} Now Playing"
+        embed = self.create_embed(title,
+                                  f"[{track.title}]({track.webpage_url or '#'})\n\n{progress_bar} {current_time // 60}:{current_time % 60:02d} / {track.duration // 60}:{track.duration % 60:02d}")
+        embed.add_field(name="Queue", value=f"{len(queue)} songs remaining")
+        embed.set_footer(text=f"Total Queue Duration: {total_duration // 60}:{total_duration % 60:02d}")
+        embed.set_thumbnail(url=track.thumbnail)
+        return embed
+
+    def _nowplaying_view(self):
+        return self.controls
+
+    async def _queue_embed(self, guild_id):
+        """Renders the first page of a guild's queue."""
+        queue = await self.get_queue(guild_id)
+        if queue.empty():
+            return self.create_embed("Empty Queue", "The queue is currently empty.")
+        queue_list = "\n".join(f"**{i+1}.** {item.title}" for i, item in enumerate(queue[:QUEUE_PAGE_SIZE]))
+        if len(queue) > QUEUE_PAGE_SIZE:
+            queue_list += f"\n...and {len(queue) - QUEUE_PAGE_SIZE} more"
+        return self.create_embed(f"{config.QUEUE_EMOJI} Current Queue", queue_list)
+
+    async def _after_playback(self, ctx, error):
+        if error:
+            logging.error(f"Player error in {ctx.guild.name}: {error}", exc_info=True)
+            # Optionally, send an error message to the channel
+            # await ctx.send(embed=self.create_embed("Playback Error", f"An error occurred during playback: {error}", discord.Color.red()))
+        player = self.players.get(ctx.guild.id)
+        if player is None:
+            return # The guild's player was torn down (the bot left), so there is nothing to continue
+        queue = player.queue
+
+        # Check if looping is enabled
+        if player.looping:
+            # If looping, re-add the current song to the queue
+            current_track = player.current
+            if current_track:
+                await queue.put(current_track)
+                logging.info(f"Looping enabled. Re-added {current_track.title} to queue.")
+        
+        # Play the next song in the queue
+        await self.play_next(ctx)
+
+        # If nothing is playing now, stop updating the nowplaying message. An empty queue alone
+        # does not mean that: play_next may just have started its last song.
+        if player.current is None:
+            self.nowplaying_updater.untrack(ctx.guild.id)
+
+    @commands.command(name="volume")
+    async def volume(self, ctx, volume: int):
+        logging.info(f"Volume command invoked by {ctx.author} in {ctx.guild.name} with volume: {volume}")
+        guild_id = ctx.guild.id
+        if 0 <= volume <= 200:
+            new_volume_float = volume / 100
+            if ctx.voice_client and (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()) and self._current_track(guild_id):
+                # Restart ffmpeg at the current position with the new volume filter; the
+                # resolved stream URL is reused, so this costs no re-extraction. A paused song
+                # keeps waiting and resumes with the new volume
+                try:
+                    if not await self._restart_at(ctx, self.playback_position(guild_id), volume=new_volume_float):
+                        return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not change the volume. The song's stream URL is no longer available.", discord.Color.red()))
+                except Exception as e:
+                    logging.error(f"Error applying volume change in {ctx.guild.name}: {e}", exc_info=True)
+                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not change the volume: {e}", discord.Color.red()))
+            else:
+                player = self.players.get(guild_id)
+                if player:
+                    player.volume = new_volume_float # Applied when the next song starts
+            logging.info(f"Volume set to {volume}% in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Volume Control", f"{config.SUCCESS_EMOJI} Volume set to {volume}%"))
+        else:
+            logging.warning(f"Invalid volume {volume} provided by {ctx.author} in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Volume must be between 0 and 200.", discord.Color.red()))
+
+    @commands.command(name="nowplaying")
+    async def nowplaying(self, ctx, silent=False):
+        logging.info(f"Nowplaying command invoked by {ctx.author} in {ctx.guild.name} (silent: {silent})")
+        guild_id = ctx.guild.id
+
+        # If invoked by a user, send a new message and store it for future updates
+        if not silent:
+            # Delete previous nowplaying message if it exists
+            player = self.players.get(guild_id)
+            if player and player.nowplaying_message:
+                try:
+                    await player.nowplaying_message.delete()
+                    player.nowplaying_message = None
+                    logging.info(f"nowplaying: Deleted previous nowplaying message for {ctx.guild.name}")
+                except discord.NotFound:
+                    pass
+                except Exception as e:
+                    logging.error(f"nowplaying: Error deleting old message in {ctx.guild.name}: {e}", exc_info=True)
+
+            # Send a new message and store it; the updater keeps editing it from now on
+            embed = await self._nowplaying_embed(guild_id)
+            if embed:
+                message = await ctx.send(embed=embed, view=self._nowplaying_view())
+                self.nowplaying_updater.message_sent(guild_id, message, embed)
+                logging.info(f"nowplaying: Sent initial message {message.id} for {self._current_track(guild_id).title} in {ctx.guild.name}")
+            else:
+                message = await ctx.send(embed=self.create_embed("Not Playing", "The bot is not currently playing anything."))
+                self.nowplaying_updater.message_sent(guild_id, message, None)
+                logging.info(f"nowplaying: Sent initial 'Not Playing' message for {ctx.guild.name}")
+        else:
+            # Let the updater bring the existing message up to date on its next turn
+            self.nowplaying_updater.refresh(guild_id)
+
+    @commands.command(name="queue")
+    async def queue_info(self, ctx, page: int = 1):
+        logging.info(f"Queue command invoked by {ctx.author} in {ctx.guild.name})")
+        queue = await self.get_queue(ctx.guild.id)
+        if not queue.empty():
+            total_duration = queue.total_duration
+            pages = (len(queue) + QUEUE_PAGE_SIZE - 1) // QUEUE_PAGE_SIZE
+            page = min(max(page, 1), pages)
+            start = (page - 1) * QUEUE_PAGE_SIZE
+            
+            queue_text = ""
+            for i, item in enumerate(queue[start:start + QUEUE_PAGE_SIZE], start=start):
+                queue_text += f"**{i+1}.** {item.title} `({item.duration // 60}:{item.duration % 60:02d})`\n"
+
+            embed = self.create_embed(f"{config.QUEUE_EMOJI} Current Queue", queue_text)
+            embed.set_footer(text=f"Page {page}/{pages} | {len(queue)} songs | Total Duration: {total_duration // 60}:{total_duration % 60:02d}")
+            
+            logging.info(f"Displaying queue page {page}/{pages} with {len(queue)} songs for {ctx.guild.name})")
+            await ctx.send(embed=embed)
+        else:
+            logging.info(f"Queue is empty for {ctx.guild.name})")
+            await ctx.send(embed=self.create_embed("Empty Queue", "The queue is currently empty."))
+
+    @commands.command(name="skip")
+    async def skip(self, ctx):
+        logging.info(f"Skip command invoked by {ctx.author} in {ctx.guild.name}")
+        if ctx.voice_client and ctx.voice_client.is_playing():
+            ctx.voice_client.stop()
+            logging.info(f"Song skipped in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Song Skipped", f"{config.SKIP_EMOJI} The current song has been skipped."))
+        else:
+            logging.warning(f"Skip command invoked but nothing is playing in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to skip.", discord.Color.red()))
+
+    async def _stop(self, guild):
+        """Clears the queue, stops the player and cancels the guild's background work."""
+        queue = await self.get_queue(guild.id)
+        if not queue.empty():
+            queue.clear()
+            logging.info(f"Queue cleared in {guild.name}")
+        if guild.voice_client:
+            guild.voice_client.stop()
+            logging.info(f"Voice client stopped in {guild.name}")
+
+        player = self.players.get(guild.id)
+        if player:
+            player.stop_background()
+            player.resume_point = None
+        self.nowplaying_updater.untrack(guild.id)
+        EXTRACTION_SCHEDULER.cancel(guild.id)
+
+        await self.bot.change_presence(activity=None)
+
+    @commands.command(name="stop")
+    async def stop(self, ctx):
+        logging.info(f"Stop command invoked by {ctx.author} in {ctx.guild.name}")
+        await self._stop(ctx.guild)
+        await ctx.send(embed=self.create_embed("Playback Stopped", f"{config.SUCCESS_EMOJI} Music has been stopped and the queue has been cleared."))
+
+    @commands.command(name="pause")
+    async def pause(self, ctx):
+        logging.info(f"Pause command invoked by {ctx.author} in {ctx.guild.name}")
+        if ctx.voice_client and ctx.voice_client.is_playing():
+            ctx.voice_client.pause()
+            logging.info(f"Music paused in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Playback Paused", f"{config.PAUSE_EMOJI} The music has been paused."))
+        else:
+            logging.warning(f"Pause command invoked but nothing is playing or already paused in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No music is currently playing to pause.", discord.Color.red()))
+
+    @commands.command(name="resume")
+    async def resume(self, ctx):
+        logging.info(f"Resume command invoked by {ctx.author} in {ctx.guild.name}")
+        player = self.players.get(ctx.guild.id)
+        if ctx.voice_client and ctx.voice_client.is_paused():
+            self._resume_playback(ctx.voice_client, ctx.guild.id)
+            logging.info(f"Music resumed in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Playback Resumed", f"{config.PLAY_EMOJI} The music has been resumed."))
+        elif player and player.resume_point and not (ctx.voice_client and ctx.voice_client.is_playing()):
+            # The bot was disconnected mid-song; rejoin and continue where it was cut off
+            if not ctx.voice_client:
+                if not ctx.author.voice:
+                    return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} You must be in a voice channel to resume the music.", discord.Color.red()))
+                await ctx.author.voice.channel.connect()
+            track, position = player.resume_point
+            player.resume_point = None
+            if not self._has_cached_audio(track) and not await self._resolve_song(track, ctx.guild.id, min_ttl=track.duration - position + config.PREFETCH_URL_MARGIN):
+                return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not resume `{track.title}`, its stream is no longer available.", discord.Color.red()))
+            await self._start_playback(ctx, track, position=position)
+            logging.info(f"Resumed {track.title} at {position:.1f}s after a disconnect in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Playback Resumed", f"{config.PLAY_EMOJI} Resumed `{track.title}` at {int(position) // 60}:{int(position) % 60:02d}."))
+        else:
+            logging.warning(f"Resume command invoked but nothing is paused or playing in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No music is currently paused to resume.", discord.Color.red()))
+
+    @commands.command(name="clear")
+    async def clear(self, ctx):
+        logging.info(f"Clear command invoked by {ctx.author} in {ctx.guild.name}")
+        queue = await self.get_queue(ctx.guild.id)
+        if not queue.empty():
+            queue.clear()
+            logging.info(f"Queue cleared by {ctx.author} in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Queue Cleared", f"{config.SUCCESS_EMOJI} The queue has been cleared."))
+        else:
+            logging.info(f"Clear command invoked but queue already empty in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Empty Queue", "The queue is already empty."))
+
+    
+
+    @commands.command(name="remove")
+    async def remove(self, ctx, number: int):
+        logging.info(f"Remove command invoked by {ctx.author} in {ctx.guild.name} to remove song number {number}")
+        queue = await self.get_queue(ctx.guild.id)
+        if number > 0 and number <= queue.qsize():
+            removed_song = queue.remove(number - 1)
+            self._get_prefetcher(ctx.guild.id).poke()
+            
+            if removed_song:
+                logging.info(f"Removed song '{removed_song.title}' (number {number}) from queue in {ctx.guild.name}")
+                await ctx.send(embed=self.create_embed("Song Removed", f"{config.SUCCESS_EMOJI} Removed `{removed_song.title}` from the queue."))
+            else:
+                logging.error(f"Failed to remove song at position {number} from queue in {ctx.guild.name}")
+                await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not find a song at that position.", discord.Color.red()))
+        else:
+            logging.warning(f"Invalid song number {number} provided by {ctx.author} for remove command in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Invalid song number.", discord.Color.red()))
+
+    @commands.command(name="move")
+    async def move(self, ctx, source: int, destination: int):
+        logging.info(f"Move command invoked by {ctx.author} in {ctx.guild.name} to move song {source} to {destination}")
+        queue = await self.get_queue(ctx.guild.id)
+        if 0 < source <= len(queue) and 0 < destination <= len(queue):
+            queue.move(source - 1, destination - 1)
+            self._get_prefetcher(ctx.guild.id).poke()
+            moved_song = queue[destination - 1]
+            logging.info(f"Moved song '{moved_song.title}' from {source} to {destination} in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Song Moved", f"{config.SUCCESS_EMOJI} Moved `{moved_song.title}` to position {destination}."))
+        else:
+            logging.warning(f"Invalid positions {source} -> {destination} provided by {ctx.author} for move command in {ctx.guild.name}")
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Invalid song number.", discord.Color.red()))
+
+    @commands.command(name="loop")
+    async def loop(self, ctx):
+        logging.info(f"Loop command invoked by {ctx.author} in {ctx.guild.name}")
+        player = self.players.get(ctx.guild.id)
+        if not player or not player.current:
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to loop.", discord.Color.red()))
+        player.looping = not player.looping
+        status = "enabled" if player.looping else "disabled"
+        logging.info(f"Looping {status} for {ctx.guild.name}")
+        await ctx.send(embed=self.create_embed("Loop Toggled", f"{config.SUCCESS_EMOJI} Looping is now **{status}**."))
+
+    def _get_current_speed_index(self, guild_id):
+        player = self.players.get(guild_id)
+        current_speed = player.speed if player else 1.0
+        try:
+            return self.youtube_speeds.index(current_speed)
+        except ValueError:
+            return self.youtube_speeds.index(1.0) # Default to 1.0 if current speed not in list
+
+    async def _restart_at(self, ctx, position, speed=None, volume=None):
+        """
+        Restarts the current song at `position` seconds (optionally with a new speed or volume)
+        without re-extracting it or interrupting playback. Returns False if the stream is no
+        longer available. The new speed and volume are kept for the following songs either way.
+        """
+        guild_id = ctx.guild.id
+        guild_player = self.get_player(guild_id)
+        current_track = guild_player.current
+        speed = speed or guild_player.speed
+        volume = guild_player.volume if volume is None else volume
+        start = time.perf_counter()
+
+        # Reuse the already resolved stream URL; it is only re-extracted if it would expire
+        # before the rest of the song has been played
+        if not self._has_cached_audio(current_track):
+            remaining = max(0, current_track.duration - position) / speed
+            if not await self._resolve_song(current_track, guild_id, min_ttl=remaining + config.PREFETCH_URL_MARGIN):
+                return False
+
+        # Start ffmpeg at the position with the filters and wait for its first packet
+        # while the old source keeps playing
+        player = self._build_player(current_track, guild_id, position=position, speed=speed, volume=volume, count_play=False)
+        await self.bot.loop.run_in_executor(None, player.prime)
+
+        guild_player.speed = speed
+        guild_player.volume = volume
+        voice_client = ctx.voice_client
+        if not voice_client or not (voice_client.is_playing() or voice_client.is_paused()) or guild_player.current is not current_track:
+            # The song ended or was skipped while the new source was starting; the new
+            # settings still apply from the next song on
+            player.cleanup()
+            return True
+        if voice_client.is_paused():
+            # Swapping the source would resume playback, so the new one waits for _resume_playback
+            if guild_player.pending_source:
+                guild_player.pending_source.cleanup()
+            guild_player.pending_source = player
+            logging.info(f"Prepared {current_track.title} at {position:.1f}s ({speed}x, {volume:.0%} volume) to play on resume in {ctx.guild.name}")
+            return True
+
+        # Swap the source in place. Unlike stop() + play() this does not fire the after-callback,
+        # which would start the next song.
+        old_source = voice_client.source
+        voice_client.source = player
+        guild_player.source = player
+        # The player thread may still be inside the old source's read(), so stop its ffmpeg a moment later
+        self.bot.loop.call_later(1, old_source.cleanup)
+        self._get_prefetcher(guild_id).poke() # The song now ends at a different time
+        logging.info(f"Restarted {current_track.title} at {position:.1f}s ({speed}x, {volume:.0%} volume) in {(time.perf_counter() - start) * 1000:.0f} ms for {ctx.guild.name}")
+        return True
+
+    async def _set_speed(self, ctx, new_speed):
+        guild_id = ctx.guild.id
+        if not ctx.voice_client or not ctx.voice_client.is_playing() or not self._current_track(guild_id):
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to change speed.", discord.Color.red()))
+            return
+
+        position = self.playback_position(guild_id)
+        logging.info(f"Setting playback speed to {new_speed} at {position:.1f}s for {ctx.guild.name}")
+        try:
+            if not await self._restart_at(ctx, position, speed=new_speed):
+                await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not apply speed change. The song's stream URL is no longer available.", discord.Color.red()))
+                return
+            await ctx.send(embed=self.create_embed("Speed Changed", f"{config.SUCCESS_EMOJI} Playback speed set to **{new_speed}x**."))
+            await self.nowplaying(ctx, silent=True) # Update nowplaying message immediately
+        except Exception as e:
+            logging.error(f"Error applying speed change in _set_speed: {e}", exc_info=True)
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not apply speed change: {e}", discord.Color.red()))
+
+    @commands.command(name="seek")
+    async def seek(self, ctx, position: str):
+        """Jumps to a position in the current song, e.g. `1:30`, `90`, `+15` or `-10`."""
+        logging.info(f"Seek command invoked by {ctx.author} in {ctx.guild.name} with position: {position}")
+        guild_id = ctx.guild.id
+        track = self._current_track(guild_id)
+        if not ctx.voice_client or not ctx.voice_client.is_playing() or not track:
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} No song is currently playing to seek in.", discord.Color.red()))
+
+        try:
+            relative = position[0] in '+-'
+            seconds = 0
+            for part in position.lstrip('+-').split(':'):
+                seconds = seconds * 60 + int(part)
+            if relative:
+                seconds = self.playback_position(guild_id) + (seconds if position[0] == '+' else -seconds)
+        except ValueError:
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Invalid position. Use `1:30`, `90`, `+15` or `-10`.", discord.Color.red()))
+
+        seconds = max(0, seconds)
+        if track.duration and seconds >= track.duration:
+            return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} That is past the end of the song.", discord.Color.red()))
+
+        try:
+            if not await self._restart_at(ctx, seconds):
+                return await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not seek. The song's stream URL is no longer available.", discord.Color.red()))
+            seconds = int(seconds)
+            await ctx.send(embed=self.create_embed("Seeked", f"{config.SUCCESS_EMOJI} Jumped to {seconds // 60}:{seconds % 60:02d}."))
+            await self.nowplaying(ctx, silent=True)
+        except Exception as e:
+            logging.error(f"Error seeking in {ctx.guild.name}: {e}", exc_info=True)
+            await ctx.send(embed=self.create_embed("Error", f"{config.ERROR_EMOJI} Could not seek: {e}", discord.Color.red()))
+
+    @commands.command(name="speedhigher")
+    async def speedhigher(self, ctx):
+        logging.info(f"Speedhigher command invoked by {ctx.author} in {ctx.guild.name}")
+        guild_id = ctx.guild.id
+        current_index = self._get_current_speed_index(guild_id)
+        if current_index < len(self.youtube_speeds) - 1:
+            new_speed = self.youtube_speeds[current_index + 1]
+            await self._set_speed(ctx, new_speed)
+        else:
+            await ctx.send(embed=self.create_embed("Speed Limit", f"{config.ERROR_EMOJI} Already at maximum speed ({self.youtube_speeds[-1]}x).", discord.Color.orange()))
+
+    @commands.command(name="speedlower")
+    async def speedlower(self, ctx):
+        logging.info(f"Speedlower command invoked by {ctx.author} in {ctx.guild.name}")
+        guild_id = ctx.guild.id
+        current_index = self._get_current_speed_index(guild_id)
+        if current_index > 0:
+            new_speed = self.youtube_speeds[current_index - 1]
+            await self._set_speed(ctx, new_speed)
+        else:
+            await ctx.send(embed=self.create_embed("Speed Limit", f"{config.ERROR_EMOJI} Already at minimum speed ({self.youtube_speeds[0]}x).", discord.Color.orange()))
+
+    @commands.command(name="shuffle")
+    async def shuffle(self, ctx):
+        logging.info(f"Shuffle command invoked by {ctx.author} in {ctx.guild.name}")
+        queue = await self.get_queue(ctx.guild.id)
+        if queue.empty():
+            await ctx.send(embed=self.create_embed("Empty Queue", f"{config.ERROR_EMOJI} The queue is empty, nothing to shuffle.", discord.Color.orange()))
+            return
+
+        queue.shuffle()
+        self._get_prefetcher(ctx.guild.id).poke()
+        
+        logging.info(f"Queue shuffled for {ctx.guild.name}")
+        await ctx.send(embed=self.create_embed("Queue Shuffled", f"{config.SUCCESS_EMOJI} The queue has been shuffled."))
+
+async def setup(bot):
+    try:
+        await bot.add_cog(Music(bot))
+    except Exception as e:
+        logging.error(f"Failed to load music cog: {e}", exc_info=True)
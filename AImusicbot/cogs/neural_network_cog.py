@@ -1,215 +1,440 @@
-import logging
-import os
-import time
-import requests
-import discord
-from discord.ext import commands
-from transformers import AutoTokenizer, AutoModelForCausalLM # Import only necessary classes
-import torch
-from utils.db_utils import save_learned_data, load_learned_data # Import database functions
-
-class AIModelManager:
-    """
-    A class to handle the loading and operation of a local text generation AI model.
-    Includes persistent learning from command inputs using a database.
-    """
-    def __init__(self):
-        self.model = None
-        self.tokenizer = None
-        self.device = 'cpu'
-        # Initialize the database before loading learned data
-        from utils.db_utils import initialize_db
-        initialize_db()
-        self.learned_info = load_learned_data() # Load learned information from the database
-        logging.info(f"Initialized AIModelManager with {len(self.learned_info)} learned items.")
-        self.load_model()
-
-    def load_model(self):
-        """Loads the default text generation model."""
-        logging.info("Attempting to load text generation AI model...")
-
-        # Load a text generation model (e.g., gpt2)
-        # Replace "gpt2" with the model name you want to use (e.g., a MiniGPT variant if compatible)
-        try:
-            model_name = "gpt2"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-
-            if torch.cuda.is_available():
-                 self.model.to('cuda')
-                 self.device = 'gpu'
-                 logging.info(f"Successfully loaded text generation model '{model_name}' on GPU.")
-            else:
-                 self.device = 'cpu'
-                 logging.info(f"Successfully loaded text generation model '{model_name}' on CPU.")
-
-            # Add a padding token if the tokenizer doesn't have one (common for GPT-like models)
-            if self.tokenizer.pad_token is None:
-                 self.tokenizer.pad_token = self.tokenizer.eos_token
-                 self.model.config.pad_token_id = self.model.config.eos_token_id
-
-
-        except Exception as e:
-            logging.error(f"Failed to load text generation model '{model_name}': {e}", exc_info=True)
-            self.model = None
-            self.tokenizer = None
-
-
-        logging.info(f"Finished loading model. Model loaded: {'gpt2' if self.model else 'None'}")
-
-
-    def process_command(self, command_name, *args):
-        """
-        Processes a command using the loaded text generation model.
-        Crafts prompts based on the command and includes learned information.
-        Stores input from commands for learning.
-        """
-        if not self.model or not self.tokenizer:
-            return "AI model is not loaded."
-
-        prompt = ""
-        max_length = 150 # Default max length for generated text
-        input_text_to_learn = "" # Store the input text for learning
-
-        # Construct input_text_to_learn based on the command
-        if command_name == 'ask':
-            question = args[0] if args else ""
-            context = args[1] if len(args) > 1 else ""
-            input_text_to_learn = f"Question: {question}"
-            if context:
-                 input_text_to_learn += f"\nContext: {context}"
-
-            # Include learned info and provided context in the prompt for 'ask'
-            learned_context = "\n".join(self.learned_info)
-            prompt = f"Based on the following information and the context provided, answer the question.\n\nInformation I know:\n{learned_context}\n\nContext: {context}\n\nQuestion: {question}\n\nAnswer:"
-            max_length = 250 # Allow longer answers with context and learned info
-
-        elif command_name == 'summarize':
-             text = args[0] if args else ""
-             input_text_to_learn = f"Summarize: {text}"
-             # Include learned info in the prompt for summarization
-             learned_context = "\n".join(self.learned_info)
-             prompt = f"Based on the following information, summarize the text.\n\nInformation I know:\n{learned_context}\n\nText to summarize:\n{text}\n\nSummary:"
-             max_length = 150 # Summaries should be concise, but can be influenced by learned info
-
-        elif command_name == 'jokeplease':
-            # For jokes, the input is just the command itself, but we can still add it
-            input_text_to_learn = "Command: jokeplease"
-            # Include learned info in the prompt for jokes
-            learned_context = "\n".join(self.learned_info)
-            prompt = f"Based on the following information, tell a short, funny joke.\n\nInformation I know:\n{learned_context}\n\nTell me a short, funny joke:\n\nJoke:"
-            max_length = 100 # Jokes should be short
-
-        else:
-            return "Unknown AI command."
-
-        # Add the input text to learned info (simple approach)
-        if input_text_to_learn:
-             self.learned_info.append(input_text_to_learn)
-             # Keep the learned_info list from growing too large (optional, but recommended)
-             if len(self.learned_info) > 20: # Limit to last 20 pieces of info
-                 self.learned_info = self.learned_info[-20:]
-
-
-        logging.info(f"Generating text for command '{command_name}' with prompt: '{prompt[:100]}...'")
-        start_time = time.time()
-
-        try:
-            inputs = self.tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=1024)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            # Generate text
-            output_sequences = self.model.generate(
-                inputs['input_ids'],
-                max_length=max_length + len(inputs['input_ids'][0]), # max_length is total length
-                num_return_sequences=1,
-                no_repeat_ngram_size=2,
-                do_sample=True,
-                top_k=50,
-                top_p=0.95,
-                temperature=0.7,
-                pad_token_id=self.tokenizer.pad_token_id # Use pad_token_id for generation
-            )
-
-            end_time = time.time()
-            inference_time = end_time - start_time
-            logging.info(f"Text generation inference time: {inference_time:.4f} seconds.")
-
-
-            generated_text = self.tokenizer.decode(output_sequences[0], skip_special_tokens=True)
-
-            # Clean up the generated text (remove the prompt)
-            if generated_text.startswith(prompt):
-                 generated_text = generated_text[len(prompt):].strip()
-
-            return generated_text if generated_text else "Could not generate a response."
-
-        except Exception as e:
-            logging.error(f"Error during '{command_name}' command processing: {e}", exc_info=True)
-            return "An error occurred while processing your request."
-
-
-    def is_ready(self):
-        """Check if the model is loaded."""
-        return self.model is not None and self.tokenizer is not None
-
-
-class NeuralNetworkCog(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.ai_manager = AIModelManager()
-        # Initialize the database when the cog is loaded
-        from utils.db_utils import initialize_db
-        initialize_db()
-
-
-    def cog_unload(self):
-        """Saves learned data to the database when the cog is unloaded."""
-        logging.info("Saving learned data before unloading NeuralNetworkCog.")
-        save_learned_data(self.ai_manager.learned_info)
-
-
-    @commands.command(name='ask', help='Ask the AI a question. Optionally provide context after the question.')
-    async def ask(self, ctx, *, args):
-        """Asks the AI a question."""
-        # Split args into question and optional context
-        parts = args.split('|', 1)
-        question = parts[0].strip()
-        context = parts[1].strip() if len(parts) > 1 else ""
-
-        if not self.ai_manager.is_ready():
-            await ctx.send("AI model is not loaded yet. Please try again later.")
-            return
-
-        await ctx.send("Thinking...")
-        # Pass question and context to process_command
-        response = self.ai_manager.process_command('ask', question, context)
-        await ctx.send(response)
-
-    @commands.command(name='summarize', help='Summarize the provided text.')
-    async def summarize(self, ctx, *, text):
-        """Summarizes the provided text."""
-        if not self.ai_manager.is_ready():
-            await ctx.send("AI model is not loaded yet. Please try again later.")
-            return
-
-        await ctx.send("Summarizing...")
-        # Pass text to process_command
-        response = self.ai_manager.process_command('summarize', text)
-        await ctx.send(response)
-
-    @commands.command(name='jokeplease', help='Ask the AI for a joke.')
-    async def jokeplease(self, ctx):
-        """Asks the AI for a joke."""
-        if not self.ai_manager.is_ready():
-            await ctx.send("AI model is not loaded yet. Please try again later.")
-            return
-
-        await ctx.send("Attempting to generate a joke...")
-        # Call process_command for jokeplease
-        response = self.ai_manager.process_command('jokeplease')
-        await ctx.send(response)
-
-
-async def setup(bot):
-    await bot.add_cog(NeuralNetworkCog(bot))
+import asyncio
+import logging
+import os
+import time
+import requests
+import discord
+from discord.ext import commands
+import config
+from utils.ai_backends import create_backend
+from utils.db_utils import save_learned_data, load_learned_data # Import database functions
+from utils.inference_service import InferenceService, InferenceBusy, InferenceTimeout
+from .ai_context import ContextBuilder
+
+
+class AIModelManager:
+    """
+    A class to handle the loading and operation of a local text generation AI model.
+    Includes persistent learning from command inputs using a database.
+    The model is not loaded on construction: load_model() blocks for a long time (a first run
+    downloads it), so the cog runs it in the background and reports `state` and `progress`.
+    """
+    NOT_LOADED, LOADING, READY, FAILED = 'not loaded', 'loading', 'ready', 'failed'
+
+    def __init__(self):
+        self.backend = None # The loaded utils.ai_backends backend
+        self.tokenizer = None
+        self.context = None # ContextBuilder, created with the tokenizer
+        self.max_positions = 1024 # Longest sequence (prompt + generated tokens) the model accepts
+        self.device = 'cpu'
+        self.state = self.NOT_LOADED
+        self.progress = "" # The loading step in progress, or why loading failed
+        self.load_started = None
+        self.load_seconds = None
+        # Initialize the database before loading learned data
+        from utils.db_utils import initialize_db
+        initialize_db()
+        self.learned_info = load_learned_data() # Load learned information from the database
+        logging.info(f"Initialized AIModelManager with {len(self.learned_info)} learned items.")
+
+    def _report(self, message):
+        self.progress = message
+        logging.info(f"AIModelManager: {message}")
+
+    def load_model(self, should_stop=None):
+        """
+        Loads the text generation model with the backend chosen in the config.
+        This blocks until the model is loaded; `should_stop` is checked once it is, so a cog that
+        was unloaded in the meantime does not end up with a model nobody uses.
+        """
+        logging.info(f"Attempting to load text generation AI model with the '{config.AI_BACKEND}' backend...")
+        self.state = self.LOADING
+        self.load_started = time.time()
+        self.load_seconds = None
+
+        try:
+            backend = create_backend(
+                config.AI_BACKEND, model_name=config.AI_MODEL_NAME, gguf_path=config.AI_GGUF_MODEL_PATH,
+                prefix_cache_entries=config.AI_PREFIX_CACHE_ENTRIES if config.AI_PREFIX_CACHE else 0,
+                threads=config.AI_THREADS, context_length=config.AI_LLAMA_CONTEXT_LENGTH,
+                gpu_layers=config.AI_LLAMA_GPU_LAYERS, cache_bytes=config.AI_LLAMA_CACHE_BYTES
+            )
+            backend.load(progress=self._report)
+            if should_stop and should_stop():
+                logging.info("AIModelManager: Loading was cancelled, discarding the model.")
+                self.state = self.NOT_LOADED
+                return
+            self.load_seconds = time.time() - self.load_started
+            logging.info(f"Successfully loaded text generation model with the '{backend.name}' backend on {backend.device.upper()} in {self.load_seconds:.1f} seconds.")
+            self.backend = backend
+            self.tokenizer = backend.tokenizer
+            self.max_positions = backend.max_positions
+            self.device = backend.device
+            self.context = ContextBuilder(self.tokenizer, budget=config.AI_CONTEXT_TOKENS, relevant_budget=config.AI_RELEVANT_CONTEXT_TOKENS,
+                                          refresh_items=config.AI_CONTEXT_REFRESH_ITEMS)
+            self.state = self.READY
+            self.progress = ""
+
+        except Exception as e:
+            logging.error(f"Failed to load text generation model with the '{config.AI_BACKEND}' backend: {e}", exc_info=True)
+            self.backend = None
+            self.tokenizer = None
+            self.state = self.FAILED
+            self.progress = str(e)
+
+
+        logging.info(f"Finished loading model. Model loaded: {self.backend.name if self.backend else 'None'}")
+
+
+    def build_prompt(self, command_name, *args):
+        """
+        Crafts the prompt for a command, including the learned information most relevant to it,
+        and stores the command's input for learning.
+        Returns (prompt token IDs, max_new_tokens), or None for an unknown command.
+        """
+        prompt_text = query = ""
+        max_length = 150 # Default max length for generated text
+        input_text_to_learn = "" # Store the input text for learning
+
+        # Construct input_text_to_learn based on the command
+        if command_name == 'ask':
+            question = args[0] if args else ""
+            context = args[1] if len(args) > 1 else ""
+            input_text_to_learn = f"Question: {question}"
+            if context:
+                 input_text_to_learn += f"\nContext: {context}"
+
+            # Include learned info and provided context in the prompt for 'ask'
+            prompt_text = f"\nBased on the information above and the context provided, answer the question.\n\nContext: {context}\n\nQuestion: {question}\n\nAnswer:"
+            query = f"{question} {context}"
+            max_length = 250 # Allow longer answers with context and learned info
+
+        elif command_name == 'summarize':
+             text = args[0] if args else ""
+             input_text_to_learn = f"Summarize: {text}"
+             # Include learned info in the prompt for summarization
+             prompt_text = f"\nBased on the information above, summarize the text.\n\nText to summarize:\n{text}\n\nSummary:"
+             query = text
+             max_length = 150 # Summaries should be concise, but can be influenced by learned info
+
+        elif command_name == 'jokeplease':
+            # For jokes, the input is just the command itself, but we can still add it
+            input_text_to_learn = "Command: jokeplease"
+            # Include learned info in the prompt for jokes; with no query the most recent items are used
+            prompt_text = "\nBased on the information above, tell me a short, funny joke:\n\nJoke:"
+            max_length = 100 # Jokes should be short
+
+        else:
+            return None
+
+        # Learned items are picked before this command's own input is added to them
+        prompt = self.context.build(self.learned_info, prompt_text, query, self.max_positions - max_length)
+
+        # Add the input text to learned info (simple approach)
+        if input_text_to_learn:
+             self.learned_info.append(input_text_to_learn)
+             # Keep the learned_info list from growing too large (optional, but recommended)
+             if len(self.learned_info) > 20: # Limit to last 20 pieces of info
+                 self.learned_info = self.learned_info[-20:]
+
+        return prompt, max_length
+
+    def generate_batch(self, prompts, max_new_tokens, should_stop=None):
+        """
+        Generates a response for each Prompt with the loaded backend; the torch backends run the
+        whole batch in a single model.generate call. `should_stop` returns a flag per prompt
+        (or one for all of them); prompts whose caller gave up stop generating at the next token.
+        This blocks for the whole generation, so the cog runs it on the InferenceService worker thread.
+        """
+        if not self.is_ready():
+            return ["AI model is not loaded."] * len(prompts)
+
+        logging.info(f"Generating text for {len(prompts)} prompt(s) of {', '.join(str(len(prompt.ids)) for prompt in prompts)} tokens")
+        start_time = time.time()
+
+        try:
+            responses = self.backend.generate_batch(prompts, max_new_tokens, should_stop=should_stop)
+
+            end_time = time.time()
+            inference_time = end_time - start_time
+            logging.info(f"Text generation inference time: {inference_time:.4f} seconds for {len(prompts)} prompt(s).")
+
+            return [response if response else "Could not generate a response." for response in responses]
+
+        except Exception as e:
+            logging.error(f"Error during text generation for {len(prompts)} prompt(s): {e}", exc_info=True)
+            return ["An error occurred while processing your request."] * len(prompts)
+
+    def generate_stream(self, prompt, max_new_tokens, on_text, should_stop=None):
+        """
+        Generates a response for one Prompt like generate_batch, but passes every new piece of text
+        to on_text (on the calling thread) as soon as it is decoded. Returns the whole response.
+        """
+        if not self.is_ready():
+            return "AI model is not loaded."
+
+        logging.info(f"Streaming text for a prompt of {len(prompt.ids)} tokens")
+        start_time = time.time()
+
+        try:
+            response = self.backend.generate_stream(prompt, max_new_tokens, on_text, should_stop=should_stop)
+
+            inference_time = time.time() - start_time
+            logging.info(f"Text generation inference time: {inference_time:.4f} seconds for a streamed prompt.")
+
+            return response if response else "Could not generate a response."
+
+        except Exception as e:
+            logging.error(f"Error during streamed text generation: {e}", exc_info=True)
+            return "An error occurred while processing your request."
+
+    def process_command(self, command_name, *args, should_stop=None):
+        """
+        Processes a command using the loaded text generation model, on its own.
+        Crafts prompts based on the command and includes learned information.
+        Stores input from commands for learning.
+        """
+        if not self.is_ready():
+            return "AI model is not loaded."
+        prepared = self.build_prompt(command_name, *args)
+        if prepared is None:
+            return "Unknown AI command."
+        prompt, max_new_tokens = prepared
+        return self.generate_batch([prompt], max_new_tokens, should_stop=should_stop)[0]
+
+
+    def is_ready(self):
+        """Check if the model is loaded."""
+        return self.backend is not None and self.context is not None
+
+
+class StreamedReply:
+    """
+    Shows a response in one Discord message while it is being generated.
+    add() collects the text as it arrives and a background task edits the message with
+    everything received so far: right away for the first words, then at most once every
+    `interval` seconds, so a long answer costs a handful of edits instead of one per token
+    and stays within Discord's per-channel rate limit. finish() shows the final text.
+    """
+    LIMIT = 2000 # Characters in a Discord message
+
+    def __init__(self, message, interval=1.0):
+        self.message = message
+        self.interval = interval
+        self.text = ""
+        self.edits = 0
+        self._shown = message.content
+        self._changed = asyncio.Event()
+        self._started = time.perf_counter()
+        self._first_text = None
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def add(self, piece):
+        """Appends a piece of the response; must be called on the event loop."""
+        if self._first_text is None:
+            self._first_text = time.perf_counter() - self._started
+        self.text += piece
+        self._changed.set()
+
+    async def _show(self, text):
+        text = text.strip()
+        if len(text) > self.LIMIT:
+            text = text[:self.LIMIT - 3] + "..."
+        if not text or text == self._shown:
+            return
+        try:
+            await self.message.edit(content=text)
+            self._shown = text
+            self.edits += 1
+        except discord.HTTPException as e:
+            logging.warning(f"StreamedReply: Could not edit message {self.message.id}: {e}")
+
+    async def _run(self):
+        try:
+            while True:
+                await self._changed.wait()
+                self._changed.clear()
+                await self._show(self.text)
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            pass
+
+    async def finish(self, text):
+        """Stops the periodic edits and shows text, the complete response (or an error message)."""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self._show(text)
+        first = f"first text after {self._first_text:.2f}s, " if self._first_text is not None else ""
+        logging.info(f"StreamedReply: Finished message {self.message.id} in {time.perf_counter() - self._started:.2f}s ({first}{self.edits} edits)")
+
+
+class NeuralNetworkCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.ai_manager = AIModelManager()
+        self.inference = InferenceService(max_queue=config.INFERENCE_QUEUE_SIZE, timeout=config.INFERENCE_TIMEOUT,
+                                          max_batch=config.INFERENCE_MAX_BATCH, batch_window=config.INFERENCE_BATCH_WINDOW)
+        self._load_future = None
+        self._unloaded = False
+        self._loaded = asyncio.Event() # Set once loading has finished, successfully or not
+        self._waiting = 0 # Commands waiting for the model to finish loading
+        # Initialize the database when the cog is loaded
+        from utils.db_utils import initialize_db
+        initialize_db()
+
+    async def cog_load(self):
+        # After a reload the bot is already connected, so on_ready will not come again
+        if self.bot.is_ready():
+            self.start_loading()
+
+    def cog_unload(self):
+        """Saves learned data to the database when the cog is unloaded."""
+        self._unloaded = True # A model still loading is discarded once it is done
+        self.inference.shutdown()
+        logging.info("Saving learned data before unloading NeuralNetworkCog.")
+        save_learned_data(self.ai_manager.learned_info)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.start_loading()
+
+    def start_loading(self):
+        """
+        Loads the model on a background thread, so the bot logs in and plays music without
+        waiting for it. Commands that arrive meanwhile wait (see wait_until_ready).
+        """
+        if self._load_future is not None:
+            return
+        self._load_future = self.bot.loop.run_in_executor(None, self.ai_manager.load_model, lambda: self._unloaded)
+        self._load_future.add_done_callback(self._finished_loading)
+
+    def _finished_loading(self, future):
+        if not future.cancelled() and future.exception():
+            logging.error(f"NeuralNetworkCog: Model loading failed: {future.exception()}", exc_info=future.exception())
+        self._loaded.set()
+
+    async def wait_until_ready(self, ctx=None):
+        """
+        Returns whether the model is ready, waiting up to AI_LOAD_WAIT_TIMEOUT seconds if it is still
+        loading. At most INFERENCE_QUEUE_SIZE commands wait; with ctx, the user is told what happens.
+        """
+        if self.ai_manager.is_ready():
+            return True
+        if self.ai_manager.state in (AIModelManager.NOT_LOADED, AIModelManager.LOADING) and self._load_future is not None:
+            if self._waiting >= config.INFERENCE_QUEUE_SIZE:
+                if ctx:
+                    await ctx.send("The AI model is still loading and enough requests are already waiting for it. Please try again later.")
+                return False
+            if ctx:
+                progress = f" ({self.ai_manager.progress})" if self.ai_manager.progress else ""
+                await ctx.send(f"The AI model is still loading{progress}. Your request will be answered once it is ready.")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._loaded.wait(), timeout=config.AI_LOAD_WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiting -= 1
+            if self.ai_manager.is_ready():
+                return True
+        if ctx:
+            await ctx.send("AI model is not loaded yet. Please try again later.")
+        return False
+
+    async def generate(self, command_name, *args, timeout=None, on_text=None):
+        """
+        Runs an AI command on the inference worker thread and returns its text, so the event loop
+        keeps serving voice and other commands meanwhile. Requests for the same command that arrive
+        together are generated in one batch. Busy and timed-out requests are turned into a message
+        for the user.
+        With on_text, the response is streamed instead: on_text is called on the event loop with
+        each new piece of text as it is generated. Streamed requests are never batched.
+        """
+        if not self.ai_manager.is_ready():
+            return "AI model is not loaded."
+        prepared = self.ai_manager.build_prompt(command_name, *args)
+        if prepared is None:
+            return "Unknown AI command."
+        prompt, max_new_tokens = prepared
+        try:
+            if on_text is not None:
+                loop = asyncio.get_running_loop()
+                return await self.inference.run(self.ai_manager.generate_stream, prompt, max_new_tokens,
+                                                lambda text: loop.call_soon_threadsafe(on_text, text), timeout=timeout)
+            return await self.inference.run_batched(self.ai_manager.generate_batch, prompt, max_new_tokens, timeout=timeout)
+        except InferenceBusy:
+            logging.warning(f"NeuralNetworkCog: Rejected '{command_name}', the inference queue is full")
+            return "The AI is busy with other requests right now. Please try again in a moment."
+        except InferenceTimeout as e:
+            logging.warning(f"NeuralNetworkCog: '{command_name}' timed out: {e}")
+            return "The AI took too long to answer. Please try again later."
+
+
+    @commands.command(name='ask', help='Ask the AI a question. Optionally provide context after the question.')
+    async def ask(self, ctx, *, args):
+        """Asks the AI a question."""
+        # Split args into question and optional context
+        parts = args.split('|', 1)
+        question = parts[0].strip()
+        context = parts[1].strip() if len(parts) > 1 else ""
+
+        if not await self.wait_until_ready(ctx):
+            return
+
+        message = await ctx.send("Thinking...")
+        # The answer replaces "Thinking..." word by word while it is generated
+        reply = StreamedReply(message, config.AI_STREAM_EDIT_INTERVAL)
+        response = await self.generate('ask', question, context, on_text=reply.add)
+        await reply.finish(response)
+
+    @commands.command(name='summarize', help='Summarize the provided text.')
+    async def summarize(self, ctx, *, text):
+        """Summarizes the provided text."""
+        if not await self.wait_until_ready(ctx):
+            return
+
+        await ctx.send("Summarizing...")
+        # Pass text to process_command
+        response = await self.generate('summarize', text)
+        await ctx.send(response)
+
+    @commands.command(name='jokeplease', help='Ask the AI for a joke.')
+    async def jokeplease(self, ctx):
+        """Asks the AI for a joke."""
+        if not await self.wait_until_ready(ctx):
+            return
+
+        await ctx.send("Attempting to generate a joke...")
+        # Call process_command for jokeplease
+        response = await self.generate('jokeplease')
+        await ctx.send(response)
+
+    @commands.command(name='ai_status', help='Show whether the AI model is loaded and how busy it is.')
+    async def ai_status(self, ctx):
+        """Shows the AI model's loading state, backend and inference queue."""
+        manager = self.ai_manager
+        lines = [f"**State:** {manager.state}"]
+        if manager.state == AIModelManager.LOADING:
+            lines.append(f"**Progress:** {manager.progress or 'Starting'} ({time.time() - manager.load_started:.0f}s so far)")
+            if self._waiting:
+                lines.append(f"**Waiting commands:** {self._waiting}")
+        elif manager.state == AIModelManager.FAILED:
+            lines.append(f"**Error:** {manager.progress}")
+        elif manager.state == AIModelManager.READY:
+            lines.append(f"**Backend:** {manager.backend.name} on {manager.device.upper()} | **Loaded in:** {manager.load_seconds:.1f}s")
+            stats = self.inference.stats()
+            lines.append(f"**Queued:** {stats['queued']} | **Completed:** {stats['completed']} | **Failed:** {stats['failed']} | "
+                         f"**Rejected:** {stats['rejected']} | **Timed out:** {stats['timed_out']}")
+            lines.append(f"**Queue wait:** {stats['avg_wait'] * 1000:.0f} ms avg | **Run time:** {stats['avg_run']:.2f}s avg | **Batch size:** {stats['avg_batch']:.1f} avg")
+            prefix_cache = manager.backend.stats()['prefix_cache']
+            if prefix_cache:
+                lines.append(f"**Prefix cache:** {prefix_cache['hits']} hits, {prefix_cache['misses']} misses, {prefix_cache['entries']} cached")
+        lines.append(f"**Learned items:** {len(manager.learned_info)}")
+        await ctx.send(embed=discord.Embed(title="AI Status", description="\n".join(lines), color=discord.Color.blurple()))
+
+
+async def setup(bot):
+    await bot.add_cog(NeuralNetworkCog(bot))
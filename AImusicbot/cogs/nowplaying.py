@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import logging
+
+import discord
+
+import config
+
+
+class NowPlayingUpdater:
+    """
+    Keeps the now-playing messages of every guild up to date from a single task.
+    Guilds are kept in a heap ordered by when their message is next due. An update
+    renders the embed and compares it with the one that message last showed, so
+    unchanged messages (paused songs, nothing new to show) cost no request at all.
+    Changed messages are edited through the cached Message object in one REST call,
+    keeping the buttons they were sent with. Consecutive edits are spaced
+    `1 / max_edits_per_second` apart, so guilds whose updates fall due together are
+    spread out instead of bursting against Discord's rate limits.
+    """
+    def __init__(self, music, interval=None, max_edits_per_second=None):
+        self.music = music
+        self.interval = interval or config.NOWPLAYING_INTERVAL
+        self.min_gap = 1 / (max_edits_per_second or config.NOWPLAYING_MAX_EDITS_PER_SECOND)
+        self._channels = {} # guild_id -> channel_id of the tracked guilds
+        self._due = [] # heap of (due time, guild_id); entries not in _scheduled are stale
+        self._scheduled = {} # guild_id -> due time of its live heap entry
+        self._shown = {} # guild_id -> embed dictionary the now-playing message shows (None: a "Not Playing" message)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def track(self, guild_id, channel_id):
+        """Starts (or keeps) updating a guild's now-playing message, beginning right away."""
+        self._channels[guild_id] = channel_id
+        self.refresh(guild_id)
+
+    def refresh(self, guild_id):
+        """Moves a tracked guild's next update forward to now, e.g. after a seek."""
+        if guild_id in self._channels:
+            self._schedule(guild_id, self.music.bot.loop.time())
+
+    def untrack(self, guild_id):
+        """Stops updating a guild's now-playing message; the message itself is left as it is."""
+        self._channels.pop(guild_id, None)
+        self._scheduled.pop(guild_id, None)
+
+    def forget(self, guild_id):
+        """Untracks a guild and drops what its message was last known to show."""
+        self.untrack(guild_id)
+        self._shown.pop(guild_id, None)
+
+    def message_sent(self, guild_id, message, embed):
+        """Records a now-playing message that was sent outside the updater (?nowplaying)."""
+        player = self.music.players.get(guild_id)
+        if player is None:
+            return # Nothing to keep up to date for a guild that is not playing
+        player.nowplaying_message = message
+        self._shown[guild_id] = embed.to_dict() if embed else None
+
+    def _schedule(self, guild_id, due):
+        self._scheduled[guild_id] = due
+        heapq.heappush(self._due, (due, guild_id))
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = self.music.bot.loop.create_task(self._run())
+
+    def shutdown(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._channels.clear()
+        self._scheduled.clear()
+        self._due.clear()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                self._wakeup.clear()
+                if not self._due:
+                    await self._wakeup.wait()
+                    continue
+                due, guild_id = self._due[0]
+                if self._scheduled.get(guild_id) != due:
+                    heapq.heappop(self._due) # Untracked or rescheduled since
+                    continue
+                delay = due - loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue # Re-check the heap, something may have been scheduled earlier
+
+                heapq.heappop(self._due)
+                del self._scheduled[guild_id]
+                edited = False
+                try:
+                    edited = await self._update(guild_id)
+                except Exception as e:
+                    logging.error(f"NowPlayingUpdater: Error updating message for guild {guild_id}: {e}", exc_info=True)
+                if guild_id in self._channels and guild_id not in self._scheduled:
+                    self._schedule(guild_id, loop.time() + self.interval)
+                if edited:
+                    await asyncio.sleep(self.min_gap)
+        except asyncio.CancelledError:
+            logging.debug("NowPlayingUpdater: Task cancelled")
+
+    async def _update(self, guild_id):
+        """Brings one guild's message up to date. Returns whether a request was made."""
+        guild = self.music.bot.get_guild(guild_id)
+        channel = self.music.bot.get_channel(self._channels.get(guild_id))
+        player = self.music.players.get(guild_id)
+        if not guild or not guild.voice_client or not channel or not player:
+            logging.info(f"NowPlayingUpdater: Bot not in a voice channel or channel gone for guild {guild_id}. Stopping updates.")
+            self.untrack(guild_id)
+            return False
+
+        message = player.nowplaying_message
+        embed = await self.music._nowplaying_embed(guild_id)
+        if embed is None:
+            # Nothing is playing any more; remove the stale message and stop until the next song
+            self.untrack(guild_id)
+            if message:
+                player.nowplaying_message = None
+                self._shown.pop(guild_id, None)
+                try:
+                    await message.delete()
+                    logging.info(f"NowPlayingUpdater: Deleted message {message.id} as nothing is playing in {guild.name}")
+                except discord.NotFound:
+                    pass
+                return True
+            return False
+
+        rendered = embed.to_dict()
+        if message and self._shown.get(guild_id) == rendered:
+            return False
+        if message:
+            try:
+                if self._shown.get(guild_id) is None:
+                    # A "Not Playing" message has no buttons yet
+                    await message.edit(embed=embed, view=self.music._nowplaying_view())
+                else:
+                    # Without a view argument the message keeps the buttons it was sent with
+                    await message.edit(embed=embed)
+                self._shown[guild_id] = rendered
+                return True
+            except discord.NotFound:
+                logging.warning(f"NowPlayingUpdater: Message {message.id} not found for editing in {guild.name}. Sending a new one.")
+        message = await channel.send(embed=embed, view=self.music._nowplaying_view())
+        self.message_sent(guild_id, message, embed)
+        logging.info(f"NowPlayingUpdater: Sent message {message.id} in {guild.name}")
+        return True
+
+
+class NowPlayingControls(discord.ui.View):
+    """
+    The buttons under the now-playing message.
+    One persistent instance is registered with bot.add_view, so the buttons of every
+    now-playing message (also ones sent before a restart) are dispatched straight to
+    these callbacks by custom_id. Each press acts on the guild's player and answers with
+    a single interaction response that updates the message itself.
+    """
+    def __init__(self, music):
+        super().__init__(timeout=None)
+        self.music = music
+        # Emojis come from the config, so they are set here rather than in the decorators
+        self.play.emoji = config.PLAY_EMOJI
+        self.pause.emoji = config.PAUSE_EMOJI
+        self.skip.emoji = config.SKIP_EMOJI
+        self.stop_playback.emoji = config.ERROR_EMOJI
+        self.queue.emoji = config.QUEUE_EMOJI
+
+    async def _reply(self, interaction: discord.Interaction, embed: discord.Embed, controls=True):
+        """Edits the pressed message to show embed and records it as the guild's now-playing message."""
+        if embed is None: # The song ended in the meantime
+            embed, controls = self.music.create_embed("Not Playing", "The bot is not currently playing anything."), False
+        await interaction.response.edit_message(embed=embed, view=None if not controls else discord.utils.MISSING)
+        self.music.nowplaying_updater.message_sent(interaction.guild_id, interaction.message, embed if controls else None)
+
+    async def _error(self, interaction: discord.Interaction, description):
+        await interaction.response.send_message(embed=self.music.create_embed("Error", f"{config.ERROR_EMOJI} {description}", discord.Color.red()), ephemeral=True)
+
+    @discord.ui.button(style=discord.ButtonStyle.secondary, custom_id="play")
+    async def play(self, interaction: discord.Interaction, button: discord.ui.Button):
+        voice_client = interaction.guild.voice_client
+        if not voice_client or not voice_client.is_paused():
+            return await self._error(interaction, "No music is currently paused to resume.")
+        self.music._resume_playback(voice_client, interaction.guild_id)
+        logging.info(f"Music resumed by {interaction.user} in {interaction.guild.name}")
+        await self._reply(interaction, await self.music._nowplaying_embed(interaction.guild_id))
+
+    @discord.ui.button(style=discord.ButtonStyle.secondary, custom_id="pause")
+    async def pause(self, interaction: discord.Interaction, button: discord.ui.Button):
+        voice_client = interaction.guild.voice_client
+        if not voice_client or not voice_client.is_playing():
+            return await self._error(interaction, "No music is currently playing to pause.")
+        voice_client.pause()
+        logging.info(f"Music paused by {interaction.user} in {interaction.guild.name}")
+        await self._reply(interaction, await self.music._nowplaying_embed(interaction.guild_id))
+
+    @discord.ui.button(style=discord.ButtonStyle.secondary, custom_id="skip")
+    async def skip(self, interaction: discord.Interaction, button: discord.ui.Button):
+        voice_client = interaction.guild.voice_client
+        player = self.music.players.get(interaction.guild_id)
+        track = player.current if player else None
+        if not voice_client or not (voice_client.is_playing() or voice_client.is_paused()) or not track:
+            return await self._error(interaction, "No song is currently playing to skip.")
+        voice_client.stop() # The after-callback starts the next song, and the updater then shows it
+        logging.info(f"Song skipped by {interaction.user} in {interaction.guild.name}")
+        await self._reply(interaction, self.music.create_embed(f"{config.SKIP_EMOJI} Skipped", f"[{track.title}]({track.webpage_url or '#'})"))
+
+    @discord.ui.button(style=discord.ButtonStyle.danger, custom_id="stop")
+    async def stop_playback(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.music._stop(interaction.guild)
+        logging.info(f"Playback stopped by {interaction.user} in {interaction.guild.name}")
+        await self._reply(interaction, self.music.create_embed("Playback Stopped", f"{config.SUCCESS_EMOJI} Music has been stopped and the queue has been cleared."), controls=False)
+
+    @discord.ui.button(style=discord.ButtonStyle.primary, custom_id="queue")
+    async def queue(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_message(embed=await self.music._queue_embed(interaction.guild_id), ephemeral=True)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import time
+
+import config
+from utils.db_utils import initialize_db, load_player_snapshots, save_player_snapshots
+from .track import Track
+
+
+class RestoredContext:
+    """
+    The parts of a command Context that playback uses, for players restored without a command:
+    the guild, its voice client and the text channel messages go to.
+    """
+    def __init__(self, guild, channel):
+        self.guild = guild
+        self.channel = channel
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def send(self, *args, **kwargs):
+        return await self.channel.send(*args, **kwargs)
+
+
+class PlayerSnapshots:
+    """
+    Persists every playing guild's player state (current track and position, queue, volume,
+    speed and loop flag) to SQLite, so a restart picks playback up where it stopped.
+    Snapshots are taken every `interval` seconds. Only rows that changed since the last
+    write are saved, all of them in one transaction, and a queue is only re-serialized
+    when it changed. On startup restore() rejoins all saved guilds in parallel.
+    """
+    def __init__(self, music, interval=None):
+        self.music = music
+        self.interval = interval or config.PLAYER_SNAPSHOT_INTERVAL
+        self._written = {} # guild_id -> snapshot tuple last written (None: row exists but is unknown)
+        self._queues = {} # guild_id -> (queue, version, serialized queue)
+        self._task = None
+        self.restored = False
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = self.music.bot.loop.create_task(self._run())
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def _serialize_queue(self, guild_id, queue):
+        cached = self._queues.get(guild_id)
+        if cached and cached[0] is queue and cached[1] == queue.version:
+            return cached[2]
+        serialized = json.dumps([track.to_record() for track in queue], separators=(',', ':'))
+        self._queues[guild_id] = (queue, queue.version, serialized)
+        return serialized
+
+    def _collect(self):
+        """Returns the snapshots that changed since the last write and the guilds whose rows are obsolete."""
+        snapshots = {}
+        live = set()
+        for guild_id, player in self.music.players.items():
+            guild = self.music.bot.get_guild(guild_id)
+            voice_client = guild.voice_client if guild else None
+            if not voice_client or not (player.current or player.queue):
+                continue
+            live.add(guild_id)
+            snapshot = (
+                guild_id, voice_client.channel.id, player.text_channel_id,
+                json.dumps(player.current.to_record(), separators=(',', ':')) if player.current else None,
+                round(player.position, 1), player.volume, player.speed, int(player.looping),
+                self._serialize_queue(guild_id, player.queue)
+            )
+            if self._written.get(guild_id) != snapshot:
+                snapshots[guild_id] = snapshot
+        deleted = [guild_id for guild_id in self._written if guild_id not in live]
+        for guild_id in list(self._queues):
+            if guild_id not in live:
+                del self._queues[guild_id]
+        return snapshots, deleted
+
+    def _written_ok(self, snapshots, deleted):
+        self._written.update(snapshots)
+        for guild_id in deleted:
+            self._written.pop(guild_id, None)
+
+    async def flush(self):
+        snapshots, deleted = self._collect()
+        if not snapshots and not deleted:
+            return
+        start = time.perf_counter()
+        if await self.music.bot.loop.run_in_executor(None, save_player_snapshots, list(snapshots.values()), deleted):
+            self._written_ok(snapshots, deleted)
+            logging.debug(f"PlayerSnapshots: Wrote {len(snapshots)} and deleted {len(deleted)} snapshots in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def flush_now(self):
+        """Writes pending snapshots synchronously, for shutdown and restart paths."""
+        snapshots, deleted = self._collect()
+        if (snapshots or deleted) and save_player_snapshots(list(snapshots.values()), deleted):
+            self._written_ok(snapshots, deleted)
+            logging.info(f"PlayerSnapshots: Saved {len(snapshots)} player snapshots before shutting down")
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logging.error(f"PlayerSnapshots: Error writing snapshots: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            logging.debug("PlayerSnapshots: Task cancelled")
+
+    async def restore(self):
+        """Rehydrates the saved players and rejoins their voice channels, all guilds in parallel."""
+        if self.restored:
+            return
+        self.restored = True
+        start = time.perf_counter()
+        await self.music.bot.loop.run_in_executor(None, initialize_db)
+        snapshots = await self.music.bot.loop.run_in_executor(None, load_player_snapshots)
+        # Every saved row is known now, so rows that are not restored get deleted by the next flush
+        self._written = {snapshot['guild_id']: None for snapshot in snapshots}
+        if snapshots:
+            results = await asyncio.gather(*(self._restore_guild(snapshot, start) for snapshot in snapshots), return_exceptions=True)
+            resumed = sorted(result for result in results if isinstance(result, float))
+            for snapshot, result in zip(snapshots, results):
+                if isinstance(result, Exception):
+                    logging.error(f"PlayerSnapshots: Could not restore guild {snapshot['guild_id']}: {result}", exc_info=result)
+                    self.music._teardown(snapshot['guild_id'])
+            if resumed:
+                logging.info(f"PlayerSnapshots: Resumed {len(resumed)} of {len(snapshots)} players, "
+                             f"time to resume {resumed[len(resumed) // 2]:.2f}s median, {resumed[-1]:.2f}s max")
+            else:
+                logging.info(f"PlayerSnapshots: None of the {len(snapshots)} saved players could be resumed")
+        self.start()
+
+    async def _restore_guild(self, snapshot, start):
+        """Restores one guild's player. Returns the seconds it took until playback started, or None."""
+        guild = self.music.bot.get_guild(snapshot['guild_id'])
+        voice_channel = guild.get_channel(snapshot['voice_channel_id']) if guild else None
+        text_channel = guild.get_channel(snapshot['text_channel_id']) if guild and snapshot['text_channel_id'] else None
+        if not voice_channel or not text_channel:
+            return None
+        if not any(not member.bot for member in voice_channel.members):
+            logging.info(f"PlayerSnapshots: Not resuming in {guild.name}, nobody is listening in {voice_channel}")
+            return None
+
+        player = self.music.get_player(guild.id)
+        player.volume = snapshot['volume']
+        player.speed = snapshot['speed']
+        player.looping = bool(snapshot['looping'])
+        for record in json.loads(snapshot['queue']):
+            player.queue.put_nowait(Track.from_record(record))
+        track = Track.from_record(json.loads(snapshot['track'])) if snapshot['track'] else None
+
+        if not guild.voice_client:
+            await voice_channel.connect()
+        elif guild.voice_client.is_playing() or guild.voice_client.is_paused():
+            guild.voice_client.stop() # Left over from before the music cog was reloaded
+        ctx = RestoredContext(guild, text_channel)
+        if track:
+            position = snapshot['position']
+            if not self.music._has_cached_audio(track) and not await self.music._resolve_song(
+                    track, guild.id, min_ttl=max(0, track.duration - position) + config.PREFETCH_URL_MARGIN):
+                logging.warning(f"PlayerSnapshots: {track.title} is no longer available, continuing with the queue in {guild.name}")
+                await self.music.play_next(ctx)
+            else:
+                async with player.play_lock:
+                    await self.music._start_playback(ctx, track, position=position)
+        elif player.queue:
+            await self.music.play_next(ctx)
+        else:
+            return None
+
+        elapsed = time.perf_counter() - start
+        current = player.current
+        logging.info(f"PlayerSnapshots: Resumed {current.title if current else 'playback'} in {guild.name} "
+                     f"at {player.position:.0f}s with {len(player.queue)} queued, {elapsed:.2f}s after the bot became ready")
+        return elapsed
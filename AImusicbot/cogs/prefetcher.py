@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+
+import config
+
+
+class Prefetcher:
+    """
+    Keeps the next few queued songs of one guild ready to play.
+    It sleeps until `lead_time` seconds before the current song ends, then resolves
+    placeholders and re-extracts stream URLs that would expire before they are played.
+    """
+    def __init__(self, music, guild_id, depth=None, lead_time=None):
+        self.music = music
+        self.guild_id = guild_id
+        self.depth = depth or config.PREFETCH_DEPTH
+        self.lead_time = lead_time if lead_time is not None else config.PREFETCH_LEAD_TIME
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.resolved = 0
+        self.refreshed = 0
+
+    def poke(self):
+        """Signals that the current song or the queue changed."""
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = self.music.bot.loop.create_task(self._run())
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        try:
+            while True:
+                self._wakeup.clear()
+                remaining = self.music.time_remaining(self.guild_id)
+                delay = remaining - self.lead_time if remaining is not None else 0
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                        continue # Something changed before the deadline, recompute it
+                    except asyncio.TimeoutError:
+                        pass
+                await self.prefetch()
+                await self._wakeup.wait()
+        except asyncio.CancelledError:
+            logging.debug(f"Prefetcher: Task cancelled for guild {self.guild_id}")
+
+    async def prefetch(self):
+        """Resolves or refreshes the next `depth` songs in the queue."""
+        queue = await self.music.get_queue(self.guild_id)
+        # Seconds from now until each queued song starts playing
+        starts_in = self.music.time_remaining(self.guild_id) or 0
+        for track in queue[:self.depth]:
+            # The URL has to outlive the wait plus the song itself, since ffmpeg may reconnect mid-song
+            needed_ttl = starts_in + track.duration + config.PREFETCH_URL_MARGIN
+            if (not track.url or track.time_left() < needed_ttl) and not self.music._has_cached_audio(track):
+                was_resolved = track.is_resolved
+                start = time.perf_counter()
+                if await self.music._resolve_song(track, self.guild_id, min_ttl=needed_ttl, queue=queue):
+                    if was_resolved:
+                        self.refreshed += 1
+                    else:
+                        self.resolved += 1
+                    logging.info(f"Prefetcher: {'Refreshed' if was_resolved else 'Resolved'} {track.title} for guild {self.guild_id} in {time.perf_counter() - start:.2f}s")
+            # Measure the song's loudness before it starts, so its normalization gain is ready in time
+            self.music._analyze_loudness(track)
+            player = self.music.players.get(self.guild_id)
+            if player is None:
+                return # The guild's player was torn down while a song was resolving
+            starts_in += track.duration / player.speed
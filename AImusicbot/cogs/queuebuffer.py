@@ -1,27 +1,132 @@
-import asyncio
-
-class QueueBuffer:
-    def __init__(self):
-        self.buffer = asyncio.Queue()
-
-    async def add_to_buffer(self, item):
-        await self.buffer.put(item)
-
-    async def get_from_buffer(self):
-        return await self.buffer.get()
-
-    def is_empty(self):
-        return self.buffer.empty()
-
-    def test_playlist(self, songs):
-        playable_songs = []
-        unplayable_songs = []
-        for song in songs:
-            if song.url:
-                playable_songs.append(song)
-            else:
-                unplayable_songs.append(song)
-        return playable_songs, unplayable_songs
-
-async def setup(bot):
-    pass
+import asyncio
+import random
+from collections import deque
+from itertools import islice
+
+class QueueBuffer:
+    def __init__(self):
+        self.buffer = asyncio.Queue()
+
+    async def add_to_buffer(self, item):
+        await self.buffer.put(item)
+
+    async def get_from_buffer(self):
+        return await self.buffer.get()
+
+    def is_empty(self):
+        return self.buffer.empty()
+
+    def test_playlist(self, songs):
+        playable_songs = []
+        unplayable_songs = []
+        for song in songs:
+            if song.url:
+                playable_songs.append(song)
+            else:
+                unplayable_songs.append(song)
+        return playable_songs, unplayable_songs
+
+class TrackQueue:
+    """
+    The per-guild song queue.
+    Backed by a deque so taking the next song is O(1), with indexed removal, moves,
+    slicing for pagination, an in-place shuffle and a running total of the queued
+    durations. get() can be awaited just like asyncio.Queue.get().
+    """
+    def __init__(self):
+        self._items = deque()
+        self._not_empty = asyncio.Event()
+        self.total_duration = 0
+        self.version = 0 # Bumped on every change, so a serialized copy can be reused while it is current
+
+    @staticmethod
+    def _duration(item):
+        return item.duration
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._items))
+            return list(islice(self._items, start, stop, step))
+        return self._items[index]
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
+
+    def _added(self, item):
+        self.version += 1
+        self.total_duration += self._duration(item)
+        self._not_empty.set()
+
+    def _removed(self, item):
+        self.version += 1
+        self.total_duration -= self._duration(item)
+        if not self._items:
+            self._not_empty.clear()
+            self.total_duration = 0
+
+    def put_nowait(self, item):
+        self._items.append(item)
+        self._added(item)
+
+    async def put(self, item):
+        self.put_nowait(item)
+
+    def get_nowait(self):
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        self._removed(item)
+        return item
+
+    async def get(self):
+        while not self._items:
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def remove(self, index):
+        """Removes and returns the song at a 0-based index."""
+        item = self._items[index]
+        del self._items[index]
+        self._removed(item)
+        return item
+
+    def move(self, source, destination):
+        """Moves the song at 0-based index source to index destination."""
+        item = self._items[source]
+        del self._items[source]
+        self._items.insert(destination, item)
+        self.version += 1
+
+    def shuffle(self):
+        items = list(self._items)
+        random.shuffle(items)
+        self._items.clear()
+        self._items.extend(items)
+        self.version += 1
+
+    def clear(self):
+        self._items.clear()
+        self._not_empty.clear()
+        self.total_duration = 0
+        self.version += 1
+
+    def adjust_duration(self, item, delta):
+        """
+        Accounts for a song whose duration changed after it was resolved. Songs that left the queue
+        in the meantime were already subtracted with their old duration, so they are ignored.
+        """
+        if any(queued is item for queued in self._items):
+            self.total_duration += delta
+            self.version += 1
+
+async def setup(bot):
+    pass
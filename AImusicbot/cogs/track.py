@@ -0,0 +1,92 @@
+import time
+
+import config
+from utils.resolution_cache import stream_url_expiry
+
+
+class Track:
+    """
+    A queued or playing song.
+    Built once at extraction time and holds only what playback and the embeds need,
+    instead of keeping the full yt-dlp info dict (formats, thumbnails, headers, ...) alive.
+    A track without a stream `url` is a placeholder that still has to be resolved.
+    """
+    __slots__ = ('title', 'webpage_url', 'url', 'url_expires', 'duration', 'thumbnail', 'requester', 'acodec', 'sample_rate')
+
+    def __init__(self, title, webpage_url, url=None, url_expires=0.0, duration=0, thumbnail=None, requester=None, acodec=None, sample_rate=None):
+        self.title = title
+        self.webpage_url = webpage_url
+        self.url = url
+        self.url_expires = url_expires
+        self.duration = duration
+        self.thumbnail = thumbnail
+        self.requester = requester # Discord user ID of whoever queued the track
+        self.acodec = acodec # Audio codec of the selected stream format, e.g. 'opus'
+        self.sample_rate = sample_rate
+
+    def __repr__(self):
+        return f"<Track title={self.title!r} resolved={self.is_resolved}>"
+
+    @classmethod
+    def from_info(cls, info, requester=None):
+        """Builds a track from a (full or cached) yt-dlp info dict."""
+        url = info.get('url')
+        url_expires = info.get('url_expires') or (stream_url_expiry(url, config.RESOLUTION_CACHE_STREAM_TTL) if url else 0.0)
+        return cls(
+            title=info.get('title') or 'Unknown Title',
+            webpage_url=info.get('webpage_url') or info.get('original_url'),
+            url=url,
+            url_expires=url_expires,
+            duration=int(info.get('duration') or 0),
+            thumbnail=info.get('thumbnail'),
+            requester=requester,
+            acodec=info.get('acodec'),
+            sample_rate=info.get('asr')
+        )
+
+    @classmethod
+    def from_flat_entry(cls, entry, requester=None):
+        """Builds an unresolved placeholder from a flat yt-dlp playlist entry."""
+        video_id = entry.get('id')
+        thumbnails = entry.get('thumbnails') or []
+        return cls(
+            title=entry.get('title') or 'Unknown Title',
+            webpage_url=entry.get('webpage_url') or entry.get('url') or f"https://www.youtube.com/watch?v={video_id}",
+            duration=int(entry.get('duration') or 0),
+            thumbnail=thumbnails[-1].get('url') if thumbnails else None,
+            requester=requester
+        )
+
+    @property
+    def is_resolved(self):
+        return self.url is not None
+
+    @property
+    def is_opus(self):
+        """Whether the stream is already 48 kHz Opus, which Discord can take without re-encoding."""
+        return bool(self.acodec) and self.acodec.startswith('opus') and self.sample_rate == 48000
+
+    def time_left(self):
+        """Seconds the stream URL stays valid (0 if there is none)."""
+        if not self.url:
+            return 0
+        return self.url_expires - time.time()
+
+    def to_record(self):
+        """Returns the track as a compact list of its fields, for persisting it."""
+        return [getattr(self, field) for field in self.__slots__]
+
+    @classmethod
+    def from_record(cls, record):
+        """Rebuilds a track from to_record() output."""
+        return cls(**dict(zip(cls.__slots__, record)))
+
+    def update_from(self, other):
+        """Takes over the stream URL and metadata of a freshly resolved copy of this track."""
+        self.title = other.title or self.title
+        self.url = other.url
+        self.url_expires = other.url_expires
+        self.duration = other.duration or self.duration
+        self.thumbnail = other.thumbnail or self.thumbnail
+        self.acodec = other.acodec
+        self.sample_rate = other.sample_rate
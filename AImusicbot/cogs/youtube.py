@@ -1,102 +1,276 @@
-import asyncio
-import functools
-import logging
-import yt_dlp
-import discord
-import os
-
-# Suppress noise from yt-dlp
-yt_dlp.utils.bug_reports_hook = lambda *args, **kwargs: None
-
-# Configure logging for yt-dlp
-class YTDLLogger:
-    def debug(self, msg):
-        # Log debug messages from yt-dlp if needed, but often too verbose
-        # logging.debug(f"YTDL: {msg}")
-        pass
-
-    def warning(self, msg):
-        logging.warning(f"YTDL: {msg}")
-
-    def error(self, msg):
-        logging.error(f"YTDL: {msg}")
-
-# FFmpeg options for playing audio
-FFMPEG_OPTIONS = {
-    'options': '-vn',  # No video
-    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5' # Options to reconnect
-}
-
-# YTDL options for extracting audio information
-YTDL_FORMAT_OPTIONS = {
-    'format': 'bestaudio/best',  # Get the best audio format
-    'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s', # Output template
-    'restrictfilenames': True, # Restrict filenames to ASCII
-    'noplaylist': True, # Default to not downloading playlists
-    'nocheckcertificate': True, # Ignore SSL certificate errors
-    'ignoreerrors': False, # Do not ignore errors
-    'logtostderr': False, # Do not log to stderr
-    'quiet': True, # Suppress console output
-    'no_warnings': True, # Suppress warnings
-    'default_search': 'ytsearch', # Default search prefix
-    'source_address': '0.0.0.0', # Bind to IPv4 since IPv6 often causes issues
-    'cookiefile': 'youtube_cookie.txt' if os.path.exists('youtube_cookie.txt') else None, # Use cookie file if it exists
-    'logger': YTDLLogger(), # Use custom logger
-    'http_headers': { # Add headers to mimic a browser
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.88 Safari/537.36)'
-    },
-    'extractor_args': { # Use web player client for YouTube
-        'youtube': {
-            'player_client': ['web']
-        }
-    }
-}
-
-class YTDLSource(discord.PCMVolumeTransformer):
-    def __init__(self, source, *, data, volume=0.5):
-        super().__init__(source, volume)
-        self.data = data
-        self.title = data.get('title')
-        self.url = data.get('url')
-        self.webpage_url = data.get('webpage_url')
-        self.duration = data.get('duration')
-        self.thumbnail = data.get('thumbnail')
-
-    @classmethod
-    async def from_url(cls, url, *, loop=None, stream=False, ytdl_opts=None):
-        loop = loop or asyncio.get_event_loop()
-        
-        # Ensure ytdl_opts is a dictionary
-        if ytdl_opts is None:
-            ytdl_opts = YTDL_FORMAT_OPTIONS.copy()
-        else:
-            # Create a copy to avoid modifying the original dictionary
-            ytdl_opts = ytdl_opts.copy()
-
-        # If streaming, set the output template to '-' for stdout
-        if stream:
-            ytdl_opts['outtmpl'] = '-'
-            ytdl_opts['noplaylist'] = True # Ensure only single video is processed when streaming
-
-        ydl = yt_dlp.YoutubeDL(ytdl_opts)
-
-        # Use extract_info to get video data without downloading
-        # run_in_executor is used to run blocking code in a separate thread
-        data = await loop.run_in_executor(None, lambda: ydl.extract_info(url, download=False))
-
-        if 'entries' in data:
-            # It's a playlist or a search result with multiple entries
-            # Return a list of dictionaries containing data and stream flag
-            return [{'data': entry, 'stream': stream} for entry in data['entries']]
-        else:
-            # It's a single video
-            # Return a dictionary containing data and stream flag
-            return {'data': data, 'stream': stream}
-
-
-async def setup(bot):
-    try:
-        from .music import Music # Import Music cog here to avoid circular dependency
-        await bot.add_cog(Music(bot))
-    except Exception as e:
-        logging.error(f"Failed to load music cog: {e}", exc_info=True)
+import functools
+import logging
+import yt_dlp
+import discord
+import os
+import threading
+from collections import OrderedDict
+
+import config
+from utils.resolution_cache import ResolutionCache, normalize_key
+from utils.audio_cache import AudioCache
+from utils.loudness import LoudnessAnalyzer
+from .track import Track
+from .extraction import ExtractionScheduler, SingleFlight
+
+# Suppress noise from yt-dlp
+yt_dlp.utils.bug_reports_hook = lambda *args, **kwargs: None
+
+# Configure logging for yt-dlp
+class YTDLLogger:
+    def debug(self, msg):
+        # Log debug messages from yt-dlp if needed, but often too verbose
+        # logging.debug(f"YTDL: {msg}")
+        pass
+
+    def warning(self, msg):
+        logging.warning(f"YTDL: {msg}")
+
+    def error(self, msg):
+        logging.error(f"YTDL: {msg}")
+
+# FFmpeg options for playing audio
+FFMPEG_OPTIONS = {
+    'options': '-vn',  # No video
+    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5' # Options to reconnect
+}
+
+# YTDL options for extracting audio information
+YTDL_FORMAT_OPTIONS = {
+    'format': 'bestaudio/best',  # Get the best audio format
+    'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s', # Output template
+    'restrictfilenames': True, # Restrict filenames to ASCII
+    'noplaylist': True, # Default to not downloading playlists
+    'nocheckcertificate': True, # Ignore SSL certificate errors
+    'ignoreerrors': False, # Do not ignore errors
+    'logtostderr': False, # Do not log to stderr
+    'quiet': True, # Suppress console output
+    'no_warnings': True, # Suppress warnings
+    'default_search': 'ytsearch', # Default search prefix
+    'source_address': '0.0.0.0', # Bind to IPv4 since IPv6 often causes issues
+    'cookiefile': 'youtube_cookie.txt' if os.path.exists('youtube_cookie.txt') else None, # Use cookie file if it exists
+    'logger': YTDLLogger(), # Use custom logger
+    'http_headers': { # Add headers to mimic a browser
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.88 Safari/537.36)'
+    },
+    'extractor_args': { # Use web player client for YouTube
+        'youtube': {
+            'player_client': ['web']
+        }
+    }
+}
+
+# Shared cache of resolved videos so repeat plays skip yt-dlp entirely
+RESOLUTION_CACHE = ResolutionCache(
+    max_entries=config.RESOLUTION_CACHE_MAX_ENTRIES,
+    max_bytes=config.RESOLUTION_CACHE_MAX_BYTES,
+    metadata_ttl=config.RESOLUTION_CACHE_METADATA_TTL,
+    stream_ttl=config.RESOLUTION_CACHE_STREAM_TTL
+)
+
+# Local Opus copies of frequently played tracks
+AUDIO_CACHE = AudioCache(
+    cache_dir=config.AUDIO_CACHE_DIR,
+    max_bytes=config.AUDIO_CACHE_MAX_BYTES,
+    min_plays=config.AUDIO_CACHE_MIN_PLAYS,
+    max_duration=config.AUDIO_CACHE_MAX_DURATION,
+    bitrate=config.AUDIO_CACHE_BITRATE,
+    max_downloads=config.AUDIO_CACHE_MAX_DOWNLOADS
+)
+
+# Per-track normalization gains, measured once in the background
+LOUDNESS = LoudnessAnalyzer(
+    target=config.LOUDNESS_TARGET,
+    max_gain=config.LOUDNESS_MAX_GAIN,
+    tolerance=config.LOUDNESS_TOLERANCE,
+    max_duration=config.LOUDNESS_MAX_DURATION,
+    max_analyses=config.LOUDNESS_MAX_ANALYSES
+)
+
+# Dedicated worker pool for blocking yt-dlp calls, shared fairly between guilds
+EXTRACTION_SCHEDULER = ExtractionScheduler(
+    workers=config.EXTRACTION_WORKERS,
+    use_processes=config.EXTRACTION_USE_PROCESSES,
+    timeout=config.EXTRACTION_TIMEOUT
+)
+
+# Concurrent lookups of the same video, search or playlist page share one extraction
+INFLIGHT_EXTRACTIONS = SingleFlight()
+
+
+class YTDLPool:
+    """
+    Long-lived YoutubeDL instances, one per worker thread (or process) and option set.
+    Reusing them keeps the initialized extractors, the loaded cookie jar and yt-dlp's
+    player/signature caches between requests instead of rebuilding them every time.
+    Bumping `generation` (see reset) makes every worker rebuild its instances on next use.
+    """
+    def __init__(self, max_per_thread=8):
+        self.max_per_thread = max_per_thread
+        self.generation = 0
+        self._local = threading.local()
+
+    @classmethod
+    def _options_key(cls, ytdl_opts):
+        """
+        A key that is equal for equal options, also across pickling (process workers get a fresh
+        copy of every object in them, e.g. the logger), so objects count by their type only.
+        """
+        return repr(cls._stable(ytdl_opts))
+
+    @classmethod
+    def _stable(cls, value):
+        if isinstance(value, dict):
+            return tuple(sorted((str(key), cls._stable(item)) for key, item in value.items()))
+        if isinstance(value, (list, tuple, set, frozenset)):
+            items = [cls._stable(item) for item in value]
+            return tuple(sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items)
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return type(value).__name__
+
+    def get(self, ytdl_opts, generation=None):
+        """Returns this thread's YoutubeDL for ytdl_opts, building it if needed."""
+        generation = self.generation if generation is None else generation
+        local = self._local
+        if getattr(local, 'generation', None) != generation:
+            # Stale instances are dropped without close(), which would write the old cookie jar
+            # back over a freshly fetched cookie file
+            local.instances = OrderedDict()
+            local.generation = generation
+        key = self._options_key(ytdl_opts)
+        ydl = local.instances.get(key)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(ytdl_opts)
+            local.instances[key] = ydl
+            if len(local.instances) > self.max_per_thread:
+                local.instances.popitem(last=False)
+            logging.debug(f"YTDLPool: Built a YoutubeDL instance in {threading.current_thread().name}")
+        else:
+            local.instances.move_to_end(key)
+        return ydl
+
+    def reset(self):
+        """Makes every worker rebuild its instances, e.g. after the cookie file changed."""
+        self.generation += 1
+        logging.info(f"YTDLPool: Reset YoutubeDL instances (generation {self.generation})")
+
+
+# Per-worker YoutubeDL instances, rebuilt when the cookie file changes
+YTDL_POOL = YTDLPool(max_per_thread=config.YTDL_INSTANCES_PER_WORKER)
+
+
+def extract_info(url, ytdl_opts, sanitize=False, generation=None):
+    """
+    Runs a blocking yt-dlp extraction. Kept at module level so it can be sent to a worker process;
+    `sanitize` strips the info dict down to picklable data for the trip back, and `generation`
+    carries YTDL_POOL resets over to worker processes.
+    """
+    ydl = YTDL_POOL.get(ytdl_opts, generation)
+    data = ydl.extract_info(url, download=False)
+    return ydl.sanitize_info(data) if sanitize else data
+
+
+class YTDLSource(discord.PCMVolumeTransformer):
+    def __init__(self, source, *, data, volume=0.5):
+        super().__init__(source, volume)
+        self.data = data
+        self.title = data.get('title')
+        self.url = data.get('url')
+        self.webpage_url = data.get('webpage_url')
+        self.duration = data.get('duration')
+        self.thumbnail = data.get('thumbnail')
+
+    @classmethod
+    async def from_url(cls, url, *, loop=None, stream=False, ytdl_opts=None, min_url_ttl=0, requester=None, guild_id=None):
+        """
+        Resolves a URL or search query into a Track, or a list of Tracks for playlists and
+        search results. The full yt-dlp info dict is only used to build the compact Tracks.
+        The extraction is queued on the guild's lane of the extraction scheduler, and is
+        cancelled if `requester` leaves the voice channel before it runs.
+        """
+        # Ensure ytdl_opts is a dictionary
+        if ytdl_opts is None:
+            ytdl_opts = YTDL_FORMAT_OPTIONS.copy()
+        else:
+            # Create a copy to avoid modifying the original dictionary
+            ytdl_opts = ytdl_opts.copy()
+
+        # If streaming, set the output template to '-' for stdout
+        if stream:
+            ytdl_opts['outtmpl'] = '-'
+            ytdl_opts['noplaylist'] = True # Ensure only single video is processed when streaming
+
+        # Single videos are served from the resolution cache while their stream URL is still valid
+        cache_key = normalize_key(url) if ytdl_opts.get('noplaylist') else None
+        if cache_key:
+            cached = RESOLUTION_CACHE.get(cache_key, min_ttl=min_url_ttl)
+            if cached:
+                logging.info(f"Resolution cache hit for {cache_key}")
+                return Track.from_info(cached, requester=requester)
+
+        # Use extract_info to get video data without downloading, on the extraction worker pool
+        flight_key = ('info', cache_key or url.strip(), bool(ytdl_opts.get('noplaylist')))
+        data = await INFLIGHT_EXTRACTIONS.run(
+            flight_key,
+            lambda: EXTRACTION_SCHEDULER.run(extract_info, url, ytdl_opts, EXTRACTION_SCHEDULER.use_processes, YTDL_POOL.generation, guild_id=guild_id, requester=requester),
+            owner=(guild_id, requester)
+        )
+
+        if 'entries' in data:
+            # It's a playlist or a search result with multiple entries
+            for entry in data['entries']:
+                if entry:
+                    RESOLUTION_CACHE.put(normalize_key(entry.get('webpage_url')), entry)
+            return [Track.from_info(entry, requester=requester) for entry in data['entries'] if entry]
+        else:
+            # It's a single video
+            RESOLUTION_CACHE.put(cache_key or normalize_key(data.get('webpage_url')), data)
+            return Track.from_info(data, requester=requester)
+
+    @classmethod
+    async def from_playlist(cls, url, *, loop=None, start=1, end=None, ytdl_opts=None, requester=None, guild_id=None):
+        """
+        Enumerates a playlist without resolving any stream URLs.
+        Returns placeholder Tracks without a `url`; the stream URL is resolved later
+        from `webpage_url`.
+        """
+        ytdl_opts = (ytdl_opts or YTDL_FORMAT_OPTIONS).copy()
+        ytdl_opts['noplaylist'] = False
+        ytdl_opts['extract_flat'] = 'in_playlist' # IDs and titles only, no per-entry extraction
+        ytdl_opts['playliststart'] = start
+        if end:
+            ytdl_opts['playlistend'] = end
+
+        flight_key = ('playlist', url.strip(), start, end)
+        data = await INFLIGHT_EXTRACTIONS.run(
+            flight_key,
+            lambda: EXTRACTION_SCHEDULER.run(extract_info, url, ytdl_opts, EXTRACTION_SCHEDULER.use_processes, YTDL_POOL.generation, guild_id=guild_id, requester=requester, timeout=config.EXTRACTION_PLAYLIST_TIMEOUT),
+            owner=(guild_id, requester)
+        )
+        if not data:
+            return []
+        if 'entries' not in data:
+            # Not actually a playlist, yt-dlp fully resolved a single video
+            RESOLUTION_CACHE.put(normalize_key(data.get('webpage_url')), data)
+            return [Track.from_info(data, requester=requester)]
+
+        placeholders = []
+        for entry in data['entries']:
+            if not entry:
+                continue
+            placeholder = Track.from_flat_entry(entry, requester=requester)
+            # Reuse a still-valid resolution if we have one. If only its stream URL has expired, the
+            # cached metadata still gives the placeholder its full duration, thumbnail and codec
+            key = normalize_key(placeholder.webpage_url)
+            cached = RESOLUTION_CACHE.get(key, count=False) or RESOLUTION_CACHE.get_metadata(key)
+            placeholders.append(Track.from_info(cached, requester=requester) if cached else placeholder)
+        return placeholders
+
+
+async def setup(bot):
+    try:
+        from .music import Music # Import Music cog here to avoid circular dependency
+        await bot.add_cog(Music(bot))
+    except Exception as e:
+        logging.error(f"Failed to load music cog: {e}", exc_info=True)
@@ -1,27 +1,102 @@
-# config.py
-
-# It is recommended to use environment variables for sensitive data.
-# However, you can hardcode the values here for simplicity.
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-DISCORD_TOKEN = os.environ.get("DISCORD_TOKEN")
-YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
-BOT_OWNER_ID = int(os.environ.get("BOT_OWNER_ID"))
-
-# You can change the bot's command prefix here
-COMMAND_PREFIX = "?"
-
-# Emojis for UI
-PLAY_EMOJI = '▶️'
-PAUSE_EMOJI = '⏸️'
-SKIP_EMOJI = '⏭️'
-QUEUE_EMOJI = '🎵'
-ERROR_EMOJI = '❌'
-SUCCESS_EMOJI = '✅'
-
-# Discord Channel ID for sending bot logs (errors, warnings)
-LOG_CHANNEL_ID = int(os.environ.get("LOG_CHANNEL_ID"))
-
+# config.py
+
+# It is recommended to use environment variables for sensitive data.
+# However, you can hardcode the values here for simplicity.
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DISCORD_TOKEN = os.environ.get("DISCORD_TOKEN")
+YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
+BOT_OWNER_ID = int(os.environ.get("BOT_OWNER_ID"))
+
+# You can change the bot's command prefix here
+COMMAND_PREFIX = "?"
+
+# Emojis for UI
+PLAY_EMOJI = '▶️'
+PAUSE_EMOJI = '⏸️'
+SKIP_EMOJI = '⏭️'
+QUEUE_EMOJI = '🎵'
+ERROR_EMOJI = '❌'
+SUCCESS_EMOJI = '✅'
+
+# Discord Channel ID for sending bot logs (errors, warnings)
+LOG_CHANNEL_ID = int(os.environ.get("LOG_CHANNEL_ID"))
+
+# yt-dlp resolution cache
+# Metadata (title, duration, thumbnail) and signed stream URLs are cached separately;
+# stream URLs are also dropped early once they get close to their `expire` time.
+RESOLUTION_CACHE_MAX_ENTRIES = 2048
+RESOLUTION_CACHE_MAX_BYTES = 8 * 1024 * 1024
+RESOLUTION_CACHE_METADATA_TTL = 24 * 3600 # seconds
+RESOLUTION_CACHE_STREAM_TTL = 5 * 3600 # seconds, used when the URL carries no expiry
+
+# Lazy playlist expansion
+PLAYLIST_FIRST_PAGE = 25 # Entries enumerated before playback starts; the rest load in the background
+
+# Next-track prefetching
+PREFETCH_DEPTH = 3 # Queued songs kept resolved ahead of the play head
+PREFETCH_LEAD_TIME = 30 # Seconds before the current song ends to start prefetching
+PREFETCH_URL_MARGIN = 60 # Extra seconds a stream URL must stay valid past the end of its song
+
+# Disconnects
+RESUME_POINT_TTL = 30 * 60 # Seconds a song cut off by a disconnect can be picked up with ?resume
+
+# yt-dlp extraction worker pool
+EXTRACTION_WORKERS = 4 # Concurrent extractions across all guilds
+EXTRACTION_USE_PROCESSES = False # Run extractions in worker processes instead of threads
+EXTRACTION_TIMEOUT = 60 # Seconds a single extraction may run
+EXTRACTION_PLAYLIST_TIMEOUT = 180 # Seconds a playlist enumeration may run
+YTDL_INSTANCES_PER_WORKER = 8 # Option-keyed YoutubeDL instances each worker keeps alive
+
+# Playback
+DEFAULT_VOLUME = 1.0 # 0.0-2.0, applied by ffmpeg's volume filter
+
+# Now-playing messages
+NOWPLAYING_INTERVAL = 30 # seconds between updates of a guild's message
+NOWPLAYING_MAX_EDITS_PER_SECOND = 4 # across all guilds
+
+# AI text generation backend: 'torch' (fp32, GPU if available), 'torch-int8' (dynamically quantized, CPU)
+# or 'llama.cpp' (a GGUF model through llama-cpp-python)
+AI_BACKEND = 'torch'
+AI_MODEL_NAME = 'gpt2' # Hugging Face model for the torch backends
+AI_GGUF_MODEL_PATH = 'models/gpt2.Q8_0.gguf' # Model file for the llama.cpp backend
+AI_THREADS = None # CPU threads for generation; None uses the library's default
+AI_LLAMA_CONTEXT_LENGTH = 1024 # Tokens of context llama.cpp allocates (prompt + answer)
+AI_LLAMA_GPU_LAYERS = 0 # Layers llama.cpp offloads to the GPU; needs a CUDA build of llama-cpp-python
+AI_LLAMA_CACHE_BYTES = 256 * 1024 ** 2 # llama.cpp's cache of evaluated prompt states
+AI_LOAD_WAIT_TIMEOUT = 120 # Seconds an AI command waits for the model to finish loading after startup
+AI_STREAM_EDIT_INTERVAL = 1.0 # Seconds between edits of a streamed ?ask answer; Discord allows about 5 edits per 5 seconds
+
+# AI inference, run on a dedicated worker thread
+INFERENCE_QUEUE_SIZE = 8 # Requests that may wait; further ones are turned away until there is room
+INFERENCE_TIMEOUT = 60 # Seconds an AI command may take, including its time in the queue
+INFERENCE_MAX_BATCH = 4 # Requests for the same command generated together in one batch
+INFERENCE_BATCH_WINDOW = 0.01 # Seconds the worker waits for more requests to batch with the first one
+INFERENCE_ERROR_SUMMARY_TIMEOUT = 20 # Seconds an error summary may take; errors are reported without one after that
+AI_CONTEXT_TOKENS = 256 # Tokens of the most recent learned information in the prompt prefix all commands share
+AI_RELEVANT_CONTEXT_TOKENS = 64 # Tokens of older learned information added per request, the items most relevant to it first
+AI_CONTEXT_REFRESH_ITEMS = 5 # Newly learned items are added to the shared prefix in groups of this many, keeping the prefix cache warm
+AI_PREFIX_CACHE = True # Reuse the attention keys and values of the shared prompt prefix between requests (torch backends)
+AI_PREFIX_CACHE_ENTRIES = 2 # Prompt prefixes kept, each about 72 KiB per token for GPT-2: the one prefix all commands share, and the previous one while requests still use it
+
+# Player state is saved this often (seconds) and resumed after a restart
+PLAYER_SNAPSHOT_INTERVAL = 10
+
+# On-disk Opus cache of frequently played tracks
+AUDIO_CACHE_DIR = "audio_cache"
+AUDIO_CACHE_MAX_BYTES = 2 * 1024 ** 3 # Least recently played files are evicted past this budget
+AUDIO_CACHE_MIN_PLAYS = 2 # Streamed plays before a track is downloaded
+AUDIO_CACHE_MAX_DURATION = 20 * 60 # seconds, longer tracks are always streamed
+AUDIO_CACHE_BITRATE = '128k'
+AUDIO_CACHE_MAX_DOWNLOADS = 1 # Concurrent background downloads
+
+# Loudness normalization, measured once per track in the background
+LOUDNESS_NORMALIZATION = True
+LOUDNESS_TARGET = -16.0 # LUFS
+LOUDNESS_MAX_GAIN = 12.0 # dB, in either direction
+LOUDNESS_TOLERANCE = 1.0 # dB; smaller corrections are skipped so Opus streams can still be passed through
+LOUDNESS_MAX_DURATION = 20 * 60 # seconds, longer tracks (and live streams) are not analysed
+LOUDNESS_MAX_ANALYSES = 1 # Concurrent background analyses
@@ -89,10 +89,6 @@ setup_environment() {
 
 # --- Bot Control Functions ---
 start_bot() {
-    # Run the cache cleaner
-    echo "Running audio cache cleaner..."
-    "$VENV_PYTHON" "utils/cleaner.py"
-
     if screen -list | grep -q "$SESSION_NAME"; then
         echo "Bot is already running."
         exit 1
@@ -0,0 +1,26 @@
+import unittest
+
+from cogs.ai_context import ContextBuilder
+
+
+class WordTokenizer:
+    """One token per word."""
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+
+class ContextBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self.builder = ContextBuilder(WordTokenizer(), budget=20, relevant_budget=5)
+        self.learned = [f"fact number {index} here" for index in range(20)]
+
+    def test_long_question_keeps_the_prefix(self):
+        short = self.builder.build(self.learned, "short question", "question", 100)
+        long = self.builder.build(self.learned, "word " * 500 + "question", "question", 100)
+        self.assertEqual(long.prefix, short.prefix)
+        self.assertEqual(len(long.ids), 100)
+        self.assertEqual(long.ids[-1], "question")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import unittest
+import unittest.mock
+
+os.environ.setdefault("BOT_OWNER_ID", "1")
+os.environ.setdefault("LOG_CHANNEL_ID", "1")
+
+import config
+from cogs.music import Music
+from cogs.track import Track
+
+
+class FakeUser:
+    id = 99
+
+
+class FakeBot:
+    def __init__(self, loop):
+        self.loop = loop
+        self.user = FakeUser()
+
+    def add_view(self, view):
+        pass
+
+    def get_guild(self, guild_id):
+        return None
+
+    def get_channel(self, channel_id):
+        return None
+
+    async def change_presence(self, activity=None):
+        pass
+
+
+class FakeVoiceClient:
+    def __init__(self):
+        self.source = None
+
+    def is_playing(self):
+        return self.source is not None
+
+    def is_paused(self):
+        return False
+
+    def play(self, source, after=None):
+        self.source = source
+
+
+class FakeGuild:
+    id = 1
+    name = "guild"
+
+
+class FakeChannel:
+    id = 2
+
+
+class FakeVoiceState:
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakeMember:
+    def __init__(self, member_id, guild):
+        self.id = member_id
+        self.guild = guild
+        self.bot = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.author = "author"
+        self.guild = FakeGuild()
+        self.channel = FakeChannel()
+        self.voice_client = FakeVoiceClient()
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class AfterPlaybackTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = unittest.mock.patch.object(config, 'LOUDNESS_NORMALIZATION', False) # No database
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.music = Music(FakeBot(asyncio.get_running_loop()))
+        self.music._has_cached_audio = lambda track: True
+        self.music._build_player = lambda track, guild_id, **kwargs: object()
+        self.music._get_prefetcher = lambda guild_id: unittest.mock.Mock()
+        self.ctx = FakeContext()
+
+    async def asyncTearDown(self):
+        self.music.nowplaying_updater.shutdown()
+
+    async def test_last_queued_song_stays_tracked(self):
+        player = self.music.get_player(self.ctx.guild.id)
+        player.queue.put_nowait(Track("Last song", "https://www.youtube.com/watch?v=aaaaaaaaaaa", duration=60))
+        await self.music._after_playback(self.ctx, None)
+        self.assertEqual(player.current.title, "Last song")
+        self.assertIn(self.ctx.guild.id, self.music.nowplaying_updater._channels)
+
+    async def test_untracked_once_nothing_plays(self):
+        self.music.get_player(self.ctx.guild.id)
+        self.music.nowplaying_updater.track(self.ctx.guild.id, self.ctx.channel.id)
+        self.ctx.voice_client = FakeVoiceClient()
+        await self.music._after_playback(self.ctx, None)
+        self.assertNotIn(self.ctx.guild.id, self.music.nowplaying_updater._channels)
+
+
+class DisconnectTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.music = Music(FakeBot(asyncio.get_running_loop()))
+        self.ctx = FakeContext()
+
+    async def asyncTearDown(self):
+        self.music.nowplaying_updater.shutdown()
+
+    async def _cut_off(self):
+        player = self.music.get_player(self.ctx.guild.id)
+        player.current = Track("Cut off", "https://www.youtube.com/watch?v=aaaaaaaaaaa", duration=60)
+        member = FakeMember(self.music.bot.user.id, self.ctx.guild)
+        await self.music.on_voice_state_update(member, FakeVoiceState(self.ctx.channel), FakeVoiceState(None))
+        return player
+
+    async def test_resume_point_expires(self):
+        with unittest.mock.patch.object(config, 'RESUME_POINT_TTL', 0):
+            player = await self._cut_off()
+            self.assertEqual(player.resume_point[0].title, "Cut off")
+            await asyncio.sleep(0.01)
+        self.assertNotIn(self.ctx.guild.id, self.music.players)
+
+    async def test_resume_point_kept_until_expiry(self):
+        player = await self._cut_off()
+        self.assertIs(self.music.players[self.ctx.guild.id], player)
+        self.assertIsNotNone(player.inactivity_timer)
+        player.cancel_inactivity_timer()
+
+    async def test_volume_without_player_creates_none(self):
+        self.ctx.voice_client = None
+        await self.music.volume.callback(self.music, self.ctx, 50)
+        self.assertNotIn(self.ctx.guild.id, self.music.players)
+
+
+if __name__ == '__main__':
+    unittest.main()
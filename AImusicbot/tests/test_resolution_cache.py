@@ -0,0 +1,29 @@
+import unittest
+
+from utils.resolution_cache import ResolutionCache
+
+URL = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+
+
+class ResolutionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResolutionCache(stream_ttl=3600) # The stream URL below carries no expiry of its own
+        self.cache.put(URL, {'id': 'aaaaaaaaaaa', 'title': "Song", 'webpage_url': URL, 'duration': 60,
+                             'url': "https://example.com/stream"})
+
+    def test_uncounted_lookups_leave_stats_alone(self):
+        self.assertIsNotNone(self.cache.get(URL, count=False))
+        self.assertIsNone(self.cache.get("https://www.youtube.com/watch?v=bbbbbbbbbbb", count=False))
+        self.assertIsNone(self.cache.get(URL, min_ttl=7200, count=False))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stale_streams']), (0, 0, 0))
+
+    def test_counted_lookups(self):
+        self.cache.get(URL)
+        self.cache.get(URL, min_ttl=7200)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stale_streams']), (1, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import os
+import pickle
+import unittest
+
+os.environ.setdefault("BOT_OWNER_ID", "1")
+os.environ.setdefault("LOG_CHANNEL_ID", "1")
+
+from cogs.youtube import YTDL_FORMAT_OPTIONS, YTDLPool
+
+
+class YTDLPoolTest(unittest.TestCase):
+    def test_options_key_survives_pickling(self):
+        # Process workers receive unpickled copies of the options, including a new logger object
+        copy = pickle.loads(pickle.dumps(YTDL_FORMAT_OPTIONS))
+        self.assertIsNot(copy['logger'], YTDL_FORMAT_OPTIONS['logger'])
+        self.assertEqual(YTDLPool._options_key(copy), YTDLPool._options_key(YTDL_FORMAT_OPTIONS))
+
+    def test_options_key_tells_options_apart(self):
+        options = dict(YTDL_FORMAT_OPTIONS, noplaylist=False)
+        self.assertNotEqual(YTDLPool._options_key(options), YTDLPool._options_key(YTDL_FORMAT_OPTIONS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,373 @@
+"""
+Text generation backends for the AI cog. Each backend loads a model and turns tokenized
+prompts (cogs.ai_context.Prompt) into text; the cog picks one by name (config.AI_BACKEND):
+
+    torch       Hugging Face model in fp32 with PyTorch, on the GPU if there is one
+    torch-int8  The same model with its linear layers dynamically quantized to int8 (CPU)
+    llama.cpp   A GGUF model run by llama-cpp-python (CPU, or GPU layers if built with CUDA)
+"""
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from .model_utils import AIError
+
+torch = None # torch and transformers are imported by _import_torch, when a torch backend loads
+transformers = None
+StopWhen = CallbackStreamer = None # Subclasses of transformers classes, defined by _import_torch
+
+
+def _import_torch():
+    """
+    Imports torch and transformers and defines the classes that subclass theirs. Importing them
+    takes seconds, so it is left to TorchBackend.load, which the AI cog runs on its background
+    loading thread, rather than done when this module is imported with the cog at startup.
+    """
+    global torch, transformers, StopWhen, CallbackStreamer
+    if CallbackStreamer is not None:
+        return
+    try:
+        import torch
+        import transformers
+        import transformers.pytorch_utils
+    except ImportError:
+        torch = None
+        raise AIError("The torch backends need torch and transformers")
+
+    class StopWhen(transformers.StoppingCriteria):
+        """
+        Ends generation as soon as should_stop() returns True, e.g. when the request timed out.
+        For a batch, should_stop() may return one flag per row to stop only those rows.
+        """
+        def __init__(self, should_stop):
+            self.should_stop = should_stop
+
+        def __call__(self, input_ids, scores, **kwargs):
+            stop = self.should_stop()
+            if isinstance(stop, bool):
+                return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+            return torch.tensor(stop, dtype=torch.bool, device=input_ids.device) # One flag per row of a batch
+
+    class CallbackStreamer(transformers.TextStreamer):
+        """
+        A token streamer for model.generate that hands each newly decoded piece of text to on_text
+        instead of printing it. TextStreamer only emits text once it ends in a complete word (or
+        a newline), so multi-token characters and words are never split across calls. The prompt
+        is skipped. on_text is called on the thread running generate().
+        """
+        def __init__(self, tokenizer, on_text):
+            super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+            self.on_text = on_text
+
+        def on_finalized_text(self, text, stream_end=False):
+            if text:
+                self.on_text(text)
+
+
+class PrefixCache:
+    """
+    Keeps the attention keys and values (past_key_values) of recently used prompt prefixes, so
+    generation only has to run the model over the part of a prompt after its prefix.
+    Prefixes are the shared header plus the recent learned items, the same for every command and
+    question; they are keyed by their token IDs, so a prefix is computed once and again only after
+    the learned items in it change.
+    At most `max_entries` prefixes are kept, least recently used first out.
+    generate() extends the cache it is given in place, so every use gets its own copy.
+    """
+    def __init__(self, model, max_entries=2):
+        self.model = model
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # tuple of prefix token IDs -> DynamicCache
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+
+    def get(self, prefix):
+        """Returns a private copy of the keys and values for the prefix token IDs, computing them on a miss."""
+        key = tuple(prefix)
+        cache = self._entries.get(key)
+        if cache is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            start = time.perf_counter()
+            with torch.no_grad():
+                input_ids = torch.tensor([prefix], device=self.model.device)
+                cache = self.model(input_ids=input_ids, past_key_values=transformers.DynamicCache(), use_cache=True).past_key_values
+            elapsed = time.perf_counter() - start
+            self.build_seconds += elapsed
+            self.misses += 1
+            self._entries[key] = cache
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logging.info(f"PrefixCache: Computed a {len(prefix)}-token prompt prefix in {elapsed:.3f}s")
+        return copy.deepcopy(cache)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """Returns a dictionary of cache counters for reporting."""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'build_seconds': self.build_seconds}
+
+
+class TorchBackend:
+    """
+    Runs a Hugging Face causal language model with PyTorch in fp32, on the GPU if one is available.
+    Batches are generated in one model.generate call and prompts sharing a prefix start from the
+    PrefixCache (disabled with prefix_cache_entries=0).
+    """
+    name = 'torch'
+
+    def __init__(self, model_name='gpt2', prefix_cache_entries=2, threads=None):
+        self.model_name = model_name
+        self.prefix_cache_entries = prefix_cache_entries
+        self.threads = threads
+        self.model = None
+        self.tokenizer = None
+        self.prefix_cache = None
+        self.max_positions = 1024 # Longest sequence (prompt + generated tokens) the model accepts
+        self.device = 'cpu'
+
+    def load(self, progress=None):
+        """Loads (downloading on first use) the tokenizer and model, reporting each step to progress(message)."""
+        progress = progress or (lambda message: None)
+        progress("Importing torch and transformers")
+        _import_torch()
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        progress(f"Loading the '{self.model_name}' tokenizer")
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_name)
+        progress(f"Loading the '{self.model_name}' model weights")
+        model = transformers.AutoModelForCausalLM.from_pretrained(self.model_name)
+        model.eval()
+        self.model = self._prepare_model(model, progress)
+
+        # Add a padding token if the tokenizer doesn't have one (common for GPT-like models)
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+            self.model.config.pad_token_id = self.model.config.eos_token_id
+        # Decoder-only models continue from the last token, so batched prompts are padded on the left
+        self.tokenizer.padding_side = 'left'
+        self.max_positions = getattr(self.model.config, 'n_positions', None) or self.tokenizer.model_max_length
+        self.prefix_cache = PrefixCache(self.model, self.prefix_cache_entries) if self.prefix_cache_entries else None
+        if self.prefix_cache and not hasattr(transformers, 'DynamicCache'):
+            logging.warning(f"{type(self).__name__}: transformers {transformers.__version__} has no DynamicCache (added in 4.36), running without the prefix cache")
+            self.prefix_cache = None
+        logging.info(f"{type(self).__name__}: Loaded '{self.model_name}' on {self.device.upper()}")
+
+    def _prepare_model(self, model, progress):
+        if torch.cuda.is_available():
+            progress("Moving the model to the GPU")
+            self.device = 'gpu'
+            return model.to('cuda')
+        return model
+
+    def generate_batch(self, prompts, max_new_tokens, should_stop=None):
+        """
+        Generates a response for each Prompt with a single model.generate call.
+        The prompts are padded into one batch so every row's new tokens start at the same
+        position and can be cut off the end of its output. `should_stop` returns a flag per prompt
+        (or one for all of them); rows whose caller gave up stop generating at the next token.
+        """
+        inputs = self._prefix_cached_inputs(prompts)
+        if inputs is None:
+            inputs = self.tokenizer.pad({'input_ids': [prompt.ids for prompt in prompts]}, padding=True, return_tensors="pt")
+            inputs = {k: v.to(self.model.device) for k, v in inputs.items()}
+        return self._generate(inputs, max_new_tokens, should_stop)
+
+    def generate_stream(self, prompt, max_new_tokens, on_text, should_stop=None):
+        """
+        Generates a response for one Prompt, passing each new piece of text to on_text as soon as it
+        is decoded, and returns the whole response. Uses the same sampling settings as generate_batch.
+        """
+        inputs = self._prefix_cached_inputs([prompt])
+        if inputs is None:
+            inputs = {
+                'input_ids': torch.tensor([prompt.ids], device=self.model.device),
+                'attention_mask': torch.ones((1, len(prompt.ids)), dtype=torch.long, device=self.model.device),
+            }
+        return self._generate(inputs, max_new_tokens, should_stop, streamer=CallbackStreamer(self.tokenizer, on_text))[0]
+
+    def _generate(self, inputs, max_new_tokens, should_stop, streamer=None):
+        with torch.no_grad():
+            output_sequences = self.model.generate(
+                **inputs, # The attention mask keeps the padding out of the prompts
+                max_new_tokens=max_new_tokens,
+                num_return_sequences=1,
+                no_repeat_ngram_size=2,
+                do_sample=True,
+                top_k=50,
+                top_p=0.95,
+                temperature=0.7,
+                pad_token_id=self.tokenizer.pad_token_id, # Use pad_token_id for generation
+                stopping_criteria=transformers.StoppingCriteriaList([StopWhen(should_stop)]) if should_stop else None,
+                streamer=streamer # Streaming only works for a single prompt
+            )
+
+        # Only decode the new tokens, which removes the prompt and its padding
+        prompt_length = inputs['input_ids'].shape[1]
+        return [self.tokenizer.decode(sequence[prompt_length:], skip_special_tokens=True).strip() for sequence in output_sequences]
+
+    def _prefix_cached_inputs(self, prompts):
+        """
+        Returns generate() inputs that start from the cached keys and values of the prompts' shared
+        prefix, or None if the prefix cache is off or the prompts do not share one.
+        The prompts' tails are padded between the prefix and the tail rather than on the left,
+        so the prefix sits at the same positions in every row and one cached copy serves them all.
+        """
+        if self.prefix_cache is None or not prompts[0].prefix_length:
+            return None
+        prefix = prompts[0].prefix
+        if any(prompt.prefix != prefix or len(prompt.ids) == prompt.prefix_length for prompt in prompts):
+            return None
+        past_key_values = self.prefix_cache.get(prefix)
+        if len(prompts) > 1:
+            past_key_values.batch_repeat_interleave(len(prompts))
+        tails = [prompt.ids[prompt.prefix_length:] for prompt in prompts]
+        width = max(len(tail) for tail in tails)
+        pad = self.tokenizer.pad_token_id
+        input_ids = [prefix + [pad] * (width - len(tail)) + tail for tail in tails]
+        attention_mask = [[1] * len(prefix) + [0] * (width - len(tail)) + [1] * len(tail) for tail in tails]
+        return {
+            'input_ids': torch.tensor(input_ids, device=self.model.device),
+            'attention_mask': torch.tensor(attention_mask, device=self.model.device),
+            'past_key_values': past_key_values,
+        }
+
+    def stats(self):
+        return {'prefix_cache': self.prefix_cache.stats() if self.prefix_cache else None}
+
+
+def conv1d_to_linear(module):
+    """
+    Replaces every transformers Conv1D in module with an equivalent nn.Linear, in place.
+    GPT-2 implements its attention and MLP projections as Conv1D (y = x @ W + b with W stored
+    as in x out), which quantize_dynamic does not recognise; as Linear layers they get quantized.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, transformers.pytorch_utils.Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+            linear.bias = torch.nn.Parameter(child.bias.detach().clone())
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    The torch backend with dynamic int8 quantization: the weights of every linear layer are stored
+    as int8 and activations are quantized on the fly, which makes the matrix multiplications that
+    dominate CPU generation faster and the model about a third of its fp32 size. CPU only.
+    """
+    name = 'torch-int8'
+
+    def _prepare_model(self, model, progress):
+        progress("Quantizing the model to int8")
+        self.device = 'cpu'
+        return torch.ao.quantization.quantize_dynamic(conv1d_to_linear(model), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class LlamaTokenizer:
+    """The tokenizer interface the ContextBuilder uses, backed by a llama.cpp model's own vocabulary."""
+    def __init__(self, llm):
+        self.llm = llm
+
+    def encode(self, text, add_special_tokens=False):
+        return self.llm.tokenize(text.encode('utf-8'), add_bos=add_special_tokens, special=False)
+
+    def decode(self, ids):
+        return self.llm.detokenize(ids).decode('utf-8', errors='ignore')
+
+
+class LlamaCppBackend:
+    """
+    Runs a GGUF model (e.g. a Q8_0 or Q4_K_M quantization) with llama.cpp through llama-cpp-python.
+    Prompts are generated one after another; llama.cpp's LlamaRAMCache keeps the evaluated state
+    of recent prompts, so a prompt that starts like an earlier one only evaluates the new tokens.
+    """
+    name = 'llama.cpp'
+
+    def __init__(self, model_path, context_length=2048, threads=None, gpu_layers=0, cache_bytes=256 * 1024 ** 2):
+        self.model_path = model_path
+        self.context_length = context_length
+        self.threads = threads
+        self.gpu_layers = gpu_layers
+        self.cache_bytes = cache_bytes
+        self.llm = None
+        self.tokenizer = None
+        self.max_positions = context_length
+        self.device = 'cpu'
+
+    def load(self, progress=None):
+        """Loads the GGUF model, reporting each step to progress(message)."""
+        progress = progress or (lambda message: None)
+        try:
+            from llama_cpp import Llama, LlamaRAMCache
+        except ImportError:
+            raise AIError(f"The {self.name} backend needs llama-cpp-python")
+        if not self.model_path or not os.path.exists(self.model_path):
+            raise AIError(f"GGUF model not found at {self.model_path}")
+        progress(f"Loading {os.path.basename(self.model_path)}")
+        self.llm = Llama(model_path=self.model_path, n_ctx=self.context_length, n_threads=self.threads,
+                         n_gpu_layers=self.gpu_layers, verbose=False)
+        if self.cache_bytes:
+            self.llm.set_cache(LlamaRAMCache(capacity_bytes=self.cache_bytes))
+        self.tokenizer = LlamaTokenizer(self.llm)
+        self.max_positions = self.llm.n_ctx()
+        self.device = 'gpu' if self.gpu_layers else 'cpu'
+        logging.info(f"LlamaCppBackend: Loaded {self.model_path} ({self.max_positions} token context)")
+
+    def generate_batch(self, prompts, max_new_tokens, should_stop=None):
+        responses = []
+        for index, prompt in enumerate(prompts):
+            def stopped(index=index):
+                if should_stop is None:
+                    return False
+                stop = should_stop()
+                return stop if isinstance(stop, bool) else stop[index]
+            responses.append(self._complete(prompt, max_new_tokens, stopped))
+        return responses
+
+    def generate_stream(self, prompt, max_new_tokens, on_text, should_stop=None):
+        """Generates a response for one Prompt, passing each new piece of text to on_text, and returns the whole response."""
+        return self._complete(prompt, max_new_tokens, should_stop or (lambda: False), on_text)
+
+    def _complete(self, prompt, max_new_tokens, stopped, on_text=None):
+        if stopped():
+            return ""
+        ids = prompt.ids
+        if self.llm.token_bos() is not None and (not ids or ids[0] != self.llm.token_bos()):
+            ids = [self.llm.token_bos()] + ids
+        pieces = []
+        for chunk in self.llm.create_completion(ids, max_tokens=max_new_tokens, temperature=0.7, top_k=50,
+                                                top_p=0.95, stream=True):
+            piece = chunk['choices'][0]['text']
+            pieces.append(piece)
+            if on_text and piece:
+                on_text(piece)
+            if stopped():
+                break
+        return ''.join(pieces).strip()
+
+    def stats(self):
+        return {'prefix_cache': None}
+
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, QuantizedTorchBackend, LlamaCppBackend)}
+
+
+def create_backend(name, model_name='gpt2', gguf_path=None, prefix_cache_entries=2, threads=None,
+                   context_length=2048, gpu_layers=0, cache_bytes=256 * 1024 ** 2):
+    """Returns the (not yet loaded) backend called name, configured from the keyword arguments that apply to it."""
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise AIError(f"Unknown AI backend '{name}', expected one of {', '.join(BACKENDS)}")
+    if backend is LlamaCppBackend:
+        return LlamaCppBackend(gguf_path, context_length=context_length, threads=threads, gpu_layers=gpu_layers, cache_bytes=cache_bytes)
+    return backend(model_name, prefix_cache_entries=prefix_cache_entries, threads=threads)
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+
+class AudioCache:
+    """
+    A content-addressed cache of Opus files on disk.
+    Files are named after a hash of the track's cache key (e.g. "youtube:<video id>").
+    Tracks that are played often enough are downloaded in the background (streams that are
+    already Opus are copied as they are, others are transcoded), later plays
+    read the local file instead of re-streaming from YouTube, and the directory is kept
+    under a byte budget by evicting the least recently played files first. Access
+    recency is stored in the files' mtime so it survives restarts.
+    """
+    def __init__(self, cache_dir="audio_cache", max_bytes=2 * 1024 ** 3, min_plays=2, max_duration=20 * 60, bitrate='128k', max_downloads=1):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays # Plays before a track is worth caching
+        self.max_duration = max_duration # Longer tracks (and live streams) are never cached
+        self.bitrate = bitrate
+        self._download_slots = asyncio.Semaphore(max_downloads)
+        self._entries = OrderedDict() # file digest -> size in bytes, least recently used first
+        self._bytes = 0
+        self._play_counts = OrderedDict()
+        self._downloading = set()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.downloads = 0
+        self.failed_downloads = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.rescan()
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, self._digest(key) + '.opus')
+
+    def rescan(self):
+        """Rebuilds the index from the files on disk, most recently used last."""
+        files = []
+        in_progress = {os.path.basename(self._path(key)) + '.part' for key in self._downloading}
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            if filename.endswith('.part'):
+                if filename not in in_progress:
+                    os.remove(path) # Leftover of an interrupted download
+            elif filename.endswith('.opus') and os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, filename[:-len('.opus')], stat.st_size))
+        self._entries = OrderedDict((digest, size) for _, digest, size in sorted(files))
+        self._bytes = sum(self._entries.values())
+        self.evict()
+
+    def contains(self, key):
+        return bool(key) and self._digest(key) in self._entries
+
+    def lookup(self, key):
+        """Returns the path of the cached file for key and marks it as recently used, or None."""
+        digest = self._digest(key) if key else None
+        if digest not in self._entries:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            os.utime(path) # Persist recency for the next rescan
+        except OSError:
+            # Deleted behind our back
+            self._bytes -= self._entries.pop(digest)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        self.bytes_saved += self._entries[digest]
+        return path
+
+    def note_play(self, key, url, duration, is_opus=False, loop=None):
+        """
+        Counts a streamed play of key and starts a background download once the track
+        has been played `min_plays` times. `is_opus` says the stream is already 48 kHz Opus.
+        """
+        if not key or not url or not duration or duration > self.max_duration:
+            return
+        count = self._play_counts.pop(key, 0) + 1
+        self._play_counts[key] = count
+        if len(self._play_counts) > 4096:
+            self._play_counts.popitem(last=False)
+        if count >= self.min_plays and key not in self._downloading and not self.contains(key):
+            self._downloading.add(key)
+            (loop or asyncio.get_event_loop()).create_task(self._download(key, url, is_opus))
+
+    async def _download(self, key, url, is_opus=False):
+        path = self._path(key)
+        # Opus streams are remuxed packet for packet; re-encoding them would cost CPU and quality
+        codec = ['-c:a', 'copy'] if is_opus else ['-c:a', 'libopus', '-b:a', self.bitrate]
+        part_path = path + '.part'
+        try:
+            async with self._download_slots:
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+                    '-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5',
+                    '-i', url, '-vn', '-map', '0:a:0', *codec, '-f', 'opus', part_path,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                )
+                _, stderr = await process.communicate()
+                if process.returncode != 0:
+                    raise RuntimeError(stderr.decode(errors='replace').strip() or f"ffmpeg exited with {process.returncode}")
+                os.replace(part_path, path)
+            size = os.path.getsize(path)
+            digest = self._digest(key)
+            self._bytes -= self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            self._bytes += size
+            self.downloads += 1
+            logging.info(f"AudioCache: Cached {key} ({size / 1024 / 1024:.1f} MiB, {'copied' if is_opus else 'transcoded'}) in {time.perf_counter() - start:.1f}s")
+            self.evict()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed_downloads += 1
+            logging.warning(f"AudioCache: Could not cache {key}: {e}")
+        finally:
+            self._downloading.discard(key)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def evict(self):
+        """Deletes least recently used files until the cache fits its byte budget."""
+        while self._entries and self._bytes > self.max_bytes:
+            digest, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, digest + '.opus'))
+            except FileNotFoundError:
+                pass
+            logging.info(f"AudioCache: Evicted {digest} ({size / 1024 / 1024:.1f} MiB)")
+
+    def stats(self):
+        """Returns a dictionary of cache counters for reporting."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'downloads': self.downloads,
+            'failed_downloads': self.failed_downloads,
+            'downloading': len(self._downloading),
+            'evictions': self.evictions,
+        }
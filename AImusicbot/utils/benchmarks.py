@@ -0,0 +1,351 @@
+"""
+Benchmarks for the bot's hot paths. Run from the AImusicbot directory, e.g.:
+
+    python -m utils.benchmarks opus-passthrough [input]
+    python -m utils.benchmarks volume [input]
+    python -m utils.benchmarks ai-batch
+    python -m utils.benchmarks ai-prefix
+    python -m utils.benchmarks ai-backends [--gguf path]
+"""
+import argparse
+import asyncio
+import audioop
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import discord
+
+
+def _run_child(args):
+    """Runs a command to completion and returns (cpu seconds, wall seconds) it used."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    subprocess.run(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime), wall
+
+
+def make_test_audio(path, seconds=120):
+    """Writes an Opus-in-WebM file like the ones YouTube serves (48 kHz stereo, ~128 kbps)."""
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f"anoisesrc=color=pink:duration={seconds}:sample_rate=48000",
+        '-ac', '2', '-c:a', 'libopus', '-b:a', '128k', path
+    ], check=True)
+
+
+def _ffmpeg_to_discord_args(source, codec):
+    """The ffmpeg command line discord.FFmpegOpusAudio builds, writing to /dev/null instead of a pipe."""
+    return ['ffmpeg', '-nostdin', '-i', source, '-map_metadata', '-1', '-f', 'opus', '-c:a', codec,
+            '-ar', '48000', '-ac', '2', '-b:a', '128k', '-loglevel', 'warning', '-vn', '-y', os.devnull]
+
+
+def bench_opus_passthrough(source=None, runs=3):
+    """Compares ffmpeg CPU time for re-encoding an Opus stream against remuxing it with -c:a copy."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if source is None:
+            source = os.path.join(tmp, 'test.webm')
+            make_test_audio(source)
+        probe = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', source],
+                               capture_output=True, text=True, check=True)
+        duration = float(probe.stdout.strip())
+
+        results = {}
+        for label, codec in (('transcode', 'libopus'), ('passthrough', 'copy')):
+            samples = [_run_child(_ffmpeg_to_discord_args(source, codec)) for _ in range(runs)]
+            cpu = min(sample[0] for sample in samples)
+            wall = min(sample[1] for sample in samples)
+            results[label] = cpu
+            print(f"{label:12} cpu {cpu:6.2f}s  wall {wall:6.2f}s  ({cpu / duration * 100:5.2f}% of a core per stream)")
+
+    saved = results['transcode'] - results['passthrough']
+    print(f"Audio length {duration:.0f}s, best of {runs} runs.")
+    print(f"Passthrough saves {saved:.2f} CPU seconds per stream ({saved / results['transcode']:.0%}), "
+          f"{saved / duration * 3600:.0f} CPU seconds per stream-hour.")
+    return results
+
+
+def _child_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _pcm_volume_run(source, apply_gain, encoder):
+    """
+    Plays source the way discord.FFmpegPCMAudio + PCMVolumeTransformer do: ffmpeg decodes to
+    20 ms s16le frames on a pipe and Python scales every frame (and Opus-encodes it, if libopus
+    is available). Returns (cpu seconds in ffmpeg + Python, wall seconds).
+    """
+    frame_size = discord.opus.Encoder.FRAME_SIZE
+    child_before = _child_cpu()
+    own_before = time.process_time()
+    start = time.perf_counter()
+    process = subprocess.Popen(['ffmpeg', '-nostdin', '-loglevel', 'warning', '-i', source, '-f', 's16le',
+                                '-ar', '48000', '-ac', '2', 'pipe:1'],
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    while True:
+        frame = process.stdout.read(frame_size)
+        if len(frame) != frame_size:
+            break
+        frame = apply_gain(frame)
+        if encoder is not None:
+            encoder.encode(frame, encoder.SAMPLES_PER_FRAME)
+    process.stdout.close()
+    process.wait()
+    wall = time.perf_counter() - start
+    return (time.process_time() - own_before) + (_child_cpu() - child_before), wall
+
+
+def bench_volume(source=None, runs=3, volume=0.5):
+    """
+    Compares CPU time per stream for applying volume in ffmpeg's filter graph (what the bot does)
+    against scaling decoded PCM in Python per frame, as PCMVolumeTransformer does, and against
+    the same with NumPy.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    try:
+        encoder = discord.opus.Encoder()
+    except discord.opus.OpusNotLoaded:
+        encoder = None
+        print("libopus is not loaded; the Python paths below exclude Opus encoding and are a lower bound.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if source is None:
+            source = os.path.join(tmp, 'test.webm')
+            make_test_audio(source)
+        probe = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', source],
+                               capture_output=True, text=True, check=True)
+        duration = float(probe.stdout.strip())
+
+        filter_args = _ffmpeg_to_discord_args(source, 'libopus')
+        filter_args[filter_args.index('-vn'):filter_args.index('-vn')] = ['-filter:a', f"volume={volume:g}"]
+        approaches = [('ffmpeg filter', lambda: _run_child(filter_args)),
+                      ('audioop.mul', lambda: _pcm_volume_run(source, lambda frame: audioop.mul(frame, 2, volume), encoder))]
+        if np is not None:
+            def numpy_gain(frame):
+                samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+                return np.clip(samples * volume, -32768, 32767).astype(np.int16).tobytes()
+            approaches.append(('numpy', lambda: _pcm_volume_run(source, numpy_gain, encoder)))
+
+        results = {}
+        for label, run in approaches:
+            samples = [run() for _ in range(runs)]
+            cpu = min(sample[0] for sample in samples)
+            wall = min(sample[1] for sample in samples)
+            results[label] = cpu
+            print(f"{label:14} cpu {cpu:6.2f}s  wall {wall:6.2f}s  ({cpu / duration * 100:5.2f}% of a core per stream)")
+
+    print(f"Audio length {duration:.0f}s, volume {volume:.0%}, best of {runs} runs.")
+    return results
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_ai_batch(requests=8, max_batch=4, batch_window=0.01):
+    """
+    Compares the AI cog's text generation with `requests` prompts arriving at once, run one at a
+    time (the sequential path) against micro-batches of up to `max_batch` through the InferenceService.
+    Reports throughput and per-request latency from submission to answer.
+    Needs the bot's .env (the AI cog reads config) and downloads GPT-2 on first use.
+    """
+    import torch
+    from cogs.neural_network_cog import AIModelManager
+    from utils.inference_service import InferenceService
+
+    manager = AIModelManager()
+    manager.load_model()
+    if not manager.is_ready():
+        raise SystemExit("The AI model could not be loaded.")
+    prompt, max_new_tokens = manager.build_prompt('ask', "What is your favourite song?")
+
+    async def run(service):
+        async def timed():
+            start = time.perf_counter()
+            await service.run_batched(manager.generate_batch, prompt, max_new_tokens)
+            return time.perf_counter() - start
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed() for _ in range(requests)))
+        return time.perf_counter() - start, latencies
+
+    results = {}
+    for label, batch in (('sequential', 1), (f"batched x{max_batch}", max_batch)):
+        torch.manual_seed(0)
+        service = InferenceService(max_queue=requests, timeout=3600, max_batch=batch, batch_window=batch_window)
+        wall, latencies = asyncio.run(run(service))
+        service.shutdown()
+        results[label] = wall
+        print(f"{label:12} {requests / wall:5.2f} requests/s  latency p50 {_percentile(latencies, 0.5):6.2f}s  "
+              f"max {max(latencies):6.2f}s  (avg batch {service.stats()['avg_batch']:.1f})")
+
+    print(f"{requests} concurrent requests, up to {max_new_tokens} new tokens each, '{manager.backend.name}' backend on {manager.device}.")
+    return results
+
+
+def bench_ai_prefix(runs=5):
+    """
+    Compares time to first token for an ?ask prompt with and without the prefix cache: the
+    uncached path runs the model over the whole prompt, the cached one only over the part after
+    the shared header and learned items. Also reports the one-off cost of computing the prefix.
+    Needs the bot's .env (the AI cog reads config) and downloads GPT-2 on first use.
+    """
+    import statistics
+    from cogs.neural_network_cog import AIModelManager
+    from utils.ai_backends import PrefixCache, TorchBackend
+
+    manager = AIModelManager()
+    manager.load_model()
+    if not manager.is_ready():
+        raise SystemExit("The AI model could not be loaded.")
+    backend = manager.backend
+    if not isinstance(backend, TorchBackend):
+        raise SystemExit(f"The prefix cache belongs to the torch backends, not '{backend.name}'.")
+    prompt, _ = manager.build_prompt('ask', "What is your favourite song?")
+
+    def first_token():
+        start = time.perf_counter()
+        manager.generate_batch([prompt], 1)
+        return time.perf_counter() - start
+
+    backend.prefix_cache = None
+    first_token() # Warm-up
+    uncached = statistics.median(first_token() for _ in range(runs))
+    backend.prefix_cache = PrefixCache(backend.model)
+    cold = first_token()
+    cached = statistics.median(first_token() for _ in range(runs))
+
+    print(f"uncached     time to first token {uncached * 1000:7.1f} ms")
+    print(f"cached       time to first token {cached * 1000:7.1f} ms  ({uncached / cached:.1f}x faster)")
+    print(f"first use    time to first token {cold * 1000:7.1f} ms  (prefix computed in {backend.prefix_cache.build_seconds * 1000:.1f} ms)")
+    print(f"Prompt of {len(prompt.ids)} tokens, {prompt.prefix_length} of them cached, median of {runs} runs, '{backend.name}' backend on {manager.device}.")
+    return {'uncached': uncached, 'cached': cached, 'cold': cold}
+
+
+BACKEND_BENCH_PROMPT = "Based on the following information, tell a short, funny joke.\n\nTell me a short, funny joke:\n\nJoke:"
+
+
+def _rss_mib():
+    """Returns this process's current resident set size in MiB."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def bench_ai_backend(name, model_name='gpt2', gguf_path=None, new_tokens=64, runs=3):
+    """
+    Loads one AI backend in this process and prints its load time, memory and generation speed
+    as JSON. Run by bench_ai_backends in a fresh process per backend, so their memory use is not mixed.
+    """
+    from cogs.ai_context import Prompt
+    from utils.ai_backends import create_backend
+
+    rss_before = _rss_mib()
+    start = time.perf_counter()
+    backend = create_backend(name, model_name=model_name, gguf_path=gguf_path, prefix_cache_entries=0)
+    backend.load()
+    load_seconds = time.perf_counter() - start
+    rss = _rss_mib()
+
+    prompt = Prompt(backend.tokenizer.encode(BACKEND_BENCH_PROMPT), 0)
+    backend.generate_batch([prompt], 8) # Warm-up
+    rates = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = backend.generate_batch([prompt], new_tokens)[0]
+        rates.append(max(1, len(backend.tokenizer.encode(text))) / (time.perf_counter() - start))
+    print(json.dumps({
+        'load_seconds': load_seconds,
+        'rss_mib': rss,
+        'model_rss_mib': rss - rss_before,
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'tokens_per_second': sorted(rates)[len(rates) // 2],
+        'device': backend.device,
+    }))
+
+
+def bench_ai_backends(backends=None, model_name='gpt2', gguf_path=None, new_tokens=64, runs=3):
+    """
+    Compares the AI backends' load time, resident memory and generation speed (median tokens per
+    second over `runs` generations of up to `new_tokens` tokens), each in its own process.
+    """
+    results = {}
+    for name in backends or ('torch', 'torch-int8', 'llama.cpp'):
+        args = [sys.executable, '-m', 'utils.benchmarks', 'ai-backend', name, '--model', model_name,
+                '--tokens', str(new_tokens), '--runs', str(runs)]
+        if gguf_path:
+            args += ['--gguf', gguf_path]
+        child = subprocess.run(args, capture_output=True, text=True)
+        if child.returncode != 0:
+            reason = (child.stderr.strip().splitlines() or ["no output"])[-1]
+            print(f"{name:11} failed: {reason}")
+            continue
+        result = results[name] = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{name:11} load {result['load_seconds']:6.1f}s  RSS {result['rss_mib']:7.0f} MiB "
+              f"(model {result['model_rss_mib']:6.0f} MiB, peak {result['peak_rss_mib']:7.0f} MiB)  "
+              f"{result['tokens_per_second']:6.1f} tokens/s on {result['device']}")
+    print(f"Up to {new_tokens} new tokens per generation, median of {runs} runs.")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the music bot.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    passthrough = subparsers.add_parser('opus-passthrough', help="ffmpeg CPU for Opus re-encoding vs. codec copy")
+    passthrough.add_argument('source', nargs='?', help="Opus file or stream URL (default: generated test audio)")
+    passthrough.add_argument('--runs', type=int, default=3)
+
+    volume = subparsers.add_parser('volume', help="CPU for volume in ffmpeg's filter graph vs. PCMVolumeTransformer-style scaling")
+    volume.add_argument('source', nargs='?', help="Audio file or stream URL (default: generated test audio)")
+    volume.add_argument('--runs', type=int, default=3)
+    volume.add_argument('--volume', type=float, default=0.5)
+
+    ai_batch = subparsers.add_parser('ai-batch', help="AI generation throughput and latency, sequential vs. micro-batched")
+    ai_batch.add_argument('--requests', type=int, default=8)
+    ai_batch.add_argument('--max-batch', type=int, default=4)
+    ai_batch.add_argument('--window', type=float, default=0.01, help="Batching window in seconds")
+
+    ai_prefix = subparsers.add_parser('ai-prefix', help="AI time to first token with and without the prompt prefix cache")
+    ai_prefix.add_argument('--runs', type=int, default=5)
+
+    ai_backends = subparsers.add_parser('ai-backends', help="AI backends' load time, memory and tokens per second")
+    ai_backends.add_argument('backends', nargs='*', help="Backends to compare (default: torch torch-int8 llama.cpp)")
+    ai_backends.add_argument('--model', default='gpt2', help="Hugging Face model for the torch backends")
+    ai_backends.add_argument('--gguf', help="GGUF model file for the llama.cpp backend")
+    ai_backends.add_argument('--tokens', type=int, default=64)
+    ai_backends.add_argument('--runs', type=int, default=3)
+
+    ai_backend = subparsers.add_parser('ai-backend', help="One AI backend, measured by ai-backends in a fresh process")
+    ai_backend.add_argument('backend')
+    ai_backend.add_argument('--model', default='gpt2')
+    ai_backend.add_argument('--gguf')
+    ai_backend.add_argument('--tokens', type=int, default=64)
+    ai_backend.add_argument('--runs', type=int, default=3)
+
+    args = parser.parse_args()
+    if args.benchmark == 'opus-passthrough':
+        bench_opus_passthrough(args.source, runs=args.runs)
+    elif args.benchmark == 'volume':
+        bench_volume(args.source, runs=args.runs, volume=args.volume)
+    elif args.benchmark == 'ai-batch':
+        bench_ai_batch(args.requests, max_batch=args.max_batch, batch_window=args.window)
+    elif args.benchmark == 'ai-prefix':
+        bench_ai_prefix(runs=args.runs)
+    elif args.benchmark == 'ai-backends':
+        bench_ai_backends(args.backends, model_name=args.model, gguf_path=args.gguf, new_tokens=args.tokens, runs=args.runs)
+    elif args.benchmark == 'ai-backend':
+        bench_ai_backend(args.backend, model_name=args.model, gguf_path=args.gguf, new_tokens=args.tokens, runs=args.runs)
+
+
+if __name__ == '__main__':
+    main()
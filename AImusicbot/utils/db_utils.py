@@ -1,86 +1,175 @@
-import sqlite3
-import logging
-from datetime import datetime
-
-DB_PATH = "self_healing.db"
-
-def initialize_db():
-    """Creates the database and the log table if they don't exist."""
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS healing_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    event TEXT NOT NULL,
-                    details TEXT
-                )
-            """)
-            # Create a new table for learned data if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS learned_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    data TEXT NOT NULL
-                )
-            """)
-            conn.commit()
-            logging.info("Database initialized successfully, including learned_data table.")
-    except sqlite3.Error as e:
-        logging.error(f"Database error during initialization: {e}")
-
-def log_healing_event(event, details=""):
-    """Logs a self-healing event to the database."""
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute(
-                "INSERT INTO healing_log (timestamp, event, details) VALUES (?, ?, ?)",
-                (timestamp, event, details)
-            )
-            conn.commit()
-            logging.info(f"Logged healing event: {event}")
-    except sqlite3.Error as e:
-        logging.error(f"Failed to log healing event: {e}")
-
-def save_learned_data(data_list):
-    """Saves a list of learned data strings to the database."""
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            # Clear existing learned data before saving the new list
-            cursor.execute("DELETE FROM learned_data")
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            for data_item in data_list:
-                cursor.execute(
-                    "INSERT INTO learned_data (timestamp, data) VALUES (?, ?)",
-                    (timestamp, data_item)
-                )
-            conn.commit()
-            logging.info(f"Saved {len(data_list)} learned data items to the database.")
-    except sqlite3.Error as e:
-        logging.error(f"Failed to save learned data: {e}")
-
-def load_learned_data():
-    """Loads all learned data strings from the database."""
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT data FROM learned_data ORDER BY timestamp")
-            learned_data = [row[0] for row in cursor.fetchall()]
-            logging.info(f"Loaded {len(learned_data)} learned data items from the database.")
-            return learned_data
-    except sqlite3.Error as e:
-        logging.error(f"Failed to load learned data: {e}")
-        return [] # Return empty list on error
-
-if __name__ == '__main__':
-    initialize_db()
-    log_healing_event("Test Event", "This is a test of the self-healing log.")
-    # Example of saving and loading learned data
-    # save_learned_data(["fact 1", "fact 2"])
-    # loaded_data = load_learned_data()
-    # print(f"Loaded data: {loaded_data}")
-    print("Database initialized and test event logged.")
+import sqlite3
+import logging
+from datetime import datetime
+
+DB_PATH = "self_healing.db"
+
+def initialize_db():
+    """Creates the database and the log table if they don't exist."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            # Write-ahead logging lets the periodic player snapshots commit without blocking readers
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS healing_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    details TEXT
+                )
+            """)
+            # Create a new table for learned data if it doesn't exist
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS learned_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            # Measured loudness of played tracks, keyed by video ID
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS track_loudness (
+                    track_key TEXT PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    loudness REAL NOT NULL,
+                    gain REAL NOT NULL
+                )
+            """)
+            # The last known player state of every guild the bot was playing in
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS player_snapshots (
+                    guild_id INTEGER PRIMARY KEY,
+                    voice_channel_id INTEGER NOT NULL,
+                    text_channel_id INTEGER,
+                    track TEXT,
+                    position REAL NOT NULL,
+                    volume REAL NOT NULL,
+                    speed REAL NOT NULL,
+                    looping INTEGER NOT NULL,
+                    queue TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            logging.info("Database initialized successfully, including learned_data, track_loudness and player_snapshots tables.")
+    except sqlite3.Error as e:
+        logging.error(f"Database error during initialization: {e}")
+
+def log_healing_event(event, details=""):
+    """Logs a self-healing event to the database."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cursor.execute(
+                "INSERT INTO healing_log (timestamp, event, details) VALUES (?, ?, ?)",
+                (timestamp, event, details)
+            )
+            conn.commit()
+            logging.info(f"Logged healing event: {event}")
+    except sqlite3.Error as e:
+        logging.error(f"Failed to log healing event: {e}")
+
+def save_learned_data(data_list):
+    """Saves a list of learned data strings to the database."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            # Clear existing learned data before saving the new list
+            cursor.execute("DELETE FROM learned_data")
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for data_item in data_list:
+                cursor.execute(
+                    "INSERT INTO learned_data (timestamp, data) VALUES (?, ?)",
+                    (timestamp, data_item)
+                )
+            conn.commit()
+            logging.info(f"Saved {len(data_list)} learned data items to the database.")
+    except sqlite3.Error as e:
+        logging.error(f"Failed to save learned data: {e}")
+
+def load_learned_data():
+    """Loads all learned data strings from the database."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT data FROM learned_data ORDER BY timestamp")
+            learned_data = [row[0] for row in cursor.fetchall()]
+            logging.info(f"Loaded {len(learned_data)} learned data items from the database.")
+            return learned_data
+    except sqlite3.Error as e:
+        logging.error(f"Failed to load learned data: {e}")
+        return [] # Return empty list on error
+
+def save_track_loudness(track_key, loudness, gain):
+    """Stores the measured loudness (LUFS) and normalization gain (dB) of a track."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cursor.execute(
+                "INSERT OR REPLACE INTO track_loudness (track_key, timestamp, loudness, gain) VALUES (?, ?, ?, ?)",
+                (track_key, timestamp, loudness, gain)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Failed to save track loudness: {e}")
+
+def load_track_loudness():
+    """Loads the normalization gains (dB) of all measured tracks as a {track_key: gain} dictionary."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT track_key, gain FROM track_loudness")
+            gains = dict(cursor.fetchall())
+            logging.info(f"Loaded the loudness of {len(gains)} tracks from the database.")
+            return gains
+    except sqlite3.Error as e:
+        logging.error(f"Failed to load track loudness: {e}")
+        return {}
+
+def save_player_snapshots(snapshots, deleted_guild_ids=()):
+    """
+    Writes player snapshots and deletes those of guilds that stopped playing, all in one transaction.
+    Each snapshot is a (guild_id, voice_channel_id, text_channel_id, track, position, volume, speed,
+    looping, queue) tuple, with the track and the queue already serialized.
+    """
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("PRAGMA synchronous=NORMAL") # Durable enough with WAL, and no fsync per commit
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            conn.executemany(
+                "INSERT OR REPLACE INTO player_snapshots (guild_id, voice_channel_id, text_channel_id, track, position, volume, speed, looping, queue, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [snapshot + (timestamp,) for snapshot in snapshots]
+            )
+            conn.executemany("DELETE FROM player_snapshots WHERE guild_id = ?", [(guild_id,) for guild_id in deleted_guild_ids])
+            conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Failed to save player snapshots: {e}")
+        return False
+
+def load_player_snapshots():
+    """Loads all player snapshots as a list of dictionaries."""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("SELECT guild_id, voice_channel_id, text_channel_id, track, position, volume, speed, looping, queue FROM player_snapshots")
+            snapshots = [dict(row) for row in cursor.fetchall()]
+            logging.info(f"Loaded {len(snapshots)} player snapshots from the database.")
+            return snapshots
+    except sqlite3.Error as e:
+        logging.error(f"Failed to load player snapshots: {e}")
+        return []
+
+if __name__ == '__main__':
+    initialize_db()
+    log_healing_event("Test Event", "This is a test of the self-healing log.")
+    # Example of saving and loading learned data
+    # save_learned_data(["fact 1", "fact 2"])
+    # loaded_data = load_learned_data()
+    # print(f"Loaded data: {loaded_data}")
+    print("Database initialized and test event logged.")
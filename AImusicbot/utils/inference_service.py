@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from .model_utils import AIError
+
+_STOP = object() # Queued by shutdown() to end the worker thread
+
+
+class InferenceBusy(AIError):
+    """Raised to a caller when the inference queue is full."""
+
+
+class InferenceTimeout(AIError):
+    """Raised to a caller whose request did not finish within its timeout."""
+
+
+class _Request:
+    __slots__ = ('func', 'args', 'kwargs', 'batch_item', 'future', 'cancelled', 'enqueued')
+
+    def __init__(self, func, args, kwargs, batch_item=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.batch_item = batch_item # Set for batchable requests; func then takes a list of items
+        self.future = Future()
+        self.cancelled = threading.Event() # Set when the caller gave up; long jobs poll it to stop early
+        self.enqueued = time.perf_counter()
+
+    @property
+    def batch_key(self):
+        """Requests with equal keys can share one call: the same function with the same shared arguments."""
+        if self.batch_item is None:
+            return None
+        return (self.func, self.args, tuple(sorted(self.kwargs.items())))
+
+
+class InferenceService:
+    """
+    Runs blocking model inference on one dedicated worker thread, so a multi-second
+    generate() never stalls the event loop (voice, heartbeats, other guilds' commands).
+    Requests wait in a bounded FIFO queue; when it is full, submit() fails right away with
+    InferenceBusy instead of piling up work nobody will wait for. Every request has a
+    timeout: a request still queued when it expires is dropped, and one that is already
+    running is asked to stop through the `should_stop` callable it is passed.
+    One thread is enough because the model is shared and PyTorch already spreads a single
+    generate() over all cores; running several at once would only make each slower.
+
+    Batchable requests (submit_batched) are micro-batched: once the worker picks one up it
+    waits up to `batch_window` seconds for more requests with the same batch key and runs
+    up to `max_batch` of them in a single call, which costs little more than one of them alone.
+    """
+    def __init__(self, max_queue=8, timeout=60, max_batch=1, batch_window=0.0, samples=256):
+        self.timeout = timeout
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._held = None # Taken from the queue while batching but belongs to the next call
+        self._thread = None
+        self._current = [] # The requests the worker is running
+        self._lock = threading.Lock()
+        self._wait_times = deque(maxlen=samples)
+        self._run_times = deque(maxlen=samples)
+        self._batch_sizes = deque(maxlen=samples)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='inference', daemon=True)
+                self._thread.start()
+                logging.info(f"InferenceService: Started worker thread (queue size {self._queue.maxsize}, batches of up to {self.max_batch})")
+
+    def _enqueue(self, request):
+        self._start()
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.rejected += 1
+            raise InferenceBusy(f"{self._queue.maxsize} AI requests are already waiting")
+        future = asyncio.wrap_future(request.future)
+        # Cancelling the asyncio future cancels a queued request; a running one is asked to stop
+        future.add_done_callback(lambda f: f.cancelled() and request.cancelled.set())
+        return future
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues func(*args, should_stop=..., **kwargs) for the worker thread and returns an asyncio
+        future for its result. Raises InferenceBusy if the queue is full.
+        """
+        return self._enqueue(_Request(func, args, kwargs))
+
+    def submit_batched(self, func, item, *args, **kwargs):
+        """
+        Queues item for func([items], *args, should_stop=..., **kwargs), which must return one result
+        per item, and returns an asyncio future for item's result. Items submitted with the same func
+        and arguments may be run together; should_stop then returns one flag per item.
+        """
+        return self._enqueue(_Request(func, args, kwargs, batch_item=item))
+
+    async def _wait(self, future, timeout):
+        timeout = timeout or self.timeout
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise InferenceTimeout(f"The AI request did not finish within {timeout:g} seconds")
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        """Submits func and waits for its result, raising InferenceTimeout after `timeout` seconds."""
+        return await self._wait(self.submit(func, *args, **kwargs), timeout)
+
+    async def run_batched(self, func, item, *args, timeout=None, **kwargs):
+        """Like run(), for a request that may be batched with others (see submit_batched)."""
+        return await self._wait(self.submit_batched(func, item, *args, **kwargs), timeout)
+
+    def _next_request(self, timeout=None):
+        """
+        Returns the next request that was not cancelled while it waited, _STOP, or None if nothing
+        arrived within timeout seconds.
+        """
+        if self._held is not None:
+            request, self._held = self._held, None
+            return request
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            try:
+                # Once the time is up, requests that are already queued are still taken
+                request = self._queue.get(timeout=remaining) if remaining is None or remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return None
+            if request is _STOP or request.future.set_running_or_notify_cancel():
+                return request
+            # Otherwise the caller timed out or went away while the request was queued
+
+    def _collect_batch(self, first):
+        """Gathers the requests that can run in one call with first, until the window closes or the batch is full."""
+        batch = [first]
+        key = first.batch_key
+        if key is None:
+            return batch
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            request = self._next_request(timeout=max(0.0, deadline - time.perf_counter()))
+            if request is None:
+                break
+            if request is _STOP or request.batch_key != key:
+                self._held = request # It starts the next call, so requests still run in order
+                break
+            batch.append(request)
+        return batch
+
+    def _worker(self):
+        while True:
+            first = self._next_request()
+            if first is _STOP:
+                return
+            batch = self._collect_batch(first)
+            self._current = batch
+            start = time.perf_counter()
+            for request in batch:
+                self._wait_times.append(start - request.enqueued)
+            try:
+                if first.batch_item is None:
+                    results = [first.func(*first.args, should_stop=first.cancelled.is_set, **first.kwargs)]
+                else:
+                    results = first.func([request.batch_item for request in batch], *first.args,
+                                         should_stop=lambda: [request.cancelled.is_set() for request in batch], **first.kwargs)
+                    if len(results) != len(batch):
+                        raise AIError(f"{first.func.__name__} returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                self.failed += len(batch)
+                for request in batch:
+                    request.future.set_exception(e)
+            else:
+                self.completed += len(batch)
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._current = []
+                self._run_times.append(elapsed)
+                self._batch_sizes.append(len(batch))
+            if len(batch) > 1:
+                logging.info(f"InferenceService: Ran a batch of {len(batch)} requests in {elapsed:.2f}s")
+
+    def shutdown(self):
+        """Cancels the queued requests, asks the running ones to stop and lets the worker exit."""
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not _STOP:
+                request.cancelled.set()
+                request.future.cancel()
+        for request in self._current:
+            request.cancelled.set()
+        if self._thread and self._thread.is_alive():
+            self._queue.put_nowait(_STOP)
+        self._thread = None
+
+    def stats(self):
+        """Returns a dictionary of queue, batching and latency counters for reporting."""
+        def average(samples):
+            return sum(samples) / len(samples) if samples else 0.0
+        return {
+            'queued': self._queue.qsize(),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'avg_wait': average(self._wait_times),
+            'avg_run': average(self._run_times),
+            'avg_batch': average(self._batch_sizes),
+        }
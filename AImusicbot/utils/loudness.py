@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from .db_utils import initialize_db, load_track_loudness, save_track_loudness
+
+ANALYSIS_SAMPLE_RATE = 24000 # Mono; plenty for a loudness estimate and half the work of 48 kHz
+SUB_BLOCK = 0.1 # seconds; four sub-blocks make one 400 ms gating block with 75% overlap
+ABSOLUTE_GATE = -70.0 # LUFS
+RELATIVE_GATE = -10.0 # LU below the absolute-gated loudness
+
+
+def sub_block_energies(samples, sample_rate=ANALYSIS_SAMPLE_RATE):
+    """
+    Returns the mean square of every complete 100 ms sub-block of a mono int16 sample array.
+    Trailing samples that do not fill a sub-block are ignored.
+    """
+    size = int(sample_rate * SUB_BLOCK)
+    count = len(samples) // size
+    if not count:
+        return np.empty(0)
+    blocks = samples[:count * size].astype(np.float64).reshape(count, size) / 32768.0
+    return np.einsum('ij,ij->i', blocks, blocks) / size
+
+
+def integrated_loudness(energies):
+    """
+    Computes the gated loudness of a track from its 100 ms sub-block energies, following the
+    EBU R128 / BS.1770 gating scheme (400 ms blocks with 75% overlap, an absolute gate at
+    -70 LUFS and a relative gate 10 LU below). The K-weighting pre-filter is left out, so the
+    result is a gated RMS level in dBFS that tracks LUFS closely for full-range music.
+    Returns None for silence.
+    """
+    if len(energies) < 4:
+        return None
+    blocks = np.convolve(energies, np.full(4, 0.25), mode='valid')
+    with np.errstate(divide='ignore'):
+        levels = 10 * np.log10(blocks)
+    gated = blocks[levels > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    relative_gate = 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = blocks[levels > max(ABSOLUTE_GATE, relative_gate)]
+    return float(10 * np.log10(gated.mean()))
+
+
+class LoudnessAnalyzer:
+    """
+    Measures each track's loudness once, in the background, and remembers the gain that brings
+    it to `target` so playback can apply it as a fixed ffmpeg volume instead of normalizing live.
+    ffmpeg decodes the track to mono PCM on a pipe and the samples are reduced chunk by chunk with
+    NumPy, so a whole track never has to be held in memory. Results are keyed by video ID and
+    persisted in the database, so every track is analysed once across restarts.
+    """
+    def __init__(self, target=-16.0, max_gain=12.0, tolerance=1.0, max_duration=20 * 60, max_analyses=1):
+        self.target = target # LUFS
+        self.max_gain = max_gain # dB, in either direction
+        self.tolerance = tolerance # dB; smaller corrections are skipped to keep Opus passthrough
+        self.max_duration = max_duration
+        self._analysis_slots = asyncio.Semaphore(max_analyses)
+        self._gains = {} # key -> gain in dB
+        self._analyzing = set()
+        self.analyses = 0
+        self.failed_analyses = 0
+        self.analysis_seconds = 0.0
+        self._loading = None # Task reading the stored measurements, started by the first load()
+
+    @property
+    def loaded(self):
+        return self._loading is not None and self._loading.done()
+
+    async def load(self):
+        """
+        Loads the stored measurements from the database on a worker thread. Only the first call reads
+        them; later ones wait for it to finish, or return at once if it has.
+        """
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._loading)
+
+    async def _load(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, initialize_db)
+        stored = await loop.run_in_executor(None, load_track_loudness)
+        for key, gain_db in stored.items():
+            self._gains.setdefault(key, gain_db) # Measurements made in the meantime are newer
+
+    def gain(self, key):
+        """Returns the linear gain for key, or 1.0 if it is unknown or within the tolerance."""
+        gain_db = self._gains.get(key) if key else None
+        if gain_db is None or abs(gain_db) < self.tolerance:
+            return 1.0
+        return 10 ** (gain_db / 20)
+
+    def analyze(self, key, source, duration, before_options='', loop=None):
+        """
+        Starts a background analysis of source unless key was already measured. Nothing is started
+        before the stored measurements are loaded, so tracks are not measured twice.
+        """
+        if not self.loaded:
+            return
+        if not key or not source or key in self._gains or key in self._analyzing:
+            return
+        if not duration or duration > self.max_duration:
+            return
+        self._analyzing.add(key)
+        (loop or asyncio.get_event_loop()).create_task(self._analyze(key, source, before_options))
+
+    async def _analyze(self, key, source, before_options):
+        try:
+            async with self._analysis_slots:
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-nostdin', '-loglevel', 'error', *before_options.split(),
+                    '-i', source, '-vn', '-map', '0:a:0', '-f', 's16le', '-ac', '1', '-ar', str(ANALYSIS_SAMPLE_RATE), 'pipe:1',
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+                )
+                chunk_bytes = ANALYSIS_SAMPLE_RATE * 2 * 10 # 10 s of audio per read
+                energies = []
+                peak = 0
+                pending = b''
+                try:
+                    while True:
+                        data = await process.stdout.read(chunk_bytes)
+                        if not data:
+                            break
+                        pending += data
+                        usable = len(pending) - len(pending) % (int(ANALYSIS_SAMPLE_RATE * SUB_BLOCK) * 2)
+                        samples = np.frombuffer(pending[:usable], dtype=np.int16)
+                        energies.append(sub_block_energies(samples))
+                        if len(samples):
+                            peak = max(peak, int(np.abs(samples.astype(np.int32)).max()))
+                        pending = pending[usable:]
+                    await process.wait()
+                except BaseException:
+                    if process.returncode is None:
+                        process.kill()
+                    raise
+                if process.returncode != 0:
+                    raise RuntimeError(f"ffmpeg exited with {process.returncode}")
+                loudness = integrated_loudness(np.concatenate(energies)) if energies else None
+            if loudness is None:
+                raise RuntimeError("the track is silent")
+            # Boost no further than the track's peak allows, so quiet tracks are not clipped
+            headroom = -20 * np.log10(peak / 32768) - 1.0 if peak else self.max_gain
+            gain_db = float(np.clip(self.target - loudness, -self.max_gain, max(0.0, min(self.max_gain, headroom))))
+            self._gains[key] = gain_db
+            elapsed = time.perf_counter() - start
+            self.analyses += 1
+            self.analysis_seconds += elapsed
+            logging.info(f"LoudnessAnalyzer: {key} measured {loudness:.1f} LUFS, gain {gain_db:+.1f} dB ({elapsed:.1f}s)")
+            await asyncio.get_running_loop().run_in_executor(None, save_track_loudness, key, loudness, gain_db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed_analyses += 1
+            logging.warning(f"LoudnessAnalyzer: Could not analyse {key}: {e}")
+        finally:
+            self._analyzing.discard(key)
+
+    def stats(self):
+        """Returns a dictionary of analysis counters for reporting."""
+        return {
+            'tracks': len(self._gains),
+            'analyses': self.analyses,
+            'failed_analyses': self.failed_analyses,
+            'analyzing': len(self._analyzing),
+            'avg_seconds': self.analysis_seconds / self.analyses if self.analyses else 0.0,
+        }
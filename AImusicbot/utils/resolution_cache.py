@@ -0,0 +1,161 @@
+import re
+import sys
+import time
+import logging
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+# Only the fields the music cog actually reads are kept; the rest of the yt-dlp
+# info dict (formats, subtitles, headers, ...) is dropped before caching.
+CACHED_FIELDS = ('id', 'title', 'webpage_url', 'duration', 'thumbnail', 'acodec', 'asr')
+
+YOUTUBE_HOSTS = ('youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com')
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def normalize_key(url):
+    """
+    Returns a stable cache key for a URL or bare video ID, or None if the input
+    does not identify a single video (playlists, search queries, ...).
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if VIDEO_ID_RE.match(url):
+        return f"youtube:{url}"
+
+    parsed = urlparse(url if '://' in url else f"https://{url}")
+    host = (parsed.hostname or '').lower()
+    video_id = None
+    if host in YOUTUBE_HOSTS:
+        if parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+        elif parsed.path.startswith(('/shorts/', '/embed/', '/live/')):
+            video_id = parsed.path.split('/')[2]
+    elif host in ('youtu.be', 'www.youtu.be'):
+        video_id = parsed.path.lstrip('/').split('/')[0]
+
+    if video_id and VIDEO_ID_RE.match(video_id):
+        return f"youtube:{video_id}"
+    return None
+
+
+def stream_url_expiry(url, default_ttl):
+    """
+    Returns the unix time at which a signed stream URL stops working.
+    googlevideo URLs carry an `expire` query parameter; anything else falls back
+    to `default_ttl` seconds from now.
+    """
+    try:
+        expire = parse_qs(urlparse(url).query).get('expire', [None])[0]
+        if expire:
+            return float(expire)
+    except (TypeError, ValueError):
+        pass
+    return time.time() + default_ttl
+
+
+class ResolutionCache:
+    """
+    An in-memory LRU cache of yt-dlp resolutions.
+    Metadata (title, duration, thumbnail) and the signed stream URL are kept with
+    separate lifetimes, and the cache is bounded both by entry count and by an
+    estimate of the bytes it holds.
+    """
+    def __init__(self, max_entries=2048, max_bytes=8 * 1024 * 1024, metadata_ttl=24 * 3600, stream_ttl=5 * 3600, stream_margin=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.metadata_ttl = metadata_ttl
+        self.stream_ttl = stream_ttl
+        self.stream_margin = stream_margin # Treat URLs as expired this many seconds early
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_streams = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _estimate_size(entry):
+        return sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry.values())
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['_size']
+
+    def get(self, key, min_ttl=0, count=True):
+        """
+        Returns a compact info dict whose stream URL stays valid for at least
+        min_ttl more seconds, or None. A hit moves the entry to the most-recently-used end.
+        With count=False the lookup is left out of the hit and miss counters, for opportunistic
+        lookups that do not stand for an extraction (e.g. playlist placeholders).
+        """
+        entry = self._entries.get(key) if key else None
+        now = time.time()
+        if entry is None or now >= entry['metadata_expires']:
+            if entry is not None:
+                self._drop(key)
+            self.misses += count
+            return None
+        if now + max(self.stream_margin, min_ttl) >= entry['url_expires']:
+            # Metadata is still good but the signed URL is not; the caller has to re-extract.
+            self.stale_streams += count
+            self.misses += count
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += count
+        return {field: entry[field] for field in CACHED_FIELDS + ('url', 'url_expires')}
+
+    def get_metadata(self, key):
+        """Returns the cached metadata for a key regardless of stream URL expiry, e.g. for queue placeholders."""
+        entry = self._entries.get(key) if key else None
+        if entry is None or time.time() >= entry['metadata_expires']:
+            return None
+        return {field: entry[field] for field in CACHED_FIELDS}
+
+    def put(self, key, info):
+        """Stores the relevant fields of a yt-dlp info dict under key."""
+        if not key or not info or not info.get('url'):
+            return
+        now = time.time()
+        entry = {field: info.get(field) for field in CACHED_FIELDS}
+        entry['url'] = info['url']
+        entry['url_expires'] = stream_url_expiry(info['url'], self.stream_ttl)
+        entry['metadata_expires'] = now + self.metadata_ttl
+        entry['_size'] = self._estimate_size(entry)
+
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self._bytes += entry['_size']
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._drop(oldest_key)
+            self.evictions += 1
+            logging.debug(f"ResolutionCache: Evicted {oldest_key}")
+
+    def invalidate(self, key):
+        if key in self._entries:
+            self._drop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """Returns a dictionary of cache counters for reporting."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_streams': self.stale_streams,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -1,42 +1,35 @@
-import asyncio
-import discord
-import yt_dlp
-from googleapiclient.discovery import build
-import logging
-from functools import lru_cache
-from numba import jit
-
-# --- Pre-loading and Caching ---
-
-@lru_cache(maxsize=128)
-def get_youtube_service(api_key):
-    """
-    Creates and caches a YouTube service object.
-    """
-    logging.info("Creating new YouTube service object.")
-    return build("youtube", "v3", developerKey=api_key)
-
-@jit(nopython=True)
-def calculate_audio_levels(audio_data):
-    """
-    A placeholder for a computationally intensive audio processing function.
-    """
-    # In a real application, this would be a much more complex calculation.
-    return audio_data * 0.9
-
-def preload_dependencies():
-    """
-    Pre-loads and initializes key dependencies to improve startup time.
-    """
-    logging.info("Pre-loading dependencies...")
-    try:
-        # Pre-load the yt-dlp library
-        yt_dlp.YoutubeDL({})
-        logging.info("Dependencies pre-loaded successfully.")
-    except Exception as e:
-        logging.error(f"Error pre-loading dependencies: {e}")
-
-# --- Main Execution ---
-
-if __name__ == '__main__':
-    preload_dependencies()
+import asyncio
+import discord
+import yt_dlp
+from googleapiclient.discovery import build
+import logging
+from functools import lru_cache
+
+# --- Pre-loading and Caching ---
+
+@lru_cache(maxsize=128)
+def get_youtube_service(api_key):
+    """
+    Creates and caches a YouTube service object.
+    """
+    logging.info("Creating new YouTube service object.")
+    return build("youtube", "v3", developerKey=api_key)
+
+def preload_dependencies():
+    """
+    Pre-loads and initializes key dependencies to improve startup time.
+    """
+    logging.info("Pre-loading dependencies...")
+    try:
+        # Import yt-dlp's extractor classes once up front. The YoutubeDL instances themselves are
+        # long-lived and built per extraction worker (see cogs.youtube.YTDL_POOL), so building a
+        # throwaway one here would only be discarded.
+        yt_dlp.extractor.gen_extractor_classes()
+        logging.info("Dependencies pre-loaded successfully.")
+    except Exception as e:
+        logging.error(f"Error pre-loading dependencies: {e}")
+
+# --- Main Execution ---
+
+if __name__ == '__main__':
+    preload_dependencies()